@@ -0,0 +1,200 @@
+"""
+Асинхронные версии функций app.crud.
+
+Каждая функция выполняет синхронную реализацию из app.crud через
+AsyncSession.run_sync: ORM-код работает в greenlet-контексте поверх
+асинхронного драйвера, поэтому ожидание БД не занимает поток,
+а логика запросов не дублируется.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.pagination import DEFAULT_LIMIT
+
+EXPORT_BATCH_SIZE = 1000
+
+
+async def create_menu(db: AsyncSession, menu: dict):
+    """Асинхронно создает меню в базе данных."""
+    return await db.run_sync(crud.create_menu, menu)
+
+
+async def create_submenu(db: AsyncSession, menu_id: str, submenu: dict):
+    """Асинхронно создает подменю в базе данных."""
+    return await db.run_sync(crud.create_submenu, menu_id, submenu)
+
+
+async def create_dish(db: AsyncSession, menu_id: str, submenu_id: str, dish_data: dict):
+    """Асинхронно создает блюдо в базе данных."""
+    return await db.run_sync(crud.create_dish, menu_id, submenu_id, dish_data)
+
+
+async def insert_menu_documents(db: AsyncSession, documents):
+    """Асинхронно вставляет вложенные документы меню без коммита."""
+    return await db.run_sync(crud.insert_menu_documents, documents)
+
+
+async def import_menus(db: AsyncSession, documents):
+    """Асинхронно импортирует вложенные документы меню в одной транзакции."""
+    return await db.run_sync(crud.import_menus, documents)
+
+
+async def stream_export_rows(db: AsyncSession, menu_id: str = None, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Асинхронно отдает строки выгрузки пачками через серверный курсор.
+
+    В памяти одновременно держится не больше batch_size строк.
+    """
+    result = await db.stream(crud.export_query(menu_id).execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+async def stream_menu_tree_rows(db: AsyncSession, menu_id: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Асинхронно отдает строки подменю и блюд меню пачками через серверный курсор.
+
+    В памяти одновременно держится не больше batch_size строк.
+    """
+    result = await db.stream(crud.menu_tree_query(menu_id).execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+async def get_all_menus(db: AsyncSession, limit: int = DEFAULT_LIMIT, cursor: str = None):
+    """Асинхронно получает страницу меню из базы данных."""
+    return await db.run_sync(crud.get_all_menus, limit=limit, cursor=cursor)
+
+
+async def get_menu(db: AsyncSession, menu_id: str):
+    """Асинхронно получает данные о конкретном меню."""
+    return await db.run_sync(crud.get_menu, menu_id)
+
+
+async def publish_snapshot(db: AsyncSession, menu_id: str):
+    """Асинхронно публикует снимок меню."""
+    return await db.run_sync(crud.publish_snapshot, menu_id)
+
+
+async def get_all_submenus(
+    db: AsyncSession, menu_id: str = None, limit: int = DEFAULT_LIMIT, cursor: str = None
+):
+    """Асинхронно получает страницу подменю из базы данных."""
+    return await db.run_sync(crud.get_all_submenus, menu_id=menu_id, limit=limit, cursor=cursor)
+
+
+async def get_submenu(db: AsyncSession, submenu_id: str, menu_id: str = None):
+    """Асинхронно получает данные о конкретном подменю."""
+    return await db.run_sync(crud.get_submenu, submenu_id, menu_id=menu_id)
+
+
+async def get_all_dishes(
+    db: AsyncSession,
+    submenu_id: str,
+    menu_id: str = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: str = None,
+    min_price=None,
+    max_price=None,
+    order_by: str = "id",
+):
+    """Асинхронно получает страницу блюд конкретного подменю."""
+    return await db.run_sync(
+        crud.get_all_dishes, submenu_id, menu_id=menu_id, limit=limit, cursor=cursor,
+        min_price=min_price, max_price=max_price, order_by=order_by,
+    )
+
+
+async def get_price_stats(db: AsyncSession, menu_id: str):
+    """Асинхронно считает статистику цен блюд меню."""
+    return await db.run_sync(crud.get_price_stats, menu_id)
+
+
+async def get_dishes(db: AsyncSession, dish_id: str, submenu_id: str = None, menu_id: str = None):
+    """Асинхронно получает данные о конкретном блюде."""
+    return await db.run_sync(crud.get_dishes, dish_id, submenu_id=submenu_id, menu_id=menu_id)
+
+
+async def get_submenus_by_ids(db: AsyncSession, ids):
+    """Асинхронно получает подменю по списку идентификаторов."""
+    return await db.run_sync(crud.get_submenus_by_ids, ids)
+
+
+async def get_dishes_by_ids(db: AsyncSession, ids):
+    """Асинхронно получает блюда по списку идентификаторов."""
+    return await db.run_sync(crud.get_dishes_by_ids, ids)
+
+
+async def search(
+    db: AsyncSession, q: str, menu_id: str = None, submenu_id: str = None, limit: int = DEFAULT_LIMIT,
+    cursor: str = None,
+):
+    """Асинхронно ищет подменю и блюда по названию и описанию."""
+    return await db.run_sync(
+        crud.search, q, menu_id=menu_id, submenu_id=submenu_id, limit=limit, cursor=cursor
+    )
+
+
+async def get_menu_version(db: AsyncSession, menu_id: str):
+    """Асинхронно получает версию меню."""
+    return await db.run_sync(crud.get_menu_version, menu_id)
+
+
+async def get_submenu_version(db: AsyncSession, submenu_id: str, menu_id: str):
+    """Асинхронно получает версию подменю."""
+    return await db.run_sync(crud.get_submenu_version, submenu_id, menu_id)
+
+
+async def get_dish_version(db: AsyncSession, dish_id: str, submenu_id: str, menu_id: str):
+    """Асинхронно получает версию блюда."""
+    return await db.run_sync(crud.get_dish_version, dish_id, submenu_id, menu_id)
+
+
+async def update_menu(db: AsyncSession, menu_id: str, updated_data: dict):
+    """Асинхронно обновляет данные о конкретном меню."""
+    return await db.run_sync(crud.update_menu, menu_id, updated_data)
+
+
+async def update_submenu(db: AsyncSession, submenu_id: str, updated_data: dict):
+    """Асинхронно обновляет данные о конкретном подменю."""
+    return await db.run_sync(crud.update_submenu, submenu_id, updated_data)
+
+
+async def update_dish(db: AsyncSession, dish_id: str, updated_data: dict):
+    """Асинхронно обновляет данные о конкретном блюде."""
+    return await db.run_sync(crud.update_dish, dish_id, updated_data)
+
+
+async def delete_menu(db: AsyncSession, menu_id: str):
+    """Асинхронно удаляет конкретное меню."""
+    return await db.run_sync(crud.delete_menu, menu_id)
+
+
+async def delete_submenu(db: AsyncSession, submenu_id: str):
+    """Асинхронно удаляет конкретное подменю."""
+    return await db.run_sync(crud.delete_submenu, submenu_id)
+
+
+async def delete_dish(db: AsyncSession, dish_id: str):
+    """Асинхронно удаляет конкретное блюдо."""
+    return await db.run_sync(crud.delete_dish, dish_id)
+
+
+async def partial_update_menu(db: AsyncSession, menu_id: str, updated_data: dict):
+    """Асинхронно частично обновляет данные о конкретном меню."""
+    return await db.run_sync(crud.partial_update_menu, menu_id, updated_data)
+
+
+async def partial_update_submenu(db: AsyncSession, submenu_id: str, updated_data: dict):
+    """Асинхронно частично обновляет данные о конкретном подменю."""
+    return await db.run_sync(crud.partial_update_submenu, submenu_id, updated_data)
+
+
+async def partial_update_dish(db: AsyncSession, dish_id: str, updated_data: dict):
+    """Асинхронно частично обновляет данные о конкретном блюде."""
+    return await db.run_sync(crud.partial_update_dish, dish_id, updated_data)
+
+
+async def recount_counters(db: AsyncSession):
+    """Асинхронно пересчитывает счетчики меню и подменю."""
+    return await db.run_sync(crud.recount_counters)
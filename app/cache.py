@@ -0,0 +1,381 @@
+"""
+Кэш ответов для чтения меню, подменю и блюд.
+
+Ключи повторяют иерархию меню -> подменю -> блюдо::
+
+    menu:{menu_id}
+    menu:{menu_id}:submenu:{submenu_id}
+    menu:{menu_id}:submenu:{submenu_id}:dishes
+    menu:{menu_id}:submenu:{submenu_id}:dish:{dish_id}
+
+поэтому изменение объекта сбрасывает его поддерево одним удалением по префиксу.
+Каждый сброс увеличивает поколение меню: cached читает его до загрузки
+значения из БД и не сохраняет значение, если меню сбросили во время загрузки
+(иначе чтение, начатое до записи, вернуло бы в кэш устаревшие данные).
+Идентификаторы в ключах приводятся к канонической записи UUID: чтение по
+/menus/{ID в верхнем регистре} и сброс по id из БД попадают в один ключ.
+
+Бэкенд выбирается переменными окружения:
+
+- CACHE_BACKEND: memory (по умолчанию), redis или none. Кэш memory у каждого
+  воркера свой: записи других воркеров сбрасывают его через ленту изменений
+  app.events, поэтому при WEB_CONCURRENCY > 1 нужен EVENTS_BACKEND=postgres
+  (по умолчанию) или общий кэш redis;
+- CACHE_TTL: время жизни записи в секундах (по умолчанию 60);
+- CACHE_MAXSIZE: размер LRU для memory-бэкенда (по умолчанию 10000);
+- REDIS_URL: адрес Redis для redis-бэкенда;
+- REDIS_TIMEOUT: таймаут подключения и команд Redis в секундах (по умолчанию 0.5).
+
+Redis - только ускорение: если он недоступен, чтения идут в БД, а запись,
+уже зафиксированная в БД, не завершается ошибкой из-за несброшенного кэша
+(запись кэша доживет до CACHE_TTL).
+"""
+import inspect
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from sqlalchemy.util import await_only
+
+from app.models import canonical_id
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "0.5"))
+
+# Ключ Session.info: чтения сессии не берут значения из кэша (см. app.read_routing)
+BYPASS_KEY = "bypass_cache"
+
+logger = logging.getLogger(__name__)
+
+
+def _menu_scope(key: str):
+    """Ключ меню, к которому относится ключ кэша: menu:{menu_id}."""
+    return ":".join(key.split(":", 2)[:2])
+
+
+def menu_key(menu_id: str):
+    """Ключ меню."""
+    return f"menu:{canonical_id(menu_id)}"
+
+
+def submenu_key(menu_id: str, submenu_id: str):
+    """Ключ подменю внутри меню."""
+    return f"{menu_key(menu_id)}:submenu:{canonical_id(submenu_id)}"
+
+
+def dishes_key(menu_id: str, submenu_id: str):
+    """Ключ списка блюд подменю."""
+    return f"{submenu_key(menu_id, submenu_id)}:dishes"
+
+
+def dish_key(menu_id: str, submenu_id: str, dish_id: str):
+    """Ключ блюда подменю."""
+    return f"{submenu_key(menu_id, submenu_id)}:dish:{canonical_id(dish_id)}"
+
+
+class MemoryCache:
+    """Кэш в памяти процесса с вытеснением LRU и временем жизни записей."""
+
+    # Кэш своего процесса: записи в других воркерах сбрасывают его через ленту изменений
+    local = True
+
+    def __init__(self, maxsize: int = CACHE_MAXSIZE, ttl: int = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # Меню -> номер последнего сброса; не больше maxsize меню, для вытесненных - _floor
+        self._generations = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        self._lock = Lock()
+
+    def _bump(self, key: str):
+        # Вызывается под self._lock
+        self._clock += 1
+        scope = _menu_scope(key)
+        self._generations[scope] = self._clock
+        self._generations.move_to_end(scope)
+        while len(self._generations) > self.maxsize:
+            _, self._floor = self._generations.popitem(last=False)
+
+    def generation(self, key: str):
+        with self._lock:
+            return self._clock
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, generation=None):
+        with self._lock:
+            if generation is not None and self._generations.get(_menu_scope(key), self._floor) > generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._bump(key)
+                self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            self._bump(prefix)
+            for key in [k for k in self._data if k == prefix or k.startswith(prefix + ":")]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._floor = self._clock
+            self._generations.clear()
+            self._data.clear()
+
+
+class RedisCache:
+    """
+    Кэш в Redis (или любом сервере, совместимом по протоколу).
+
+    Принимает клиента с интерфейсом redis-py: get, set, delete, smembers,
+    pipeline, scan_iter - синхронного или асинхронного (redis.asyncio).
+    Команды асинхронного клиента ждутся через await_only SQLAlchemy: функции
+    app.crud выполняются в greenlet сессии (AsyncSession.run_sync), поэтому
+    ожидание Redis не блокирует цикл событий. Ошибка Redis записывается
+    в лог и считается промахом кэша.
+
+    Значения хранятся в JSON. Ключи каждого меню перечислены в множестве
+    {menu_key}:keys, поэтому delete_prefix читает только это множество,
+    а не сканирует все пространство ключей.
+
+    Поколение меню - счетчик {menu_key}:gen (INCR перед удалением ключей)
+    вместе с общим счетчиком cache:epoch (INCR в clear). set записывает
+    значение и в том же конвейере перечитывает поколение: если оно
+    изменилось, значение удаляется. Сброс, прошедший после этого чтения,
+    уже видит ключ в множестве меню и удаляет его сам.
+    """
+
+    local = False
+
+    EPOCH_KEY = "cache:epoch"
+
+    def __init__(self, client, ttl: int = CACHE_TTL):
+        self.client = client
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url: str = REDIS_URL, ttl: int = CACHE_TTL):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT)
+        return cls(client, ttl=ttl)
+
+    @staticmethod
+    def _index_key(key: str):
+        # Множество ключей меню: menu:{menu_id}:keys
+        return _menu_scope(key) + ":keys"
+
+    @staticmethod
+    def _generation_key(key: str):
+        # Счетчик сбросов меню: menu:{menu_id}:gen
+        return _menu_scope(key) + ":gen"
+
+    @staticmethod
+    def _run(result):
+        """Результат команды: корутина асинхронного клиента ждется в цикле событий."""
+        return await_only(result) if inspect.isawaitable(result) else result
+
+    def _safely(self, operation: str, function, *args):
+        """Выполняет операцию кэша; при ошибке Redis пишет предупреждение и возвращает None."""
+        try:
+            return function(*args)
+        except Exception as error:
+            logger.warning("Redis cache %s failed: %s", operation, error)
+            return None
+
+    def _members(self, result):
+        # Элементы множества и ключи SCAN приходят байтами, если клиент без decode_responses
+        return [member.decode() if isinstance(member, bytes) else member for member in self._run(result)]
+
+    def _get(self, key: str):
+        value = self._run(self.client.get(key))
+        return None if value is None else json.loads(value)
+
+    def _generation(self, key: str):
+        return list(self._run(self.client.mget(self._generation_key(key), self.EPOCH_KEY)))
+
+    def _set(self, key: str, value, generation):
+        index = self._index_key(key)
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.set(key, json.dumps(value), ex=self.ttl)
+        pipeline.sadd(index, key)
+        pipeline.expire(index, self.ttl)
+        if generation is not None:
+            pipeline.mget(self._generation_key(key), self.EPOCH_KEY)
+        results = self._run(pipeline.execute())
+        if generation is not None and list(results[-1]) != generation:
+            self._run(self.client.delete(key))
+
+    def _bump(self, pipeline, key: str):
+        # Счетчик живет не меньше записей меню: загрузка дольше CACHE_TTL не проверяется
+        pipeline.incr(self._generation_key(key))
+        pipeline.expire(self._generation_key(key), self.ttl)
+
+    def _delete(self, *keys: str):
+        pipeline = self.client.pipeline(transaction=False)
+        for scope in {_menu_scope(key) for key in keys}:
+            self._bump(pipeline, scope)
+        pipeline.delete(*keys)
+        self._run(pipeline.execute())
+
+    def _delete_prefix(self, prefix: str):
+        index = self._index_key(prefix)
+        pipeline = self.client.pipeline(transaction=False)
+        self._bump(pipeline, prefix)
+        pipeline.smembers(index)
+        members = self._members(self._run(pipeline.execute())[-1])
+        keys = [key for key in members if key == prefix or key.startswith(prefix + ":")]
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.delete(prefix, *keys)
+        if index.startswith(prefix + ":"):
+            pipeline.delete(index)
+        elif keys:
+            pipeline.srem(index, *keys)
+        self._run(pipeline.execute())
+
+    def _clear(self):
+        # Редкая операция: обходит только множества ключей меню
+        self._run(self.client.incr(self.EPOCH_KEY))
+        indexes = self.client.scan_iter(match=self._index_key("menu:*"))
+        if hasattr(indexes, "__aiter__"):
+            indexes = self._collect(indexes)
+        for index in self._members(indexes):
+            self._delete_prefix(index[:-len(":keys")])
+
+    @staticmethod
+    async def _collect(iterator):
+        return [item async for item in iterator]
+
+    def get(self, key: str):
+        return self._safely("get", self._get, key)
+
+    def generation(self, key: str):
+        # При ошибке - поколение, которое не совпадет с прочитанным в set: значение не сохранится
+        return self._safely("generation", self._generation, key) or ()
+
+    def set(self, key: str, value, generation=None):
+        self._safely("set", self._set, key, value, generation)
+
+    def delete(self, *keys: str):
+        if keys:
+            self._safely("delete", self._delete, *keys)
+
+    def delete_prefix(self, prefix: str):
+        self._safely("delete_prefix", self._delete_prefix, prefix)
+
+    def clear(self):
+        self._safely("clear", self._clear)
+
+
+class NullCache:
+    """Отключенный кэш: ничего не хранит."""
+
+    local = False
+
+    def get(self, key: str):
+        return None
+
+    def generation(self, key: str):
+        return None
+
+    def set(self, key: str, value, generation=None):
+        pass
+
+    def delete(self, *keys: str):
+        pass
+
+    def delete_prefix(self, prefix: str):
+        pass
+
+    def clear(self):
+        pass
+
+
+stats = {"hits": 0, "misses": 0}
+
+_backend = None
+
+
+def create_backend(name: str = CACHE_BACKEND):
+    """Создает бэкенд кэша по имени."""
+    if name == "memory":
+        return MemoryCache()
+    if name == "redis":
+        return RedisCache.from_url()
+    if name == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+def get_backend():
+    """Возвращает текущий бэкенд кэша, создавая его при первом обращении."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Подменяет бэкенд кэша (например, в тестах)."""
+    global _backend
+    _backend = backend
+
+
+def cached(key: str, loader, bypass: bool = False):
+    """
+    Читает значение из кэша, а при промахе вызывает loader и сохраняет результат.
+
+    Результат None (объект не найден) не кэшируется. Поколение меню ключа
+    читается до loader: если меню сбросили во время загрузки, результат
+    возвращается, но в кэш не попадает.
+
+    :param bypass: Не читать кэш: значение берется из loader и сохраняется в кэш.
+    """
+    backend = get_backend()
+    value = None if bypass else backend.get(key)
+    if value is not None:
+        stats["hits"] += 1
+        return value
+    stats["misses"] += 1
+    generation = backend.generation(key)
+    value = loader()
+    if value is not None:
+        backend.set(key, value, generation)
+    return value
+
+
+def get_stats():
+    """Возвращает счетчики попаданий и промахов кэша."""
+    return dict(stats)
+
+
+def reset_stats():
+    """Обнуляет счетчики попаданий и промахов кэша."""
+    stats["hits"] = 0
+    stats["misses"] = 0
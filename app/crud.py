@@ -1,12 +1,175 @@
-from sqlalchemy.orm import Session
-from app.models import Menu, Submenu, Dish
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import aliased
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload
-from sqlalchemy.sql import func
+import os
+import re
+from types import SimpleNamespace
 
-Base = declarative_base()
+from sqlalchemy.orm import Session, selectinload
+from app.models import SEARCH_CONFIG, Base, Menu, Submenu, Dish, Price, UUIDString, canonical_id, format_price
+from uuid import UUID, uuid4
+
+from sqlalchemy import (
+    Float, and_, any_, bindparam, cast, delete, func, insert, literal, or_, select, text, tuple_, union_all, update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app import cache, events, snapshots
+from app.pagination import DEFAULT_LIMIT, decode_sorted_cursor, encode_sorted_cursor, paginate, paginate_sorted
+
+
+def _adjust_counters(db: Session, model: Base, db_object, sign: int):
+    """
+    Атомарно изменяет денормализованные счетчики родителей объекта.
+
+    Счетчики обновляются выражением ``count = count + n`` на стороне БД,
+    поэтому параллельные запросы не теряют изменения друг друга.
+    Версии родителей увеличиваются вместе со счетчиками.
+
+    :param db: Сессия базы данных.
+    :param model: Класс модели.
+    :param db_object: Созданный объект или строка RETURNING удаленного.
+    :param sign: 1 при создании, -1 при удалении.
+    """
+    if model is Submenu:
+        db.execute(
+            update(Menu)
+            .where(Menu.id == db_object.menu_id)
+            .values(
+                submenus_count=Menu.submenus_count + sign,
+                dishes_count=Menu.dishes_count + sign * (db_object.dishes_count or 0),
+                version=Menu.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    elif model is Dish:
+        db.execute(
+            update(Submenu)
+            .where(Submenu.id == db_object.submenu_id)
+            .values(dishes_count=Submenu.dishes_count + sign, version=Submenu.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            update(Menu)
+            .where(
+                Menu.id == select(Submenu.menu_id)
+                .where(Submenu.id == db_object.submenu_id)
+                .scalar_subquery()
+            )
+            .values(dishes_count=Menu.dishes_count + sign, version=Menu.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _cache_scope(model: Base, db_object):
+    """
+    Возвращает ключи кэша, которые нужно сбросить при изменении объекта.
+
+    Сбрасывается поддерево объекта и родители, чьи счетчики зависят от него,
+    а также снимается публикация снимка меню.
+    Вычисляется до коммита, пока атрибуты объекта загружены.
+
+    :param model: Класс модели.
+    :param db_object: Изменяемый объект или строка RETURNING с его колонками.
+    :return: Тройка (ключи родителей, префикс поддерева, id меню).
+    """
+    if model is Menu:
+        return [], cache.menu_key(db_object.id), db_object.id
+    if model is Submenu:
+        return (
+            [cache.menu_key(db_object.menu_id)],
+            cache.submenu_key(db_object.menu_id, db_object.id),
+            db_object.menu_id,
+        )
+    return (
+        [cache.menu_key(db_object.menu_id)],
+        cache.submenu_key(db_object.menu_id, db_object.submenu_id),
+        db_object.menu_id,
+    )
+
+
+def _bypasses_cache(db: Session):
+    """Проверяет, читает ли сессия мимо кэша (окно read-your-writes, см. app.read_routing)."""
+    return db.info.get(cache.BYPASS_KEY, False)
+
+
+def _invalidate(scope):
+    """Сбрасывает кэш и снимок меню по результату _cache_scope."""
+    keys, prefix, menu_id = scope
+    backend = cache.get_backend()
+    backend.delete(*keys)
+    backend.delete_prefix(prefix)
+    snapshots.invalidate(menu_id)
+
+
+# Модель -> имя объекта и его поля в событиях created и updated ленты изменений
+EVENT_OBJECTS = {
+    Menu: ("menu", ("title", "description")),
+    Submenu: ("submenu", ("title", "description")),
+    Dish: ("dish", ("title", "description", "price")),
+}
+
+
+EVENT_MODELS = {name: model for model, (name, _) in EVENT_OBJECTS.items()}
+
+
+def _invalidate_local(event: dict):
+    """
+    Сбрасывает кэш и снимки процесса по событию ленты изменений.
+
+    С PostgresBackend событие записи приходит во все воркеры, поэтому кэш
+    и снимки в памяти сбрасываются и у тех, кто запись не выполнял; resync
+    (события могли потеряться) очищает их целиком. Общие хранилища (Redis,
+    SNAPSHOT_DIR) уже сбросила сама запись в _invalidate.
+    """
+    backend = cache.get_backend()
+    store = snapshots.get_store()
+    if event["type"] == "resync":
+        for local in (backend, store):
+            if local.local:
+                local.clear()
+        return
+    if backend.local:
+        keys, prefix, _ = _cache_scope(EVENT_MODELS[event["object"]], SimpleNamespace(**event))
+        backend.delete(*keys)
+        backend.delete_prefix(prefix)
+    if store.local:
+        store.invalidate(event["menu_id"])
+
+
+events.add_listener(_invalidate_local)
+
+
+def _emit_change(db: Session, action: str, model: Base, db_object):
+    """
+    Отправляет событие ленты изменений в транзакции записи.
+
+    :param action: created, updated или deleted.
+    :param model: Класс модели.
+    :param db_object: Объект или строка RETURNING с его колонками.
+    """
+    name, fields = EVENT_OBJECTS[model]
+    event = {
+        "type": action,
+        "object": name,
+        "id": db_object.id,
+        "menu_id": db_object.id if model is Menu else db_object.menu_id,
+    }
+    if model is Dish:
+        event["submenu_id"] = db_object.submenu_id
+    if action != "deleted":
+        data = {field: getattr(db_object, field) for field in fields}
+        if "price" in data:
+            data["price"] = format_price(data["price"])
+        event.update(version=db_object.version, data=data)
+    events.emit(db, event)
+
+
+def _row_columns(model: Base):
+    """Колонки строки модели без вычисляемых БД (поисковый вектор)."""
+    return [column for column in model.__table__.columns if column.computed is None]
+
+
+def _as_dict(db_object):
+    """Преобразует объект модели в словарь его колонок."""
+    return {column.key: getattr(db_object, column.key) for column in _row_columns(type(db_object))}
 
 
 def create_object(db: Session, model: Base, data: dict, **kwargs):
@@ -21,8 +184,13 @@ def create_object(db: Session, model: Base, data: dict, **kwargs):
     """
     db_object = model(**data, **kwargs)
     db.add(db_object)
+    db.flush()
+    _adjust_counters(db, model, db_object, 1)
+    _emit_change(db, "created", model, db_object)
+    scope = _cache_scope(model, db_object)
     db.commit()
     db.refresh(db_object)
+    _invalidate(scope)
     return db_object
 
 
@@ -47,79 +215,688 @@ def create_dish(db: Session, menu_id: str, submenu_id: str, dish_data: dict):
     return create_object(db, Dish, dish_data, menu_id=menu_id, submenu_id=submenu_id)
 
 
-def get_all_menus(db: Session):
+IMPORT_BATCH_SIZE = 10000
+
+
+def insert_menu_documents(db: Session, documents, batch_size: int = IMPORT_BATCH_SIZE):
     """
-    Получает все меню из базы данных.
+    Вставляет вложенные документы меню -> подменю -> блюда без коммита.
+
+    Идентификаторы и счетчики вычисляются на клиенте, строки пишутся
+    многострочными INSERT пачками по batch_size блюд, без refresh.
+
+    :param db: Сессия базы данных.
+    :param documents: Итерируемые словари меню с ключами submenus и dishes.
+    :param batch_size: Сколько блюд накапливать перед записью.
+    :return: Карта идентификаторов в порядке документов.
     """
-    return db.query(Menu).all()
+    menus, submenus, dishes, id_map = [], [], [], []
+
+    def flush():
+        for model, rows in ((Menu, menus), (Submenu, submenus), (Dish, dishes)):
+            if rows:
+                db.execute(insert(model.__table__), rows)
+                rows.clear()
+
+    for document in documents:
+        menu_id = str(uuid4())
+        menu_submenus = document.get("submenus") or []
+        menus.append({
+            "id": menu_id,
+            "title": document["title"],
+            "description": document["description"],
+            "submenus_count": len(menu_submenus),
+            "dishes_count": sum(len(submenu.get("dishes") or []) for submenu in menu_submenus),
+        })
+        menu_map = {"id": menu_id, "submenus": []}
+        for submenu in menu_submenus:
+            submenu_id = str(uuid4())
+            submenu_dishes = submenu.get("dishes") or []
+            submenus.append({
+                "id": submenu_id,
+                "title": submenu["title"],
+                "description": submenu["description"],
+                "menu_id": menu_id,
+                "dishes_count": len(submenu_dishes),
+            })
+            dish_ids = []
+            for dish in submenu_dishes:
+                dish_id = str(uuid4())
+                dishes.append({
+                    "id": dish_id,
+                    "title": dish["title"],
+                    "description": dish["description"],
+                    "price": dish["price"],
+                    "menu_id": menu_id,
+                    "submenu_id": submenu_id,
+                })
+                dish_ids.append(dish_id)
+                if len(dishes) >= batch_size:
+                    flush()
+            menu_map["submenus"].append({"id": submenu_id, "dishes": dish_ids})
+        id_map.append(menu_map)
+    flush()
+    return id_map
+
+
+def import_menus(db: Session, documents):
+    """
+    Импортирует вложенные документы меню в одной транзакции.
+
+    :param db: Сессия базы данных.
+    :param documents: Словари меню с вложенными подменю и блюдами.
+    :return: Карта идентификаторов в порядке документов.
+    """
+    id_map = insert_menu_documents(db, documents)
+    db.commit()
+    return id_map
+
+
+EXPORT_COLUMNS = (
+    Menu.id.label("menu_id"),
+    Menu.title.label("menu_title"),
+    Menu.description.label("menu_description"),
+    Submenu.id.label("submenu_id"),
+    Submenu.title.label("submenu_title"),
+    Submenu.description.label("submenu_description"),
+    Dish.id.label("dish_id"),
+    Dish.title.label("dish_title"),
+    Dish.description.label("dish_description"),
+    Dish.price.label("dish_price"),
+)
+
+
+def export_query(menu_id: str = None):
+    """
+    Строит запрос плоской выгрузки: строка на блюдо с данными меню и подменю.
+
+    Меню без подменю и подменю без блюд попадают в выгрузку с пустыми полями.
+
+    :param menu_id: Идентификатор меню для фильтрации.
+    :return: SELECT-выражение.
+    """
+    query = (
+        select(*EXPORT_COLUMNS)
+        .outerjoin(Submenu, Submenu.menu_id == Menu.id)
+        .outerjoin(Dish, Dish.submenu_id == Submenu.id)
+        .order_by(Menu.id, Submenu.id, Dish.id)
+    )
+    if menu_id is not None:
+        query = query.where(Menu.id == menu_id)
+    return query
+
+
+TREE_COLUMNS = (
+    Submenu.id.label("submenu_id"),
+    Submenu.title.label("submenu_title"),
+    Submenu.description.label("submenu_description"),
+    Submenu.dishes_count.label("submenu_dishes_count"),
+    Dish.id.label("dish_id"),
+    Dish.title.label("dish_title"),
+    Dish.description.label("dish_description"),
+    Dish.price.label("dish_price"),
+)
+
+
+def menu_tree_query(menu_id: str):
+    """
+    Строит запрос подменю и блюд меню: строка на блюдо с данными его подменю.
+
+    Подменю без блюд попадают в результат одной строкой с пустыми полями блюда.
+    Строки упорядочены по (подменю, блюдо), поэтому блюда подменю идут подряд.
+
+    :param menu_id: Идентификатор меню.
+    :return: SELECT-выражение.
+    """
+    return (
+        select(*TREE_COLUMNS)
+        .outerjoin(Dish, Dish.submenu_id == Submenu.id)
+        .where(Submenu.menu_id == menu_id)
+        .order_by(Submenu.id, Dish.id)
+    )
+
+
+MENU_COLUMNS = (Menu.id, Menu.title, Menu.description, Menu.submenus_count, Menu.dishes_count)
+SUBMENU_COLUMNS = (Submenu.id, Submenu.title, Submenu.description, Submenu.dishes_count)
+# Версия идет последней: она нужна для ETag страницы, но не отдается клиенту
+DISH_COLUMNS = (Dish.id, Dish.title, Dish.description, Dish.price, Dish.version)
+# Допустимые порядки страницы блюд: по id, по возрастанию и по убыванию цены
+DISH_ORDERS = ("id", "price", "-price")
+
+
+def get_all_menus(db: Session, limit: int = DEFAULT_LIMIT, cursor: str = None):
+    """
+    Получает страницу меню из базы данных.
+
+    :return: Пара (строки с колонками MENU_COLUMNS, курсор следующей страницы).
+    """
+    return paginate(db.query(*MENU_COLUMNS), Menu.id, limit, cursor)
 
 
 def get_menu(db: Session, menu_id: str):
     """
-    Получает данные о конкретном меню из базы данных.
+    Получает данные о конкретном меню из кэша или базы данных.
+
+    Счетчики подменю и блюд хранятся в самой строке меню,
+    поэтому достаточно одного поиска по первичному ключу.
 
     :param db: Сессия базы данных.
     :param menu_id: Идентификатор меню.
     :return: Данные о меню.
     """
-    menu = db.query(Menu).filter(Menu.id == menu_id).first()
+    def load():
+        menu = db.execute(
+            select(
+                Menu.id,
+                Menu.title,
+                Menu.description,
+                Menu.submenus_count,
+                Menu.dishes_count,
+                Menu.version,
+            ).where(Menu.id == menu_id)
+        ).first()
+        return dict(menu._mapping) if menu else None
 
-    if menu:
-        menu_data = {
-            "id": menu.id,
-            "title": menu.title,
-            "description": menu.description,
-            "submenus_count": len(menu.submenus),
-            "dishes_count": sum(submenu.dishes_count for submenu in menu.submenus)
-        }
-        
-        return menu_data
-    else:
+    return cache.cached(cache.menu_key(menu_id), load, bypass=_bypasses_cache(db))
+
+
+def get_menu_tree(db: Session, menu_id: str):
+    """
+    Получает меню вместе со всеми подменю и блюдами.
+
+    Связи загружаются пакетно (selectin): один запрос на меню, один на все его
+    подменю и один на все блюда этих подменю, независимо от их количества.
+
+    :param db: Сессия базы данных.
+    :param menu_id: Идентификатор меню.
+    :return: Объект меню с загруженными submenus и dishes или None.
+    """
+    return (
+        db.query(Menu)
+        .options(selectinload(Menu.submenus).selectinload(Submenu.dishes))
+        .filter(Menu.id == menu_id)
+        .first()
+    )
+
+
+def menu_snapshot_document(menu: Menu):
+    """
+    Собирает документ снимка из дерева меню get_menu_tree.
+
+    Подменю и блюда упорядочены по id, поэтому одно и то же меню всегда дает
+    один и тот же документ и одну и ту же версию снимка.
+    """
+    return {
+        "id": menu.id,
+        "title": menu.title,
+        "description": menu.description,
+        "submenus_count": menu.submenus_count,
+        "dishes_count": menu.dishes_count,
+        "submenus": [
+            {
+                "id": submenu.id,
+                "title": submenu.title,
+                "description": submenu.description,
+                "dishes_count": submenu.dishes_count,
+                "dishes": [
+                    {"id": dish.id, "title": dish.title, "description": dish.description, "price": dish.price}
+                    for dish in sorted(submenu.dishes, key=lambda dish: dish.id)
+                ],
+            }
+            for submenu in sorted(menu.submenus, key=lambda submenu: submenu.id)
+        ],
+    }
+
+
+def publish_snapshot(db: Session, menu_id: str):
+    """
+    Публикует снимок меню: собирает дерево меню и сохраняет его в хранилище снимков.
+
+    Если за время сборки меню изменилось, снимок возвращается, но не сохраняется:
+    следующий запрос соберет его заново.
+
+    :param db: Сессия базы данных (основной, а не реплики, чтобы не опубликовать
+        снимок до последней записи).
+    :param menu_id: Идентификатор меню.
+    :return: Snapshot или None, если меню нет.
+    """
+    if snapshots.snapshot_key(menu_id) is None:
         return None
+    store = snapshots.get_store()
+    generation = store.generation(menu_id)
+    menu = get_menu_tree(db, menu_id)
+    if menu is None:
+        return None
+    snapshot = snapshots.build(menu_snapshot_document(menu))
+    store.put(menu_id, snapshot, generation)
+    return snapshot
 
 
-def get_all_submenus(db: Session):
+def get_all_submenus(db: Session, menu_id: str = None, limit: int = DEFAULT_LIMIT, cursor: str = None):
     """
-    Получает все подменю из базы данных.
+    Получает страницу подменю из базы данных.
+
+    Если передан menu_id, возвращаются только подменю этого меню.
+
+    :return: Пара (строки с колонками SUBMENU_COLUMNS, курсор следующей страницы).
     """
-    return db.query(Submenu).all()
+    query = db.query(*SUBMENU_COLUMNS)
+    if menu_id is not None:
+        query = query.filter(Submenu.menu_id == menu_id)
+    return paginate(query, Submenu.id, limit, cursor)
 
 
-def get_submenu(db: Session, submenu_id: str):
+def get_submenu(db: Session, submenu_id: str, menu_id: str = None):
     """
-    Получает данные о конкретном подменю из базы данных.
+    Получает данные о конкретном подменю из кэша или базы данных.
+
+    Если передан menu_id, подменю ищется только в этом меню
+    и результат кэшируется.
 
     :param db: Сессия базы данных.
     :param submenu_id: Идентификатор подменю.
+    :param menu_id: Идентификатор меню.
     :return: Данные о подменю.
     """
-    submenu = db.query(Submenu).filter(Submenu.id == submenu_id).first()
+    def load():
+        query = select(
+            Submenu.id,
+            Submenu.title,
+            Submenu.description,
+            Submenu.dishes_count,
+            Submenu.version,
+        ).where(Submenu.id == submenu_id)
+        if menu_id is not None:
+            query = query.where(Submenu.menu_id == menu_id)
+        submenu = db.execute(query).first()
+        return dict(submenu._mapping) if submenu else None
 
-    if submenu:
-        submenu_data = {
-            "id": submenu.id,
-            "title": submenu.title,
-            "description": submenu.description,
-            "dishes_count": len(submenu.dishes)
-        }
+    if menu_id is None:
+        return load()
+    return cache.cached(cache.submenu_key(menu_id, submenu_id), load, bypass=_bypasses_cache(db))
+
+
+def get_all_dishes(
+    db: Session,
+    submenu_id: str,
+    menu_id: str = None,
+    limit: int = DEFAULT_LIMIT,
+    cursor: str = None,
+    min_price=None,
+    max_price=None,
+    order_by: str = "id",
+):
+    """
+    Получает страницу блюд конкретного подменю из кэша или базы данных.
+
+    Фильтр по цене и сортировка выполняются в SQL по индексу
+    (submenu_id, price, id). Если передан menu_id, страница кэшируется.
 
-        return submenu_data
+    :param min_price: Нижняя граница цены включительно.
+    :param max_price: Верхняя граница цены включительно.
+    :param order_by: Порядок: DISH_ORDERS ("id", "price" или "-price").
+    :return: Пара (строки с колонками DISH_COLUMNS, курсор следующей страницы).
+    """
+    if order_by not in DISH_ORDERS:
+        raise ValueError(f"unknown order: {order_by}")
+
+    def load():
+        query = db.query(*DISH_COLUMNS).filter(Dish.submenu_id == submenu_id)
+        if menu_id is not None:
+            query = query.filter(Dish.menu_id == menu_id)
+        if min_price is not None:
+            query = query.filter(Dish.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Dish.price <= max_price)
+        if order_by == "id":
+            dishes, next_cursor = paginate(query, Dish.id, limit, cursor)
+        else:
+            dishes, next_cursor = paginate_sorted(
+                query, Dish.price, Dish.id, limit, cursor, descending=order_by == "-price", value_type=format_price
+            )
+        return {"items": [list(dish) for dish in dishes], "next_cursor": next_cursor}
+
+    if menu_id is None:
+        page = load()
     else:
+        key = (
+            f"{cache.dishes_key(menu_id, submenu_id)}:{limit}:{cursor or ''}"
+            f":{format_price(min_price) or ''}:{format_price(max_price) or ''}:{order_by}"
+        )
+        page = cache.cached(key, load, bypass=_bypasses_cache(db))
+    return page["items"], page["next_cursor"]
+
+
+def get_price_stats(db: Session, menu_id: str):
+    """
+    Считает статистику цен блюд меню одним агрегатным запросом.
+
+    GROUPING SETS дает строки по каждому подменю и итоговую строку меню
+    за один проход по dishes; подменю без блюд попадают в результат
+    благодаря LEFT JOIN.
+
+    :return: Словарь с итогами меню и списком подменю или None, если меню нет.
+    """
+    grouped = func.grouping(Submenu.id)
+    rows = db.execute(
+        select(
+            Submenu.id,
+            grouped,
+            func.count(Dish.id),
+            func.min(Dish.price),
+            func.max(Dish.price),
+            func.avg(Dish.price),
+        )
+        .select_from(Menu)
+        .outerjoin(Submenu, Submenu.menu_id == Menu.id)
+        .outerjoin(Dish, Dish.submenu_id == Submenu.id)
+        .where(Menu.id == menu_id)
+        .group_by(func.grouping_sets(tuple_(Menu.id, Submenu.id), tuple_(Menu.id)))
+        .order_by(grouped.desc(), Submenu.id)
+    ).all()
+    if not rows:
         return None
 
+    def stats(row):
+        return {
+            "dishes_count": row[2],
+            "min_price": row[3],
+            "max_price": row[4],
+            "avg_price": format_price(row[5]),
+        }
+
+    total, *submenus = rows
+    return {
+        "menu_id": menu_id,
+        **stats(total),
+        "submenus": [{"submenu_id": row[0], **stats(row)} for row in submenus if row[0] is not None],
+    }
+
+
+def get_dishes(db: Session, dish_id: str, submenu_id: str = None, menu_id: str = None):
+    """
+    Получает данные о конкретном блюде из кэша или базы данных.
+
+    Блюдо ищется по первичному ключу; если переданы submenu_id и menu_id,
+    то только в этом подменю, и результат кэшируется.
+
+    :param db: Сессия базы данных.
+    :param dish_id: Идентификатор блюда.
+    :param submenu_id: Идентификатор подменю.
+    :param menu_id: Идентификатор меню.
+    :return: Данные о блюде.
+    """
+    def load():
+        query = select(*DISH_COLUMNS).where(Dish.id == dish_id)
+        if submenu_id is not None:
+            query = query.where(Dish.submenu_id == submenu_id)
+        if menu_id is not None:
+            query = query.where(Dish.menu_id == menu_id)
+        dish = db.execute(query).first()
+        return dict(dish._mapping) if dish else None
+
+    if submenu_id is None or menu_id is None:
+        return load()
+    return cache.cached(cache.dish_key(menu_id, submenu_id, dish_id), load, bypass=_bypasses_cache(db))
+
+
+# Наибольшее число id в одном запросе пачкой
+MAX_BATCH_IDS = 100
+
+
+def _get_by_ids(db: Session, columns, ids):
+    """
+    Получает строки по списку id одним запросом WHERE id = ANY(:ids).
+
+    :param db: Сессия базы данных.
+    :param columns: Колонки выборки, первая из них - id.
+    :param ids: Идентификаторы в порядке запроса; повторы отбрасываются.
+    :return: Пара (строки в порядке ids, id, которых нет в базе данных).
+    """
+    requested = {}
+    for value in ids:
+        requested.setdefault(canonical_id(value), value)
+    if not requested:
+        return [], []
+    rows = db.execute(
+        select(*columns).where(columns[0] == any_(bindparam("ids", list(requested), type_=ARRAY(UUIDString()))))
+    ).all()
+    found = {row[0]: row for row in rows}
+    return (
+        [found[canonical] for canonical in requested if canonical in found],
+        [value for canonical, value in requested.items() if canonical not in found],
+    )
+
+
+def get_submenus_by_ids(db: Session, ids):
+    """
+    Получает подменю по списку идентификаторов одним запросом.
+
+    :param db: Сессия базы данных.
+    :param ids: Идентификаторы подменю.
+    :return: Пара (строки SUBMENU_COLUMNS в порядке ids, отсутствующие id).
+    """
+    return _get_by_ids(db, SUBMENU_COLUMNS, ids)
+
+
+def get_dishes_by_ids(db: Session, ids):
+    """
+    Получает блюда по списку идентификаторов одним запросом.
+
+    :param db: Сессия базы данных.
+    :param ids: Идентификаторы блюд.
+    :return: Пара (строки DISH_COLUMNS в порядке ids, отсутствующие id).
+    """
+    return _get_by_ids(db, DISH_COLUMNS, ids)
+
+
+SEARCH_WORD = re.compile(r"\w+")
+
+# Установлено ли расширение pg_trgm; проверяется один раз на процесс
+_trigram_enabled = None
+
+
+def search_tsquery(q: str):
+    """
+    Строка для to_tsquery: все слова запроса, последнее - как префикс.
+
+    Из запроса берутся только буквы и цифры, поэтому операторы tsquery
+    пользователем не передаются. Пустая строка - в запросе нет слов.
+    """
+    words = SEARCH_WORD.findall(q.lower())
+    if not words:
+        return ""
+    return " & ".join([*words[:-1], f"{words[-1]}:*"])
+
+
+def trigram_enabled(db: Session):
+    """Проверяет (один раз на процесс), установлено ли в БД расширение pg_trgm."""
+    global _trigram_enabled
+    if _trigram_enabled is None:
+        _trigram_enabled = db.execute(
+            text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+        ).scalar()
+    return _trigram_enabled
+
+
+def _search_select(model, columns: dict, conditions, tsquery, q: str, trigram: bool, limit: int, after=None):
+    """
+    Страница совпадений одной модели с рангом.
+
+    Совпадения находятся по GIN-индексу поискового вектора и, если есть
+    pg_trgm, по похожести названия. Ранг считается для всех совпадений,
+    поэтому время запроса растет с их числом; keyset-условие и LIMIT
+    применяются прямо в подзапросе, так что сортировка top-N держит в
+    памяти не больше limit строк, а выдачу можно листать до конца.
+
+    :param model: Класс модели.
+    :param columns: Колонки результата по именам.
+    :param conditions: Дополнительные условия (область поиска).
+    :param limit: Наибольшее число строк.
+    :param after: Пара (ранг, id) последней строки предыдущей страницы.
+    :return: SELECT колонок columns и rank.
+    """
+    match = model.search_vector.op("@@", is_comparison=True)(tsquery)
+    if trigram:
+        match = or_(match, literal(q).op("<%", is_comparison=True)(model.title))
+    rank = func.ts_rank_cd(model.search_vector, tsquery, type_=Float)
+    if trigram:
+        rank = rank + func.word_similarity(q, model.title, type_=Float)
+    conditions = [match, *conditions]
+    if after is not None:
+        last_rank, last_id = after
+        conditions.append(or_(rank < last_rank, and_(rank == last_rank, model.id > last_id)))
+    candidates = (
+        select(*(column.label(name) for name, column in columns.items()), rank.label("rank"))
+        .where(*conditions)
+        .order_by(rank.desc(), model.id)
+        .limit(limit)
+        .subquery()
+    )
+    return select(*(candidates.c[name] for name in columns), candidates.c.rank)
+
+
+def search(
+    db: Session, q: str, menu_id: str = None, submenu_id: str = None, limit: int = DEFAULT_LIMIT, cursor: str = None
+):
+    """
+    Ищет подменю и блюда по названию и описанию.
+
+    Результаты упорядочены по убыванию ранга (совпадение в названии весит
+    больше, чем в описании), страница выбирается keyset-условием по (рангу, id)
+    отдельно для подменю и для блюд, после чего страницы сливаются.
+
+    :param db: Сессия базы данных.
+    :param q: Поисковый запрос.
+    :param menu_id: Искать только в этом меню.
+    :param submenu_id: Искать только блюда этого подменю.
+    :param limit: Размер страницы.
+    :param cursor: Курсор, полученный с предыдущей страницей.
+    :return: Пара (строки type, id, menu_id, submenu_id, title, description, price, rank;
+        курсор следующей страницы).
+    """
+    words = search_tsquery(q)
+    if not words:
+        return [], None
+    tsquery = func.to_tsquery(SEARCH_CONFIG, words)
+    trigram = trigram_enabled(db)
+    after = decode_sorted_cursor(cursor, float) if cursor is not None else None
+
+    conditions = []
+    if menu_id is not None:
+        conditions.append(Dish.menu_id == menu_id)
+    if submenu_id is not None:
+        conditions.append(Dish.submenu_id == submenu_id)
+    dish_columns = {
+        "type": literal("dish"), "id": Dish.id, "menu_id": Dish.menu_id, "submenu_id": Dish.submenu_id,
+        "title": Dish.title, "description": Dish.description, "price": Dish.price,
+    }
+    selects = [_search_select(Dish, dish_columns, conditions, tsquery, q, trigram, limit + 1, after)]
+
+    if submenu_id is None:
+        conditions = [Submenu.menu_id == menu_id] if menu_id is not None else []
+        submenu_columns = {
+            "type": literal("submenu"), "id": Submenu.id, "menu_id": Submenu.menu_id, "submenu_id": cast(None, UUIDString),
+            "title": Submenu.title, "description": Submenu.description, "price": cast(None, Price),
+        }
+        selects.append(_search_select(Submenu, submenu_columns, conditions, tsquery, q, trigram, limit + 1, after))
+
+    results = union_all(*selects).subquery("results")
+    rows = db.execute(select(results).order_by(results.c.rank.desc(), results.c.id).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_sorted_cursor(rows[-1].rank, rows[-1].id)
+    return rows, None
+
+
+def _probe_version(db: Session, key: str, query):
+    """
+    Возвращает id и версию объекта из кэша или легким запросом без загрузки строки.
+
+    :param db: Сессия базы данных.
+    :param key: Ключ кэша объекта.
+    :param query: SELECT id, version для промаха кэша.
+    :return: Словарь с id и version или None.
+    """
+    cached_value = None if _bypasses_cache(db) else cache.get_backend().get(key)
+    if cached_value is not None:
+        return {"id": cached_value["id"], "version": cached_value["version"]}
+    row = db.execute(query).first()
+    return dict(row._mapping) if row else None
 
-def get_all_dishes(db: Session, submenu_id: str):
+
+def get_menu_version(db: Session, menu_id: str):
     """
-    Получает все блюда из базы данных для конкретного подменю.
+    Получает версию меню для проверки If-None-Match.
     """
-    return db.query(Dish).filter(Dish.submenu_id == submenu_id).all()
+    return _probe_version(
+        db,
+        cache.menu_key(menu_id),
+        select(Menu.id, Menu.version).where(Menu.id == menu_id),
+    )
 
 
-def get_dishes(db: Session, submenu_id: str):
+def get_submenu_version(db: Session, submenu_id: str, menu_id: str):
     """
-    Получает данные о конкретном блюде из базы данных.
+    Получает версию подменю для проверки If-None-Match.
     """
-    return db.query(Dish).filter(Dish.submenu_id == submenu_id).first()
+    return _probe_version(
+        db,
+        cache.submenu_key(menu_id, submenu_id),
+        select(Submenu.id, Submenu.version).where(Submenu.id == submenu_id, Submenu.menu_id == menu_id),
+    )
+
+
+def get_dish_version(db: Session, dish_id: str, submenu_id: str, menu_id: str):
+    """
+    Получает версию блюда для проверки If-None-Match.
+    """
+    return _probe_version(
+        db,
+        cache.dish_key(menu_id, submenu_id, dish_id),
+        select(Dish.id, Dish.version).where(
+            Dish.id == dish_id, Dish.submenu_id == submenu_id, Dish.menu_id == menu_id
+        ),
+    )
+
+
+UPDATABLE_COLUMNS = {
+    Menu: ("title", "description"),
+    Submenu: ("title", "description"),
+    Dish: ("title", "description", "price"),
+}
+
+
+def _update_returning(db: Session, model: Base, object_id: str, updated_data: dict):
+    """
+    Обновляет объект одним запросом UPDATE ... RETURNING.
+
+    Применяются только колонки из UPDATABLE_COLUMNS, остальные ключи игнорируются.
+    Версия объекта увеличивается в том же запросе.
+
+    :return: Словарь с колонками обновленного объекта или None, если его нет.
+    """
+    values = {key: value for key, value in updated_data.items() if key in UPDATABLE_COLUMNS[model]}
+    if values:
+        statement = (
+            update(model)
+            .where(model.id == object_id)
+            .values(**values, version=model.version + 1)
+            .returning(*_row_columns(model))
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        statement = select(*_row_columns(model)).where(model.id == object_id)
+    row = db.execute(statement).first()
+    if row is None:
+        db.rollback()
+        return None
+    if values:
+        _emit_change(db, "updated", model, row)
+    scope = _cache_scope(model, row)
+    db.commit()
+    _invalidate(scope)
+    return dict(row._mapping)
 
 
 def update_object(db: Session, model: Base, object_id: str, updated_data: dict):
@@ -130,15 +907,9 @@ def update_object(db: Session, model: Base, object_id: str, updated_data: dict):
     :param model: Класс модели.
     :param object_id: Идентификатор объекта.
     :param updated_data: Обновленные данные для объекта.
-    :return: Обновленный объект модели.
-    """
-    db_object = db.query(model).filter(model.id == object_id).first()
-    if db_object:
-        for key, value in updated_data.items():
-            setattr(db_object, key, value)
-        db.commit()
-        db.refresh(db_object)
-    return db_object
+    :return: Обновленные данные объекта.
+    """
+    return _update_returning(db, model, object_id, updated_data)
 
 
 def update_menu(db: Session, menu_id: str, updated_data: dict):
@@ -166,20 +937,32 @@ def delete_object(db: Session, model: Base, object_id: str):
     """
     Удаляет конкретный объект модели из базы данных.
 
+    Объект не загружается: выполняется один DELETE ... RETURNING, дочерние
+    подменю и блюда удаляет сама БД по внешним ключам ON DELETE CASCADE.
+
     :param db: Сессия базы данных.
     :param model: Класс модели.
     :param object_id: Идентификатор объекта.
     :return: Словарь с информацией об удалении объекта.
     """
-    db_object = db.query(model).filter(model.id == object_id).first()
-    if db_object:
-        db.delete(db_object)
-        db.commit()
-        return {
-            "status": "true",
-            "message": f"The {model.__tablename__.lower()} has been deleted"
-        }
-    return None
+    deleted = db.execute(
+        delete(model)
+        .where(model.id == object_id)
+        .returning(*_row_columns(model))
+        .execution_options(synchronize_session=False)
+    ).first()
+    if deleted is None:
+        db.rollback()
+        return None
+    _adjust_counters(db, model, deleted, -1)
+    _emit_change(db, "deleted", model, deleted)
+    scope = _cache_scope(model, deleted)
+    db.commit()
+    _invalidate(scope)
+    return {
+        "status": "true",
+        "message": f"The {model.__tablename__.lower()} has been deleted"
+    }
 
 
 def delete_menu(db: Session, menu_id: str):
@@ -211,15 +994,9 @@ def partial_update_object(db: Session, model: Base, object_id: str, updated_data
     :param model: Класс модели.
     :param object_id: Идентификатор объекта.
     :param updated_data: Частично обновленные данные для объекта.
-    :return: Обновленный объект модели.
-    """
-    db_object = db.query(model).filter(model.id == object_id).first()
-    if db_object:
-        for key, value in updated_data.items():
-            setattr(db_object, key, value)
-        db.commit()
-        db.refresh(db_object)
-    return db_object
+    :return: Обновленные данные объекта.
+    """
+    return _update_returning(db, model, object_id, updated_data)
 
 
 def partial_update_menu(db: Session, menu_id: str, updated_data: dict):
@@ -243,32 +1020,39 @@ def partial_update_dish(db: Session, dish_id: str, updated_data: dict):
     return partial_update_object(db, Dish, dish_id, updated_data)
 
 
-def get_menu_complex(db: Session, menu_id: str):
+def recount_counters(db: Session):
     """
-    Получает данные о конкретном меню из базы данных, используя сложный ORM-запрос.
+    Пересчитывает денормализованные счетчики меню и подменю по фактическим данным.
+
+    Используется для восстановления счетчиков после ручных правок БД
+    или иного рассогласования. Версии строк увеличиваются, чтобы клиенты
+    с закэшированными ETag получили исправленные данные. Вместе с коммитом
+    уходит событие resync: каждый воркер очищает свой кэш и снимки в памяти,
+    а подписчики ленты изменений перечитывают меню; общий кэш (Redis)
+    и файловые снимки очищаются здесь же.
 
     :param db: Сессия базы данных.
-    :param menu_id: Идентификатор меню.
-    :return: Данные о меню.
     """
-    menu_data = (
-        db.query(Menu.id, Menu.title, Menu.description)
-        .add_column(func.count(Submenu.id).label("submenus_count"))
-        .add_column(func.sum(func.count(Dish.id)).label("dishes_count"))
-        .outerjoin(Submenu)
-        .outerjoin(Dish, Submenu.id == Dish.submenu_id)
-        .filter(Menu.id == menu_id)
-        .group_by(Menu.id)
-        .first()
+    db.execute(
+        update(Submenu).values(
+            dishes_count=select(func.count(Dish.id))
+            .where(Dish.submenu_id == Submenu.id)
+            .scalar_subquery(),
+            version=Submenu.version + 1,
+        )
     )
-
-    if menu_data:
-        return {
-            "id": menu_data.id,
-            "title": menu_data.title,
-            "description": menu_data.description,
-            "submenus_count": menu_data.submenus_count or 0,
-            "dishes_count": menu_data.dishes_count or 0,
-        }
-    else:
-        return None
+    db.execute(
+        update(Menu).values(
+            submenus_count=select(func.count(Submenu.id))
+            .where(Submenu.menu_id == Menu.id)
+            .scalar_subquery(),
+            dishes_count=select(func.coalesce(func.sum(Submenu.dishes_count), 0))
+            .where(Submenu.menu_id == Menu.id)
+            .scalar_subquery(),
+            version=Menu.version + 1,
+        )
+    )
+    events.emit(db, events.RESYNC)
+    db.commit()
+    cache.get_backend().clear()
+    snapshots.get_store().clear()
@@ -1,8 +1,13 @@
+import itertools
 import os
+import time
+from threading import Lock, RLock
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import DeclarativeMeta, declarative_base
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from dotenv import load_dotenv
 
 # Загрузка переменных окружения из файла .env
@@ -11,11 +16,253 @@ load_dotenv()
 # Получение URL для подключения к базе данных из переменных окружения
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# Создание подключения к базе данных
-engine = create_engine(DATABASE_URL)
+# Адреса реплик только для чтения через запятую; по умолчанию реплик нет
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
 
-# Создание сессии базы данных
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Асинхронные драйверы для синхронных диалектов из DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
 
-# Создание базового класса для моделей SQLAlchemy
-Base: DeclarativeMeta = declarative_base()
+
+def async_database_url(url: str):
+    """Возвращает URL с асинхронным драйвером для того же сервера БД."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+# URL для асинхронного подключения; не задан - выводится из DATABASE_URL при создании движка
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+
+def get_async_database_url():
+    """URL асинхронного подключения: ASYNC_DATABASE_URL или DATABASE_URL с асинхронным драйвером."""
+    return ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+
+# Пул соединений: queue (по умолчанию) или null.
+# null открывает соединение на каждую сессию и нужен, когда запросы
+# выполняются в разных циклах событий (например, TestClient без контекста).
+DB_POOL_CLASS = os.getenv("DB_POOL_CLASS", "queue")
+
+# Настройки пула соединений
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Общий лимит соединений всех воркеров (обычно часть max_connections PostgreSQL)
+# и число воркеров uvicorn; из них получается бюджет соединений на процесс
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def pool_budget(pool_size: int, max_overflow: int, max_connections: int, workers: int):
+    """
+    Ограничивает размер пула бюджетом соединений на процесс.
+
+    Бюджет равен max_connections // workers; сначала урезается overflow,
+    затем постоянная часть пула. Нулевой max_connections отключает ограничение.
+
+    :return: Пара (pool_size, max_overflow).
+    """
+    if max_connections <= 0:
+        return pool_size, max_overflow
+    budget = max(1, max_connections // max(1, workers))
+    pool_size = min(pool_size, budget)
+    return pool_size, max(0, min(max_overflow, budget - pool_size))
+
+
+class PoolWaitStats:
+    """Статистика ожидания соединений из пула."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = Lock()
+
+    def record(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def as_dict(self):
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_total_ms": round(self.wait_total * 1000, 3),
+            "wait_avg_ms": round(self.wait_total * 1000 / self.checkouts, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+        }
+
+
+class TimedPoolMixin:
+    """Замеряет время получения соединения из пула, включая ожидание свободного."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """QueuePool со статистикой ожидания."""
+
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool со статистикой ожидания."""
+
+
+def pool_options(queue_pool_class):
+    """Возвращает аргументы create_engine для пула из переменных окружения."""
+    if DB_POOL_CLASS == "null":
+        return {"poolclass": NullPool, "pool_pre_ping": DB_POOL_PRE_PING}
+    pool_size, max_overflow = pool_budget(DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_MAX_CONNECTIONS, WEB_CONCURRENCY)
+    return {
+        "poolclass": queue_pool_class,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def pool_status(engine):
+    """
+    Возвращает состояние пула соединений движка.
+
+    :param engine: Синхронный или асинхронный движок.
+    :return: Словарь с размером пула, занятыми соединениями, overflow и временем ожидания.
+    """
+    pool = getattr(engine, "sync_engine", engine).pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "timeout": pool.timeout(),
+        })
+    if isinstance(pool, TimedPoolMixin):
+        status.update(pool.wait_stats.as_dict())
+    return status
+
+
+_engines = {}
+_engines_lock = RLock()
+_replica_turn = itertools.count()
+
+
+def _lazy(name: str, factory):
+    """Создает объект при первом обращении и дальше возвращает его же."""
+    value = _engines.get(name)
+    if value is None:
+        with _engines_lock:
+            value = _engines.get(name)
+            if value is None:
+                value = _engines[name] = factory()
+    return value
+
+
+def get_engine():
+    """Синхронный движок; создается при первом обращении, без подключения к БД."""
+    return _lazy("engine", lambda: create_engine(DATABASE_URL, **pool_options(TimedQueuePool)))
+
+
+def get_async_engine():
+    """Асинхронный движок (asyncpg); создается при первом обращении, без подключения к БД."""
+    return _lazy(
+        "async_engine", lambda: create_async_engine(get_async_database_url(), **pool_options(TimedAsyncQueuePool))
+    )
+
+
+def get_sessionmaker():
+    """Фабрика синхронных сессий."""
+    return _lazy("sessionmaker", lambda: sessionmaker(autocommit=False, autoflush=False, bind=get_engine()))
+
+
+def get_async_sessionmaker():
+    """Фабрика асинхронных сессий."""
+    return _lazy(
+        "async_sessionmaker",
+        lambda: async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False),
+    )
+
+
+def SessionLocal(**kwargs):
+    """Создает синхронную сессию базы данных."""
+    return get_sessionmaker()(**kwargs)
+
+
+def AsyncSessionLocal(**kwargs):
+    """Создает асинхронную сессию базы данных."""
+    return get_async_sessionmaker()(**kwargs)
+
+
+def get_replica_engines():
+    """Асинхронные движки реплик из DATABASE_REPLICA_URLS; пустой список, если реплик нет."""
+    return _lazy("replica_engines", lambda: [
+        create_async_engine(async_database_url(url), **pool_options(TimedAsyncQueuePool))
+        for url in DATABASE_REPLICA_URLS
+    ])
+
+
+def get_replica_sessionmakers():
+    """Фабрики асинхронных сессий реплик."""
+    return _lazy("replica_sessionmakers", lambda: [
+        async_sessionmaker(engine, autoflush=False, expire_on_commit=False) for engine in get_replica_engines()
+    ])
+
+
+def ReplicaSessionLocal(**kwargs):
+    """Создает асинхронную сессию на очередной реплике (по кругу); без реплик - на основной БД."""
+    sessionmakers = get_replica_sessionmakers()
+    if not sessionmakers:
+        return AsyncSessionLocal(**kwargs)
+    return sessionmakers[next(_replica_turn) % len(sessionmakers)](**kwargs)
+
+
+def created_engines():
+    """Уже созданные движки (синхронный и асинхронный) без создания новых."""
+    return {name: _engines[name] for name in ("engine", "async_engine") if name in _engines}
+
+
+async def dispose_engines():
+    """Закрывает пулы соединений созданных движков и забывает движки."""
+    with _engines_lock:
+        engines = dict(_engines)
+        _engines.clear()
+    for engine in engines.get("replica_engines", []):
+        await engine.dispose()
+    if "async_engine" in engines:
+        await engines["async_engine"].dispose()
+    if "engine" in engines:
+        engines["engine"].dispose()
+
+
+def __getattr__(name: str):
+    # Прежние имена модуля: движки создаются при первом обращении к ним
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,287 @@
+"""
+Лента изменений меню.
+
+Функции записи app.crud сообщают о создании, изменении и удалении меню,
+подменю и блюд через emit(db, event), а GET /api/v1/menus/{menu_id}/events
+отдает события меню подписчикам потоком Server-Sent Events.
+
+Бэкенд выбирается переменной EVENTS_BACKEND:
+
+- postgres (по умолчанию): emit выполняет pg_notify в транзакции записи,
+  поэтому событие уходит только после коммита и только вместе с ним.
+  Каждый воркер держит одно соединение с LISTEN на канале EVENTS_CHANNEL
+  и раздает полученные события своим подписчикам;
+- memory: события раздаются подписчикам этого же процесса после коммита
+  (тесты и один воркер).
+
+Кроме подписчиков, каждое событие процесса получают слушатели add_listener:
+так app.crud сбрасывает кэш в памяти воркеров, которые не выполняли запись.
+
+Подписчик - ограниченная очередь в памяти, без соединения с БД, поэтому
+тысячи простаивающих потоков стоят только памяти под очереди. Если
+подписчик не успевает забирать события или соединение LISTEN
+переподключалось и события могли потеряться, подписчик получает событие
+resync: клиенту нужно перечитать меню.
+"""
+import asyncio
+import json
+import logging
+import os
+from threading import Lock
+
+from sqlalchemy import event as sa_event, func, make_url, select
+from sqlalchemy.orm import Session
+
+from app import database
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "postgres")
+EVENTS_CHANNEL = os.getenv("EVENTS_CHANNEL", "menu_events")
+# Размер очереди подписчика, после которого он получает resync
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+# Пауза перед повторным подключением LISTEN и интервал проверки соединения, секунды
+EVENTS_RECONNECT_SECONDS = float(os.getenv("EVENTS_RECONNECT_SECONDS", "1"))
+EVENTS_KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", "15"))
+
+RESYNC = {"type": "resync"}
+# Ограничение Postgres на размер сообщения NOTIFY, байт
+NOTIFY_MAX_PAYLOAD = 7999
+# Ключ Session.info с событиями, ждущими коммита (memory-бэкенд)
+PENDING_KEY = "pending_events"
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Подписка на события меню: очередь в цикле событий подписчика."""
+
+    def __init__(self, menu_id: str, maxsize: int = EVENTS_QUEUE_SIZE):
+        self.menu_id = menu_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize)
+
+    def push(self, event: dict):
+        """Кладет событие в очередь; переполненная очередь заменяется одним resync."""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        """Ждет следующее событие."""
+        return await self.queue.get()
+
+
+_subscriptions = {}
+_subscriptions_lock = Lock()
+_listeners = []
+
+
+def subscribe(menu_id: str):
+    """Подписывает текущий цикл событий на события меню."""
+    subscription = Subscription(menu_id)
+    with _subscriptions_lock:
+        _subscriptions.setdefault(menu_id, set()).add(subscription)
+    return subscription
+
+
+def unsubscribe(subscription: Subscription):
+    """Отменяет подписку."""
+    with _subscriptions_lock:
+        subscriptions = _subscriptions.get(subscription.menu_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del _subscriptions[subscription.menu_id]
+
+
+def subscribers_count():
+    """Число подписок во всех меню процесса."""
+    with _subscriptions_lock:
+        return sum(len(subscriptions) for subscriptions in _subscriptions.values())
+
+
+def add_listener(callback):
+    """Регистрирует функцию, которая вызывается с каждым событием процесса, включая resync."""
+    _listeners.append(callback)
+
+
+def _notify_listeners(event: dict):
+    for callback in _listeners:
+        try:
+            callback(event)
+        except Exception:
+            logger.exception("Events listener %r failed", callback)
+
+
+def _deliver(subscriptions, event: dict):
+    # Очередь asyncio не потокобезопасна: в чужой цикл событие передается через call_soon_threadsafe
+    try:
+        current_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        current_loop = None
+    for subscription in subscriptions:
+        if subscription.loop is current_loop:
+            subscription.push(event)
+        elif not subscription.loop.is_closed():
+            subscription.loop.call_soon_threadsafe(subscription.push, event)
+
+
+def dispatch(event: dict):
+    """Раздает событие слушателям и подписчикам его меню в этом процессе; resync - всем."""
+    if event["type"] == RESYNC["type"]:
+        dispatch_resync()
+        return
+    _notify_listeners(event)
+    with _subscriptions_lock:
+        subscriptions = list(_subscriptions.get(event["menu_id"], ()))
+    _deliver(subscriptions, event)
+
+
+def dispatch_resync():
+    """Раздает resync слушателям и всем подписчикам процесса."""
+    _notify_listeners(RESYNC)
+    with _subscriptions_lock:
+        subscriptions = [s for menu_subscriptions in _subscriptions.values() for s in menu_subscriptions]
+    _deliver(subscriptions, RESYNC)
+
+
+def format_sse(event: dict):
+    """Форматирует событие сообщением Server-Sent Events."""
+    return f"data: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_pending(session):
+    for pending in session.info.pop(PENDING_KEY, []):
+        dispatch(pending)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+class MemoryBackend:
+    """События в пределах процесса: раздаются подписчикам после коммита записи."""
+
+    def emit(self, db: Session, event: dict):
+        db.info.setdefault(PENDING_KEY, []).append(event)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class PostgresBackend:
+    """
+    События через LISTEN/NOTIFY: pg_notify в транзакции записи, одно
+    соединение LISTEN на процесс.
+
+    Соединение LISTEN открывается asyncpg напрямую, мимо пулов приложения;
+    оборванное соединение переоткрывается через EVENTS_RECONNECT_SECONDS,
+    а подписчики получают resync. Событие listening установлено, пока
+    соединение слушает канал.
+    """
+
+    def __init__(self, url: str = None, channel: str = EVENTS_CHANNEL):
+        self.url = url
+        self.channel = channel
+        self.listening = None
+        self._task = None
+
+    def emit(self, db: Session, event: dict):
+        payload = json.dumps(event, separators=(",", ":"))
+        if len(payload.encode()) > NOTIFY_MAX_PAYLOAD:
+            # Полей объекта нет в событии: подписчики перечитают его сами
+            payload = json.dumps({key: value for key, value in event.items() if key != "data"}, separators=(",", ":"))
+        db.execute(select(func.pg_notify(self.channel, payload)))
+
+    def _on_notification(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Invalid %s payload: %r", channel, payload)
+            return
+        dispatch(event)
+
+    def _dsn(self):
+        url = make_url(self.url or database.get_async_database_url())
+        return url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+    async def _listen(self):
+        import asyncpg
+
+        connected_before = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self._dsn())
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                self.listening.set()
+                if connected_before:
+                    dispatch_resync()
+                connected_before = True
+                while not closed.is_set():
+                    try:
+                        await asyncio.wait_for(closed.wait(), EVENTS_KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        await connection.execute("SELECT 1")
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as error:
+                logger.warning("LISTEN %s connection lost: %s", self.channel, error)
+            finally:
+                self.listening.clear()
+                if connection is not None:
+                    connection.terminate()
+            await asyncio.sleep(EVENTS_RECONNECT_SECONDS)
+
+    async def start(self):
+        """Запускает фоновое соединение LISTEN, не дожидаясь подключения к БД."""
+        if self._task is None:
+            self.listening = asyncio.Event()
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        """Останавливает соединение LISTEN."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_backend = None
+
+
+def create_backend(name: str = EVENTS_BACKEND):
+    """Создает бэкенд событий по имени."""
+    if name == "postgres":
+        return PostgresBackend()
+    if name == "memory":
+        return MemoryBackend()
+    raise ValueError(f"Unknown events backend: {name}")
+
+
+def get_backend():
+    """Возвращает текущий бэкенд событий, создавая его при первом обращении."""
+    global _backend
+    if _backend is None:
+        _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend):
+    """Подменяет бэкенд событий (например, в тестах)."""
+    global _backend
+    _backend = backend
+
+
+def emit(db: Session, event: dict):
+    """Отправляет событие изменения в транзакции записи; подписчики получат его после коммита."""
+    get_backend().emit(db, event)
@@ -1,33 +1,104 @@
-from fastapi import FastAPI, Depends, HTTPException, status, APIRouter
-from sqlalchemy.orm import Session
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+from decimal import Decimal
+from contextlib import asynccontextmanager
+from typing import Annotated
 
-from app.models import Base
-from app.database import SessionLocal, engine
+from fastapi import FastAPI, Depends, HTTPException, status, APIRouter, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.crud import (
-    create_menu, create_submenu, create_dish,
-    get_all_menus, get_menu, get_all_submenus, get_submenu, get_all_dishes, get_dishes,
+from app.crud import DISH_ORDERS, EXPORT_COLUMNS, MAX_BATCH_IDS
+from app import cache, database, events, metrics, read_routing, snapshots
+from app.pagination import DEFAULT_LIMIT, MAX_LIMIT, InvalidCursor
+
+from app.async_crud import (
+    create_menu, create_submenu, create_dish, import_menus, insert_menu_documents,
+    get_all_menus, get_menu, publish_snapshot, get_all_submenus, get_submenu, get_all_dishes, get_dishes,
+    get_submenus_by_ids, get_dishes_by_ids, search, get_price_stats,
+    get_menu_version, get_submenu_version, get_dish_version,
     update_menu, update_submenu, update_dish,
     delete_menu, delete_submenu, delete_dish,
-    partial_update_menu, partial_update_submenu, partial_update_dish
+    partial_update_menu, partial_update_submenu, partial_update_dish,
+    stream_export_rows, stream_menu_tree_rows
 )
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError
 
-app = FastAPI()
+# Время ожидания ответа БД в проверке готовности, секунды
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))
+# Наибольшая длительность потока событий, секунды: клиент SSE переподключается сам
+EVENTS_STREAM_SECONDS = float(os.getenv("EVENTS_STREAM_SECONDS", "3600"))
+# Пауза перед переподключением клиента SSE, миллисекунды
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
 
-def init_db():
-    """Инициализация базы данных."""
-    Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-init_db()
+def warn_process_local_state():
+    """
+    Предупреждает о кэше и снимках в памяти процесса при нескольких воркерах без ленты изменений Postgres.
 
-def get_db():
-    """Зависимость для получения сессии базы данных."""
-    db = SessionLocal()
-    try:
+    Их сбрасывают записи только своего процесса, остальные воркеры узнают
+    о записях из LISTEN/NOTIFY (EVENTS_BACKEND=postgres).
+    """
+    if database.WEB_CONCURRENCY <= 1 or isinstance(events.get_backend(), events.PostgresBackend):
+        return
+    if cache.get_backend().local:
+        logger.warning(
+            "CACHE_BACKEND=memory with WEB_CONCURRENCY=%d and no Postgres events backend: "
+            "other workers will serve stale responses; use CACHE_BACKEND=redis or EVENTS_BACKEND=postgres",
+            database.WEB_CONCURRENCY,
+        )
+    if snapshots.get_store().local:
+        logger.warning(
+            "SNAPSHOT_DIR is not set with WEB_CONCURRENCY=%d and no Postgres events backend: "
+            "other workers will serve stale snapshots for up to SNAPSHOT_TTL; set SNAPSHOT_DIR or EVENTS_BACKEND=postgres",
+            database.WEB_CONCURRENCY,
+        )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Жизненный цикл приложения.
+
+    При старте создается движок БД (без подключения: соединения открываются
+    первыми запросами) и в фоне запускается бэкенд ленты изменений, при
+    остановке он останавливается, а пулы соединений закрываются.
+    Схема БД на старте не создается и не проверяется - ею управляют
+    миграции (alembic upgrade head) до запуска приложения.
+    """
+    database.get_async_engine()
+    await events.get_backend().start()
+    warn_process_local_state()
+    yield
+    await events.get_backend().stop()
+    await database.dispose_engines()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(read_routing.ReadYourWritesMiddleware)
+metrics.instrument_engine()
+
+async def get_db(request: Request):
+    """
+    Зависимость для получения асинхронной сессии базы данных.
+
+    Чтения идут на реплику, записи и чтения сразу после своей записи - на основную БД
+    (такие чтения идут и мимо кэша).
+    """
+    async with read_routing.session_factory(request.method, request.cookies)() as db:
+        if read_routing.bypasses_cache(request.method, request.cookies):
+            db.info[cache.BYPASS_KEY] = True
         yield db
-    finally:
-        db.close()
+
+# Цена блюда в пределах колонки NUMERIC(10, 2): не отрицательная, не больше 99999999.99
+DishPrice = Annotated[Decimal, Field(ge=0, max_digits=10, decimal_places=2)]
 
 class MenuCreate(BaseModel):
     """Модель для создания меню."""
@@ -43,107 +114,602 @@ class DishCreate(BaseModel):
     """Модель для создания блюда."""
     title: str
     description: str
-    price: float
+    price: DishPrice
+
+class MenuUpdate(BaseModel):
+    """Модель для изменения меню: меняются только переданные поля, null недопустим."""
+    title: str = None
+    description: str = None
+
+class SubmenuUpdate(BaseModel):
+    """Модель для изменения подменю: меняются только переданные поля, null недопустим."""
+    title: str = None
+    description: str = None
+
+class DishUpdate(BaseModel):
+    """Модель для изменения блюда: меняются только переданные поля, null недопустим."""
+    title: str = None
+    description: str = None
+    price: DishPrice = None
+
+class SubmenuImport(SubmenuCreate):
+    """Модель подменю с блюдами для импорта."""
+    dishes: list[DishCreate] = []
+
+class MenuImport(MenuCreate):
+    """Модель меню с подменю и блюдами для импорта."""
+    submenus: list[SubmenuImport] = []
+
+MenuImportList = TypeAdapter(list[MenuImport])
+
+class MenuOut(BaseModel):
+    """Модель ответа с меню."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    title: str
+    description: str
+    submenus_count: int
+    dishes_count: int
+
+class SubmenuOut(BaseModel):
+    """Модель ответа с подменю."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    title: str
+    description: str
+    dishes_count: int
+
+class DishOut(BaseModel):
+    """Модель ответа с блюдом."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    title: str
+    description: str
+    price: str
+
+class SearchResultOut(BaseModel):
+    """Модель ответа с результатом поиска: подменю или блюдо."""
+    type: str
+    id: str
+    menu_id: str
+    submenu_id: str | None
+    title: str
+    description: str
+    price: str | None
+    rank: float
+
+class PriceStats(BaseModel):
+    """Модель ответа со статистикой цен блюд."""
+    dishes_count: int
+    min_price: str | None
+    max_price: str | None
+    avg_price: str | None
+
+class SubmenuPriceStats(PriceStats):
+    """Модель ответа со статистикой цен блюд подменю."""
+    submenu_id: str
+
+class MenuPriceStats(PriceStats):
+    """Модель ответа со статистикой цен блюд меню и каждого его подменю."""
+    menu_id: str
+    submenus: list[SubmenuPriceStats]
+
+class SubmenuBatch(BaseModel):
+    """Модель ответа с подменю по списку id."""
+    items: list[SubmenuOut]
+    missing: list[str]
+
+class DishBatch(BaseModel):
+    """Модель ответа с блюдами по списку id."""
+    items: list[DishOut]
+    missing: list[str]
+
+IMPORT_NDJSON_BATCH = 100
+
+async def read_ndjson_menus(request: Request):
+    """Читает тело NDJSON построчно и отдает проверенные документы меню."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield MenuImport.model_validate_json(line).model_dump()
+    if buffer.strip():
+        yield MenuImport.model_validate_json(buffer).model_dump()
+
+async def read_page(page_func, *args, **kwargs):
+    """Получает строки страницы и курсор следующей, отвечая 400 на неверный курсор."""
+    try:
+        return await page_func(*args, **kwargs)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail='invalid cursor')
+
+def page_response(model, rows, next_cursor: str = None, etag: str = None):
+    """
+    Собирает ответ со страницей прямо из кортежей строк.
+
+    Колонки строки идут в порядке полей модели ответа, лишние колонки
+    в конце строки (например, версия) отбрасываются. Проверка модели и
+    jsonable_encoder не выполняются, список сразу сериализуется orjson.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor,
+    тело ответа остается списком, как и без пагинации.
+    """
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag is not None:
+        headers["ETag"] = etag
+    return ORJSONResponse(row_dicts(model, rows), headers=headers)
+
+def row_dicts(model, rows):
+    """Словари полей модели ответа из кортежей строк (лишние колонки в конце отбрасываются)."""
+    fields = tuple(model.model_fields)
+    return [dict(zip(fields, row)) for row in rows]
+
+def parse_ids(ids: list):
+    """
+    Собирает id из параметров ?ids=a,b и ?ids=a&ids=b.
+
+    Больше MAX_BATCH_IDS id за запрос - ошибка 400.
+    """
+    values = [value.strip() for param in ids for value in param.split(",") if value.strip()]
+    if len(values) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_BATCH_IDS} ids per request")
+    return values
+
+def batch_response(model, found):
+    """Ответ пачкой: найденные объекты в порядке запроса и отсутствующие id."""
+    rows, missing = found
+    return ORJSONResponse({"items": row_dicts(model, rows), "missing": missing})
+
+async def stream_menu_tree(menu: dict, session_factory=None):
+    """
+    Отдает дерево меню кусками JSON: по одному на пачку строк подменю и блюд.
+
+    Строки читаются одним запросом через серверный курсор, как в выгрузке,
+    поэтому ни ORM-дерево, ни документ целиком в памяти не собираются.
+    Сессия открывается внутри генератора, так как живет дольше обработчика.
+    """
+    parts = [json.dumps({
+        "id": menu["id"],
+        "title": menu["title"],
+        "description": menu["description"],
+        "submenus_count": menu["submenus_count"],
+        "dishes_count": menu["dishes_count"],
+    })[:-1] + ', "submenus": [']
+    submenu_id = None
+    async with (session_factory or database.AsyncSessionLocal)() as db:
+        async for rows in stream_menu_tree_rows(db, menu["id"]):
+            for row in rows:
+                if row.submenu_id != submenu_id:
+                    parts.append(("]}," if submenu_id is not None else "") + json.dumps({
+                        "id": row.submenu_id,
+                        "title": row.submenu_title,
+                        "description": row.submenu_description,
+                        "dishes_count": row.submenu_dishes_count,
+                    })[:-1] + ', "dishes": [')
+                    submenu_id, first_dish = row.submenu_id, True
+                if row.dish_id is not None:
+                    parts.append(("" if first_dish else ",") + json.dumps({
+                        "id": row.dish_id,
+                        "title": row.dish_title,
+                        "description": row.dish_description,
+                        "price": row.dish_price,
+                    }))
+                    first_dish = False
+            yield "".join(parts)
+            parts = []
+    parts.append(("]}" if submenu_id is not None else "") + "]}")
+    yield "".join(parts)
+
+async def stream_menu_events(menu_id: str):
+    """
+    Отдает события меню потоком Server-Sent Events.
+
+    Подписка оформляется при старте потока и снимается при отключении
+    клиента. Пока событий нет, раз в EVENTS_KEEPALIVE секунд уходит
+    комментарий, чтобы прокси не закрывали соединение; через
+    EVENTS_STREAM_SECONDS поток завершается, и клиент переподключается.
+    """
+    subscription = events.subscribe(menu_id)
+    try:
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + EVENTS_STREAM_SECONDS
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(subscription.get(), min(events.EVENTS_KEEPALIVE, remaining))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield events.format_sse(event)
+    finally:
+        events.unsubscribe(subscription)
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+async def stream_export(export_format: str, menu_id: str = None, session_factory=None):
+    """
+    Отдает выгрузку меню и блюд в NDJSON или CSV пачками строк.
+
+    Сессия открывается внутри генератора, так как живет дольше обработчика.
+    """
+    async with (session_factory or database.AsyncSessionLocal)() as db:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([column.name for column in EXPORT_COLUMNS])
+            yield buffer.getvalue()
+        async for rows in stream_export_rows(db, menu_id):
+            if export_format == "csv":
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(row._mapping)) + "\n" for row in rows)
+
+def object_etag(data: dict):
+    """Сильный ETag объекта по его id и версии."""
+    return f'"{data["id"]}-{data["version"]}"'
+
+def page_etag(rows: list, cursor: str = None):
+    """Сильный ETag страницы по id (первая колонка) и версиям (последняя колонка) ее строк."""
+    digest = hashlib.sha1(repr((cursor, [(row[0], row[-1]) for row in rows])).encode())
+    return f'"{digest.hexdigest()}"'
+
+def etag_matches(request: Request, etag: str):
+    """Проверяет, совпадает ли ETag с одним из значений заголовка If-None-Match."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]
+
+async def not_modified(request: Request, version_func, *args):
+    """
+    Возвращает ответ 304, если клиент прислал актуальный If-None-Match.
+
+    Версия берется из кэша или легким запросом id и version, без загрузки строки.
+    """
+    if "if-none-match" not in request.headers:
+        return None
+    version = await version_func(*args)
+    if version is not None and etag_matches(request, object_etag(version)):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": object_etag(version)})
+    return None
 
 router = APIRouter()
 
-@router.post("/api/v1/menus/", status_code=status.HTTP_201_CREATED)
-def create_menu_endpoint(menu: MenuCreate, db: Session = Depends(get_db)):
+@router.post("/api/v1/menus/", status_code=status.HTTP_201_CREATED, response_model=MenuOut)
+async def create_menu_endpoint(menu: MenuCreate, db: AsyncSession = Depends(get_db)):
     """REST API для создания меню."""
-    return create_menu(db, menu.dict())
+    return await create_menu(db, menu.model_dump())
 
-@router.post("/api/v1/menus/{menu_id}/submenus/", status_code=status.HTTP_201_CREATED)
-def create_submenu_endpoint(menu_id: str, submenu: SubmenuCreate, db: Session = Depends(get_db)):
+@router.post("/api/v1/menus/{menu_id}/submenus/", status_code=status.HTTP_201_CREATED, response_model=SubmenuOut)
+async def create_submenu_endpoint(menu_id: str, submenu: SubmenuCreate, db: AsyncSession = Depends(get_db)):
     """REST API для создания подменю."""
-    return create_submenu(db, menu_id, submenu.dict())
+    return await create_submenu(db, menu_id, submenu.model_dump())
 
-@router.post("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/", status_code=status.HTTP_201_CREATED)
-def create_dish_endpoint(menu_id: str, submenu_id: str, dish: DishCreate, db: Session = Depends(get_db)):
+@router.post(
+    "/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/", status_code=status.HTTP_201_CREATED, response_model=DishOut
+)
+async def create_dish_endpoint(menu_id: str, submenu_id: str, dish: DishCreate, db: AsyncSession = Depends(get_db)):
     """REST API для создания блюда."""
-    return create_dish(db, menu_id, submenu_id, dish.dict())
+    return await create_dish(db, menu_id, submenu_id, dish.model_dump())
 
-@router.get("/api/v1/menus/")
-def read_all_menus(db: Session = Depends(get_db)):
-    """REST API для получения всех меню."""
-    return get_all_menus(db)
+@router.post("/api/v1/menus/import", status_code=status.HTTP_201_CREATED)
+async def import_menus_endpoint(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    REST API для импорта меню с подменю и блюдами в одной транзакции.
 
-@router.get("/api/v1/menus/{menu_id}")
-def read_menu(menu_id: str, db: Session = Depends(get_db)):
+    Принимает JSON-список меню или NDJSON (application/x-ndjson) с одним меню
+    на строку; NDJSON читается потоком и пишется пачками.
+    """
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            id_map, batch = [], []
+            async for document in read_ndjson_menus(request):
+                batch.append(document)
+                if len(batch) >= IMPORT_NDJSON_BATCH:
+                    id_map += await insert_menu_documents(db, batch)
+                    batch = []
+            id_map += await insert_menu_documents(db, batch)
+            await db.commit()
+        else:
+            documents = MenuImportList.validate_json(await request.body())
+            id_map = await import_menus(db, [document.model_dump() for document in documents])
+    except ValidationError as error:
+        raise HTTPException(status_code=422, detail=error.errors(include_url=False, include_context=False))
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail='import conflicts with existing data')
+    return id_map
+
+@router.get("/api/v1/menus/", response_model=list[MenuOut])
+async def read_all_menus(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """REST API для получения страницы меню."""
+    menus, next_cursor = await read_page(get_all_menus, db, limit=limit, cursor=cursor)
+    return page_response(MenuOut, menus, next_cursor)
+
+@router.get("/api/v1/menus/{menu_id}", response_model=MenuOut)
+async def read_menu(menu_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)):
     """REST API для получения меню."""
-    menu = get_menu(db, menu_id)
+    cached_response = await not_modified(request, get_menu_version, db, menu_id)
+    if cached_response:
+        return cached_response
+    menu = await get_menu(db, menu_id)
     if menu is None:
         raise HTTPException(status_code=404, detail='menu not found')
+    response.headers["ETag"] = object_etag(menu)
     return menu
 
-@router.get("/api/v1/menus/{menu_id}/submenus/")
-def read_all_submenus(db: Session = Depends(get_db)):
-    """REST API для получения всех подменю."""
-    return get_all_submenus(db)
+@router.get("/api/v1/menus/{menu_id}/tree")
+async def read_menu_tree(menu_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    """REST API для получения меню со всеми подменю и блюдами."""
+    menu = await get_menu(db, menu_id)
+    if menu is None:
+        raise HTTPException(status_code=404, detail='menu not found')
+    return StreamingResponse(
+        stream_menu_tree(menu, read_routing.session_factory(request.method, request.cookies)),
+        media_type="application/json",
+    )
+
+@router.get("/api/v1/menus/{menu_id}/events")
+async def read_menu_events(menu_id: str, request: Request):
+    """
+    REST API для подписки на изменения меню, его подменю и блюд потоком Server-Sent Events.
 
-@router.get("/api/v1/menus/{menu_id}/submenus/{submenu_id}")
-def read_submenu(submenu_id: str, db: Session = Depends(get_db)):
+    Каждое сообщение - JSON с type (created, updated, deleted или resync),
+    object (menu, submenu, dish), id и идентификаторами родителей; при
+    created и updated - версия и поля объекта. Соединение с БД нужно только
+    для проверки, что меню существует.
+    """
+    async with read_routing.session_factory(request.method, request.cookies)() as db:
+        menu = await get_menu_version(db, menu_id)
+    if menu is None:
+        raise HTTPException(status_code=404, detail='menu not found')
+    return StreamingResponse(
+        stream_menu_events(menu["id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Блокировки публикации снимков: одновременные промахи по одному меню собирают снимок один раз
+SNAPSHOT_LOCKS = [asyncio.Lock() for _ in range(64)]
+
+@router.get("/api/v1/menus/{menu_id}/snapshot")
+async def read_menu_snapshot(menu_id: str, request: Request):
+    """
+    REST API для получения опубликованного снимка меню со всеми подменю и блюдами.
+
+    Опубликованный снимок отдается готовыми байтами (gzip или brotli по
+    Accept-Encoding) без обращения к БД; если снимка нет, он публикуется
+    по основной БД.
+    """
+    store = snapshots.get_store()
+    snapshot = store.get(menu_id)
+    if snapshot is None:
+        async with SNAPSHOT_LOCKS[hash(menu_id) % len(SNAPSHOT_LOCKS)]:
+            snapshot = store.get(menu_id)
+            if snapshot is None:
+                async with database.AsyncSessionLocal() as db:
+                    snapshot = await publish_snapshot(db, menu_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail='menu not found')
+
+    etag = f'"{snapshot.version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    encoding = snapshots.choose_encoding(request.headers.get("accept-encoding"), snapshot.bodies)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(snapshot.body(encoding), media_type="application/json", headers=headers)
+
+@router.get("/api/v1/menus/{menu_id}/stats", response_model=MenuPriceStats)
+async def read_menu_stats(menu_id: str, db: AsyncSession = Depends(get_db)):
+    """REST API для получения количества, минимальной, максимальной и средней цены блюд меню и его подменю."""
+    stats = await get_price_stats(db, menu_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail='menu not found')
+    return stats
+
+@router.get("/api/v1/menus/{menu_id}/submenus/", response_model=list[SubmenuOut])
+async def read_all_submenus(
+    menu_id: str,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """REST API для получения страницы подменю меню."""
+    submenus, next_cursor = await read_page(get_all_submenus, db, menu_id, limit=limit, cursor=cursor)
+    return page_response(SubmenuOut, submenus, next_cursor)
+
+@router.get("/api/v1/menus/{menu_id}/submenus/{submenu_id}", response_model=SubmenuOut)
+async def read_submenu(
+    menu_id: str, submenu_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
     """REST API для получения конкретного подменю."""
-    submenu = get_submenu(db, submenu_id)
+    cached_response = await not_modified(request, get_submenu_version, db, submenu_id, menu_id)
+    if cached_response:
+        return cached_response
+    submenu = await get_submenu(db, submenu_id, menu_id)
     if submenu is None:
         raise HTTPException(status_code=404, detail='submenu not found')
+    response.headers["ETag"] = object_etag(submenu)
     return submenu
 
-@router.get("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/")
-def read_all_dishes(submenu_id: str, db: Session = Depends(get_db)):
-    """REST API для получения блюд."""
-    return get_all_dishes(db, submenu_id)
+@router.get("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/", response_model=list[DishOut])
+async def read_all_dishes(
+    menu_id: str,
+    submenu_id: str,
+    request: Request,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str = None,
+    min_price: Decimal = Query(None, ge=0),
+    max_price: Decimal = Query(None, ge=0),
+    order_by: str = Query("id", pattern=f"^({'|'.join(DISH_ORDERS)})$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """REST API для получения страницы блюд с фильтром по цене и сортировкой по id или цене."""
+    dishes, next_cursor = await read_page(
+        get_all_dishes, db, submenu_id, menu_id, limit=limit, cursor=cursor,
+        min_price=min_price, max_price=max_price, order_by=order_by,
+    )
+    etag = page_etag(dishes, cursor)
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return page_response(DishOut, dishes, next_cursor, etag)
 
-@router.get("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}")
-def read_dishes(menu_id: str, submenu_id: str, db: Session = Depends(get_db)):
+@router.get("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}", response_model=DishOut)
+async def read_dishes(
+    menu_id: str, submenu_id: str, dish_id: str, request: Request, response: Response, db: AsyncSession = Depends(get_db)
+):
     """REST API для получения блюда."""
-    dish = get_dishes(db, submenu_id)
+    cached_response = await not_modified(request, get_dish_version, db, dish_id, submenu_id, menu_id)
+    if cached_response:
+        return cached_response
+    dish = await get_dishes(db, dish_id, submenu_id, menu_id)
     if dish is None:
         raise HTTPException(status_code=404, detail='dish not found')
+    response.headers["ETag"] = object_etag(dish)
     return dish
 
-@router.put("/api/v1/menus/{menu_id}")
-def update_menu_endpoint(menu_id: str, updated_data: dict, db: Session = Depends(get_db)):
+@router.get("/api/v1/submenus", response_model=SubmenuBatch)
+async def read_submenus_by_ids(ids: list[str] = Query(default=[]), db: AsyncSession = Depends(get_db)):
+    """REST API для получения подменю по списку id одним запросом."""
+    return batch_response(SubmenuOut, await get_submenus_by_ids(db, parse_ids(ids)))
+
+@router.get("/api/v1/dishes", response_model=DishBatch)
+async def read_dishes_by_ids(ids: list[str] = Query(default=[]), db: AsyncSession = Depends(get_db)):
+    """REST API для получения блюд по списку id одним запросом."""
+    return batch_response(DishOut, await get_dishes_by_ids(db, parse_ids(ids)))
+
+@router.get("/api/v1/search", response_model=list[SearchResultOut])
+async def search_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    menu_id: str = None,
+    submenu_id: str = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """REST API для поиска подменю и блюд по названию и описанию, по убыванию релевантности."""
+    results, next_cursor = await read_page(
+        search, db, q, menu_id=menu_id, submenu_id=submenu_id, limit=limit, cursor=cursor
+    )
+    return page_response(SearchResultOut, results, next_cursor)
+
+@router.put("/api/v1/menus/{menu_id}", response_model=MenuOut | None)
+async def update_menu_endpoint(menu_id: str, updated_data: MenuUpdate, db: AsyncSession = Depends(get_db)):
     """REST API для обновления меню."""
-    return update_menu(db, menu_id, updated_data)
+    return await update_menu(db, menu_id, updated_data.model_dump(exclude_unset=True))
 
-@router.put("/api/v1/menus/{menu_id}/submenus/{submenu_id}")
-def update_submenu_endpoint(submenu_id: str, updated_data: dict, db: Session = Depends(get_db)):
+@router.put("/api/v1/menus/{menu_id}/submenus/{submenu_id}", response_model=SubmenuOut | None)
+async def update_submenu_endpoint(submenu_id: str, updated_data: SubmenuUpdate, db: AsyncSession = Depends(get_db)):
     """REST API для обновления подменю."""
-    return update_submenu(db, submenu_id, updated_data)
+    return await update_submenu(db, submenu_id, updated_data.model_dump(exclude_unset=True))
 
-@router.put("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}")
-def update_dish_endpoint(dish_id: str, updated_data: dict, db: Session = Depends(get_db)):
+@router.put("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}", response_model=DishOut | None)
+async def update_dish_endpoint(dish_id: str, updated_data: DishUpdate, db: AsyncSession = Depends(get_db)):
     """REST API для обновления блюда."""
-    return update_dish(db, dish_id, updated_data)
+    return await update_dish(db, dish_id, updated_data.model_dump(exclude_unset=True))
 
 @router.delete("/api/v1/menus/{menu_id}")
-def delete_menu_endpoint(menu_id: str, db: Session = Depends(get_db)):
+async def delete_menu_endpoint(menu_id: str, db: AsyncSession = Depends(get_db)):
     """REST API для удаления меню."""
-    return delete_menu(db, menu_id)
+    return await delete_menu(db, menu_id)
 
 @router.delete("/api/v1/menus/{menu_id}/submenus/{submenu_id}")
-def delete_submenu_endpoint(submenu_id: str, db: Session = Depends(get_db)):
+async def delete_submenu_endpoint(submenu_id: str, db: AsyncSession = Depends(get_db)):
     """REST API для удаления подменю."""
-    return delete_submenu(db, submenu_id)
+    return await delete_submenu(db, submenu_id)
 
 @router.delete("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}")
-def delete_dish_endpoint(dish_id: str, db: Session = Depends(get_db)):
+async def delete_dish_endpoint(dish_id: str, db: AsyncSession = Depends(get_db)):
     """REST API для удаления блюда."""
-    return delete_dish(db, dish_id)
+    return await delete_dish(db, dish_id)
 
-@router.patch("/api/v1/menus/{menu_id}")
-def partial_update_menu_endpoint(menu_id: str, updated_data: dict, db: Session = Depends(get_db)):
+@router.patch("/api/v1/menus/{menu_id}", response_model=MenuOut | None)
+async def partial_update_menu_endpoint(menu_id: str, updated_data: MenuUpdate, db: AsyncSession = Depends(get_db)):
     """REST API для частичного обновления меню."""
-    return partial_update_menu(db, menu_id, updated_data)
+    return await partial_update_menu(db, menu_id, updated_data.model_dump(exclude_unset=True))
 
-@router.patch("/api/v1/menus/{menu_id}/submenus/{submenu_id}")
-def partial_update_submenu_endpoint(submenu_id: str, updated_data: dict, db: Session = Depends(get_db)):
+@router.patch("/api/v1/menus/{menu_id}/submenus/{submenu_id}", response_model=SubmenuOut | None)
+async def partial_update_submenu_endpoint(submenu_id: str, updated_data: SubmenuUpdate, db: AsyncSession = Depends(get_db)):
     """REST API для частичного обновления подменю."""
-    return partial_update_submenu(db, submenu_id, updated_data)
+    return await partial_update_submenu(db, submenu_id, updated_data.model_dump(exclude_unset=True))
 
-@router.patch("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}")
-def partial_update_dish_endpoint(dish_id: str, updated_data: dict, db: Session = Depends(get_db)):
+@router.patch("/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}", response_model=DishOut | None)
+async def partial_update_dish_endpoint(dish_id: str, updated_data: DishUpdate, db: AsyncSession = Depends(get_db)):
     """REST API для частичного обновления блюда."""
-    return partial_update_dish(db, dish_id, updated_data)
+    return await partial_update_dish(db, dish_id, updated_data.model_dump(exclude_unset=True))
+
+@router.get("/api/v1/export")
+async def export_endpoint(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    menu_id: str = None,
+):
+    """REST API для потоковой выгрузки меню, подменю и блюд."""
+    return StreamingResponse(
+        stream_export(format, menu_id, read_routing.session_factory(request.method, request.cookies)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="menus.{format}"'},
+    )
+
+@router.get("/api/v1/cache/stats")
+async def read_cache_stats():
+    """REST API для получения счетчиков попаданий и промахов кэша."""
+    return cache.get_stats()
+
+@router.get("/api/v1/diagnostics/pool")
+async def read_pool_status():
+    """REST API для получения статистики пула соединений с БД."""
+    pools = {
+        "async": database.pool_status(database.get_async_engine()),
+        "sync": database.pool_status(database.get_engine()),
+    }
+    if database.DATABASE_REPLICA_URLS:
+        pools["replicas"] = [database.pool_status(engine) for engine in database.get_replica_engines()]
+    return pools
+
+@router.get("/healthz")
+async def read_liveness():
+    """Проверка живости: процесс отвечает на запросы, БД не опрашивается."""
+    return {"status": "ok"}
+
+async def check_database():
+    """Выполняет SELECT 1; возвращает None или текст ошибки."""
+    try:
+        async with database.AsyncSessionLocal() as db:
+            await asyncio.wait_for(db.execute(text("SELECT 1")), READINESS_TIMEOUT)
+    except (SQLAlchemyError, OSError, asyncio.TimeoutError) as error:
+        return str(error) or type(error).__name__
+    return None
+
+@router.get("/readyz")
+async def read_readiness():
+    """Проверка готовности: БД доступна; иначе 503, чтобы балансировщик не слал запросы."""
+    error = await check_database()
+    if error is not None:
+        return ORJSONResponse(
+            {"status": "unavailable", "database": error}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return {"status": "ok", "database": "ok"}
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Метрики приложения в формате Prometheus."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
 
 app.include_router(router)
@@ -0,0 +1,127 @@
+"""
+Метрики приложения в формате Prometheus.
+
+- http_requests_total: запросы по методу, шаблону маршрута и коду ответа;
+- http_request_duration_seconds: гистограмма задержек по методу и шаблону маршрута;
+- http_requests_in_progress: запросы, обрабатываемые в данный момент;
+- http_request_db_statements и http_request_db_duration_seconds: число
+  SQL-запросов и суммарное время в БД на один HTTP-запрос;
+- db_statements_total и db_duration_seconds_total: то же нарастающим итогом.
+
+Маршрут берется из шаблона пути (/api/v1/menus/{menu_id}), а не из самого
+пути, поэтому число рядов не растет с числом объектов. SQL-запросы
+считаются событиями движков SQLAlchemy и относятся к HTTP-запросу через
+ContextVar; на запрос приходится несколько вызовов perf_counter и
+обращений к ContextVar, так что сбор можно не выключать под нагрузкой.
+"""
+import time
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+UNMATCHED_ROUTE = "unmatched"
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by method, route template and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template.",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests currently being processed.")
+REQUEST_DB_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request.",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Total time spent in SQL statements per HTTP request.",
+    ["method", "route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+DB_STATEMENTS = Counter("db_statements_total", "SQL statements executed.")
+DB_DURATION = Counter("db_duration_seconds_total", "Total time spent in SQL statements.")
+
+# [число запросов, время в БД] текущего HTTP-запроса
+_request_db = ContextVar("request_db", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    DB_STATEMENTS.inc()
+    DB_DURATION.inc(elapsed)
+    usage = _request_db.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += elapsed
+
+
+def _handle_error(exception_context):
+    # Запрос завершился ошибкой: after_cursor_execute для него не вызывается
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("metrics_started"):
+        connection.info["metrics_started"].pop()
+
+
+def instrument_engine(engine=Engine):
+    """
+    Подключает подсчет SQL-запросов к движку (для AsyncEngine - к его sync_engine).
+
+    По умолчанию - к классу Engine, то есть ко всем движкам процесса, в том
+    числе созданным позже (движки создаются лениво, при первом обращении).
+    """
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware, измеряющее HTTP-запросы и SQL-запросы внутри них."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        usage = [0, 0.0]
+        token = _request_db.set(usage)
+        REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec()
+            _request_db.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else UNMATCHED_ROUTE)
+            REQUESTS.labels(*labels, str(status)).inc()
+            REQUEST_DURATION.labels(*labels).observe(elapsed)
+            REQUEST_DB_STATEMENTS.labels(*labels).observe(usage[0])
+            REQUEST_DB_DURATION.labels(*labels).observe(usage[1])
+
+
+def render():
+    """Текущие значения метрик в текстовом формате Prometheus и его content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
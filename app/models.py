@@ -1,11 +1,91 @@
-from uuid import uuid4
-from sqlalchemy import Column, String, ForeignKey
-from sqlalchemy.orm import relationship
+from decimal import ROUND_HALF_UP, Decimal
+from uuid import UUID as PyUUID, uuid4
+from sqlalchemy import Column, Computed, String, Integer, ForeignKey, Index, Numeric
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.types import TypeDecorator
 
 Base = declarative_base()
 
+NIL_UUID = "00000000-0000-0000-0000-000000000000"
+CENT = Decimal("0.01")
+
+
+# Конфигурация полнотекстового поиска: без стемминга, одинаково для любых языков
+SEARCH_CONFIG = "simple"
+
+
+def search_vector_sql(config: str = SEARCH_CONFIG):
+    """
+    Выражение поискового вектора: название с весом A, описание с весом B.
+
+    Приведения типов записаны так, как выражение возвращает PostgreSQL,
+    чтобы alembic check не считал колонку измененной.
+    """
+    return " || ".join(
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce({column}, ''::character varying)::text), "
+        f"'{weight}'::\"char\")"
+        for column, weight in (("title", "A"), ("description", "B"))
+    )
+
+
+def search_vector_column():
+    """Хранимая вычисляемая колонка tsvector; ORM загружает ее только по требованию."""
+    return deferred(Column(TSVECTOR, Computed(search_vector_sql(), persisted=True)))
+
+
+def format_price(value):
+    """Форматирует цену строкой с двумя знаками после запятой."""
+    if value is None:
+        return None
+    return f"{Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP):.2f}"
+
+
+def canonical_id(value):
+    """Каноническая запись UUID (нижний регистр, с дефисами); значение, не являющееся UUID, - строкой как есть."""
+    try:
+        return str(PyUUID(str(value)))
+    except ValueError:
+        return str(value)
+
+
+class UUIDString(TypeDecorator):
+    """
+    Идентификатор: в БД нативный UUID (16 байт), в Python строка.
+
+    Строка, не являющаяся UUID, не может совпасть ни с одним id, поэтому
+    передается в запрос как нулевой UUID: поиск по ней ведет себя как поиск
+    несуществующего объекта, а не как ошибка БД.
+    """
+
+    impl = UUID(as_uuid=False)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return str(PyUUID(str(value)))
+        except ValueError:
+            return NIL_UUID
+
+
+class Price(TypeDecorator):
+    """Цена: в БД NUMERIC(10, 2), в Python строка с двумя знаками после запятой."""
+
+    impl = Numeric(10, 2)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def process_result_value(self, value, dialect):
+        return format_price(value)
+
 
 class Menu(Base):
     """
@@ -14,24 +94,22 @@ class Menu(Base):
     :param id: Уникальный идентификатор меню.
     :param title: Название меню.
     :param description: Описание меню.
+    :param submenus_count: Количество подменю (поддерживается при записи).
+    :param dishes_count: Количество блюд во всех подменю (поддерживается при записи).
+    :param version: Версия строки, увеличивается при каждом изменении меню и его счетчиков.
     :param submenus: Связь с подменю в базе данных.
     """
     
     __tablename__ = "menus"
 
-    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid4()))
+    id = Column(UUIDString, primary_key=True, default=lambda: str(uuid4()))
     title = Column(String, index=True)
     description = Column(String)
+    submenus_count = Column(Integer, nullable=False, default=0, server_default="0")
+    dishes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
-    submenus = relationship("Submenu", back_populates="menu", cascade="all, delete-orphan")
-
-    @hybrid_property
-    def submenus_count(self):
-        return len(self.submenus)
-
-    @hybrid_property
-    def dishes_count(self):
-        return sum(submenu.dishes_count for submenu in self.submenus)
+    submenus = relationship("Submenu", back_populates="menu", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Submenu(Base):
@@ -42,23 +120,30 @@ class Submenu(Base):
     :param title: Название подменю (уникальное в пределах меню).
     :param description: Описание подменю.
     :param menu_id: Идентификатор связанного меню.
+    :param dishes_count: Количество блюд (поддерживается при записи).
+    :param version: Версия строки, увеличивается при каждом изменении подменю и его счетчика.
+    :param search_vector: Поисковый вектор названия и описания (вычисляется БД).
     :param menu: Связь с меню в базе данных.
     :param dishes: Связь с блюдами в базе данных.
     """
 
     __tablename__ = "submenus"
+    __table_args__ = (
+        Index("uq_submenus_menu_id_title", "menu_id", "title", unique=True),
+        Index("ix_submenus_menu_id_id", "menu_id", "id"),
+        Index("ix_submenus_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
-    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid4()))
+    id = Column(UUIDString, primary_key=True, default=lambda: str(uuid4()))
     description = Column(String)
-    title = Column(String, unique=True)
-    menu_id = Column(String, ForeignKey("menus.id"))
+    title = Column(String)
+    menu_id = Column(UUIDString, ForeignKey("menus.id", ondelete="CASCADE"))
+    dishes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    search_vector = search_vector_column()
 
     menu = relationship("Menu", back_populates="submenus")
-    dishes = relationship("Dish", back_populates="submenu", cascade="all, delete-orphan")
-
-    @hybrid_property
-    def dishes_count(self):
-        return len(self.dishes)
+    dishes = relationship("Dish", back_populates="submenu", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Dish(Base):
@@ -68,26 +153,41 @@ class Dish(Base):
     :param id: Уникальный идентификатор блюда.
     :param title: Название блюда (уникальное в пределах подменю).
     :param description: Описание блюда.
-    :param price: Цена блюда.
+    :param price: Цена блюда (NUMERIC(10, 2), отдается строкой с двумя знаками).
     :param menu_id: Идентификатор связанного меню.
     :param submenu_id: Идентификатор связанного подменю.
+    :param version: Версия строки, увеличивается при каждом изменении блюда.
+    :param search_vector: Поисковый вектор названия и описания (вычисляется БД).
     :param submenu: Связь с подменю в базе данных.
     """
 
     __tablename__ = "dishes"
-
-    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid4()))
-    title = Column(String, unique=True)
+    __table_args__ = (
+        Index("uq_dishes_submenu_id_title", "submenu_id", "title", unique=True),
+        Index("ix_dishes_submenu_id_id", "submenu_id", "id"),
+        Index("ix_dishes_submenu_id_price", "submenu_id", "price", "id"),
+        Index("ix_dishes_search_vector", "search_vector", postgresql_using="gin"),
+    )
+
+    id = Column(UUIDString, primary_key=True, default=lambda: str(uuid4()))
+    title = Column(String)
     description = Column(String)
-    price = Column(String)
-    menu_id = Column(String, ForeignKey("menus.id"))
-    submenu_id = Column(String, ForeignKey("submenus.id"))
+    price = Column(Price)
+    menu_id = Column(UUIDString, ForeignKey("menus.id", ondelete="CASCADE"), index=True)
+    submenu_id = Column(UUIDString, ForeignKey("submenus.id", ondelete="CASCADE"))
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    search_vector = search_vector_column()
 
     submenu = relationship("Submenu", back_populates="dishes")
 
     @hybrid_property
     def dish_price(self):
-        return f"{Dish.price:.2f}"
+        return format_price(self.price)
+
+    @dish_price.inplace.expression
+    @classmethod
+    def _dish_price_expression(cls):
+        return cls.price
 
     def __repr__(self):
         return f"<Dish {self.title}>"
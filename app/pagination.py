@@ -0,0 +1,106 @@
+"""
+Keyset-пагинация списков.
+
+Страница выбирается условием ``id > :last_id ORDER BY id LIMIT :limit``
+по первичному ключу, поэтому глубокие страницы стоят столько же, сколько первая.
+Курсор непрозрачен для клиента: это base64 от JSON с последним id страницы.
+Страницы, упорядоченные по другой колонке (цене, релевантности), выбираются
+по паре ``(value, id) > (:last_value, :last_id)``, и курсор хранит оба значения.
+"""
+import base64
+import binascii
+import json
+
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать."""
+
+
+def encode_cursor(last_id: str):
+    """Кодирует id последнего элемента страницы в курсор."""
+    payload = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor: str):
+    """Декодирует курсор в id последнего элемента предыдущей страницы."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def encode_sorted_cursor(value, last_id: str):
+    """Кодирует значение сортировки и id последнего элемента страницы, упорядоченной не по id."""
+    payload = json.dumps({"value": value, "id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_sorted_cursor(cursor: str, value_type=str):
+    """
+    Декодирует курсор страницы, упорядоченной не по id, в пару (значение сортировки, id).
+
+    :param value_type: Преобразование значения сортировки (например, float или Decimal).
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return value_type(payload["value"]), payload["id"]
+    except (binascii.Error, ValueError, ArithmeticError, KeyError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def paginate(query, column, limit: int = DEFAULT_LIMIT, cursor: str = None):
+    """
+    Возвращает страницу запроса в порядке column и курсор следующей страницы.
+
+    :param query: ORM-запрос.
+    :param column: Уникальная индексированная колонка для упорядочивания.
+    :param limit: Размер страницы.
+    :param cursor: Курсор, полученный с предыдущей страницей.
+    :return: Пара (элементы страницы, курсор следующей страницы или None).
+    """
+    if cursor is not None:
+        query = query.filter(column > decode_cursor(cursor))
+    items = query.order_by(column).limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_cursor(getattr(items[-1], column.key))
+    return items, None
+
+
+def paginate_sorted(
+    query, column, id_column, limit: int = DEFAULT_LIMIT, cursor: str = None, descending=False, value_type=str
+):
+    """
+    Возвращает страницу запроса в порядке (column, id_column) и курсор следующей страницы.
+
+    Страница выбирается условием ``(column, id) > (:value, :last_id)``
+    (или ``<`` при обратном порядке), поэтому составной индекс по этим
+    колонкам обслуживает и условие, и сортировку. Строки с NULL в column
+    в такую выборку не попадают.
+
+    :param query: ORM-запрос.
+    :param column: Неуникальная колонка сортировки.
+    :param id_column: Уникальная колонка, упорядочивающая строки с равным значением column.
+    :param limit: Размер страницы.
+    :param cursor: Курсор, полученный с предыдущей страницей.
+    :param descending: Обратный порядок.
+    :param value_type: Преобразование значения column из курсора.
+    :return: Пара (элементы страницы, курсор следующей страницы или None).
+    """
+    query = query.filter(column.isnot(None))
+    if cursor is not None:
+        key = tuple_(column, id_column)
+        last = tuple_(*decode_sorted_cursor(cursor, value_type), types=[column.type, id_column.type])
+        query = query.filter(key < last if descending else key > last)
+    order = (column.desc(), id_column.desc()) if descending else (column, id_column)
+    items = query.order_by(*order).limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        return items, encode_sorted_cursor(getattr(items[-1], column.key), getattr(items[-1], id_column.key))
+    return items, None
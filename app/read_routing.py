@@ -0,0 +1,88 @@
+"""
+Разделение чтений и записей между основной БД и репликами.
+
+Чтения (GET, HEAD) выполняются на репликах из DATABASE_REPLICA_URLS,
+записи - на основной БД. Реплика отстает от основной БД, поэтому после
+успешной записи клиенту ставится cookie last_write со временем записи:
+пока не прошло READ_YOUR_WRITES_SECONDS (по умолчанию 5), чтения этого
+клиента тоже идут на основную БД, и он видит свои изменения. Окно живет
+в cookie, а не в памяти процесса, поэтому не зависит от того, какой
+воркер обработал запись.
+
+Кэш ответов общий для всех клиентов, и промах кэша у другого клиента
+может заполнить его данными с отставшей реплики. Поэтому чтения в окне
+read-your-writes идут мимо кэша: значение читается с основной БД и
+заменяет в кэше запись, которую могла оставить реплика.
+"""
+import math
+import os
+import time
+
+from app import database
+
+READ_METHODS = frozenset({"GET", "HEAD"})
+LAST_WRITE_COOKIE = "last_write"
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+
+def wrote_recently(cookies: dict, now: float = None):
+    """
+    Проверяет, писал ли клиент в пределах окна read-your-writes.
+
+    :param cookies: Cookie запроса.
+    :param now: Текущее время (time.time()); по умолчанию берется сейчас.
+    :return: True, если чтения клиента должны идти на основную БД.
+    """
+    try:
+        written_at = float(cookies[LAST_WRITE_COOKIE])
+    except (KeyError, ValueError):
+        return False
+    now = time.time() if now is None else now
+    return 0 <= now - written_at < READ_YOUR_WRITES_SECONDS
+
+
+def session_factory(method: str, cookies: dict):
+    """Фабрика сессий для запроса: реплика для чтений вне окна read-your-writes, иначе основная БД."""
+    if method in READ_METHODS and not wrote_recently(cookies):
+        return database.ReplicaSessionLocal
+    return database.AsyncSessionLocal
+
+
+def bypasses_cache(method: str, cookies: dict):
+    """Чтение в окне read-your-writes: значения кэша не используются, их могла заполнить реплика."""
+    return method in READ_METHODS and wrote_recently(cookies)
+
+
+def last_write_cookie(now: float = None):
+    """Заголовок Set-Cookie с временем записи, живущий столько же, сколько окно."""
+    now = time.time() if now is None else now
+    return (
+        f"{LAST_WRITE_COOKIE}={now:.3f}; Max-Age={math.ceil(READ_YOUR_WRITES_SECONDS)}; "
+        "Path=/; HttpOnly; SameSite=Lax"
+    )
+
+
+class ReadYourWritesMiddleware:
+    """ASGI-middleware, отмечающее cookie успешные записи клиента, пока настроены реплики."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in READ_METHODS
+            or not database.DATABASE_REPLICA_URLS
+            or READ_YOUR_WRITES_SECONDS <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = list(message.get("headers", []))
+                headers.append((b"set-cookie", last_write_cookie().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
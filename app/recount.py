@@ -0,0 +1,28 @@
+"""
+Пересчет денормализованных счетчиков меню и подменю.
+
+Запуск: ``python -m app.recount``
+"""
+import asyncio
+
+from app import database
+from app.async_crud import recount_counters
+
+
+async def recount():
+    """Пересчитывает счетчики во всей базе данных."""
+    # Через AsyncSession, как в приложении: сброс кэша ждет асинхронный клиент Redis в том же цикле событий
+    try:
+        async with database.AsyncSessionLocal() as db:
+            await recount_counters(db)
+    finally:
+        await database.dispose_engines()
+
+
+def main():
+    """Пересчитывает счетчики во всей базе данных."""
+    asyncio.run(recount())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+"""
+Опубликованные снимки меню.
+
+Снимок - неизменяемый JSON-документ меню со всеми подменю и блюдами,
+собранный один раз вместе с заранее сжатыми вариантами gzip и brotli
+(brotli - если установлен пакет Brotli). GET /api/v1/menus/{menu_id}/snapshot
+отдает готовые байты из хранилища, не обращаясь к БД и ORM.
+
+Версия снимка - начало sha256 от документа меню: одно и то же меню дает
+одну и ту же версию в любом процессе, версия же служит ETag.
+
+Любая запись в app.crud снимает публикацию меню (invalidate), следующий
+запрос снимка публикует его заново. Чтобы сборка, начатая до записи, не
+сохранила устаревший снимок, хранилище ведет номер поколения меню:
+invalidate увеличивает его, а put сохраняет снимок, только если поколение
+не изменилось с начала сборки.
+
+Хранилище выбирается переменными окружения:
+
+- SNAPSHOT_DIR не задана: снимки в памяти процесса (LRU на SNAPSHOT_MAXSIZE
+  меню, по умолчанию 1000, каждый живет не дольше SNAPSHOT_TTL секунд,
+  по умолчанию 300). Записи других воркеров снимают публикацию через
+  ленту изменений app.events (EVENTS_BACKEND=postgres), SNAPSHOT_TTL
+  ограничивает устаревание, если событие потерялось;
+- SNAPSHOT_DIR - каталог: снимки в файлах, которые отдаются через mmap.
+  Каталог общий для всех воркеров, у каждого меню свой подкаталог, текущая
+  версия меню записана в файле {menu_id}/current, который меняется под
+  блокировкой flock.
+"""
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from uuid import UUID
+
+import orjson
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "")
+SNAPSHOT_MAXSIZE = int(os.getenv("SNAPSHOT_MAXSIZE", "1000"))
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "300"))
+
+# Кодирование тела -> суффикс файла снимка
+SUFFIXES = {"identity": ".json", "gzip": ".json.gz", "br": ".json.br"}
+# Порядок предпочтения кодирований при выборе по Accept-Encoding
+PREFERRED_ENCODINGS = ("br", "gzip", "identity")
+
+
+def _brotli():
+    """Модуль brotli или None, если пакет не установлен."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def snapshot_key(menu_id: str):
+    """Канонический id меню для хранилища или None, если это не UUID."""
+    try:
+        return str(UUID(str(menu_id)))
+    except ValueError:
+        return None
+
+
+def _off_loop(function, *args):
+    """
+    Выполняет блокирующую функцию вне цикла событий.
+
+    В greenlet сессии (функции app.crud внутри AsyncSession.run_sync)
+    функция уходит в пул потоков цикла, а greenlet ждет ее через await_only;
+    вне greenlet (CLI, тесты) функция вызывается напрямую.
+    """
+    if in_greenlet():
+        return await_only(asyncio.get_running_loop().run_in_executor(None, function, *args))
+    return function(*args)
+
+
+class Snapshot:
+    """Опубликованный снимок меню: версия и тело в каждом из доступных кодирований."""
+
+    __slots__ = ("version", "bodies")
+
+    def __init__(self, version: str, bodies: dict):
+        self.version = version
+        self.bodies = bodies
+
+    def body(self, encoding: str):
+        """Тело снимка в кодировании encoding байтами."""
+        return bytes(self.bodies[encoding])
+
+
+def build(document: dict):
+    """
+    Собирает снимок из документа меню.
+
+    :param document: Меню с вложенными подменю и блюдами.
+    :return: Snapshot с телом {"version": ..., "menu": ...} и его сжатыми вариантами.
+    """
+    menu = orjson.dumps(document)
+    version = hashlib.sha256(menu).hexdigest()[:16]
+    body = b'{"version":"' + version.encode() + b'","menu":' + menu + b"}"
+    bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=11)
+    return Snapshot(version, {encoding: data for encoding, data in bodies.items() if len(data) <= len(body)})
+
+
+def choose_encoding(accept_encoding: str, available):
+    """
+    Выбирает кодирование ответа по заголовку Accept-Encoding.
+
+    :param accept_encoding: Значение заголовка (может быть пустым).
+    :param available: Кодирования, в которых есть тело снимка.
+    :return: br, gzip или identity.
+    """
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.partition(";")
+        params = params.replace(" ", "")
+        if name.strip() and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip().lower())
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+class MemorySnapshotStore:
+    """Снимки в памяти процесса с вытеснением LRU и временем жизни."""
+
+    # Хранилище своего процесса: записи в других воркерах снимают публикацию через ленту изменений
+    local = True
+
+    def __init__(self, maxsize: int = SNAPSHOT_MAXSIZE, ttl: float = SNAPSHOT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._snapshots = OrderedDict()
+        # Меню -> номер последнего снятия публикации; не больше maxsize меню, для вытесненных - _floor
+        self._generations = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        self._lock = Lock()
+
+    def get(self, menu_id: str):
+        key = snapshot_key(menu_id)
+        with self._lock:
+            item = self._snapshots.get(key)
+            if item is None:
+                return None
+            expires_at, snapshot = item
+            if expires_at < time.monotonic():
+                del self._snapshots[key]
+                return None
+            self._snapshots.move_to_end(key)
+            return snapshot
+
+    def generation(self, menu_id: str):
+        with self._lock:
+            return self._clock
+
+    def put(self, menu_id: str, snapshot: Snapshot, generation):
+        key = snapshot_key(menu_id)
+        with self._lock:
+            if key is None or self._generations.get(key, self._floor) > generation:
+                return False
+            self._snapshots[key] = (time.monotonic() + self.ttl, snapshot)
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > self.maxsize:
+                self._snapshots.popitem(last=False)
+            return True
+
+    def invalidate(self, menu_id: str):
+        key = snapshot_key(menu_id)
+        if key is None:
+            return
+        with self._lock:
+            self._clock += 1
+            self._generations[key] = self._clock
+            self._generations.move_to_end(key)
+            while len(self._generations) > self.maxsize:
+                _, self._floor = self._generations.popitem(last=False)
+            self._snapshots.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._clock += 1
+            self._floor = self._clock
+            self._generations.clear()
+            self._snapshots.clear()
+
+
+class FileSnapshotStore:
+    """
+    Снимки в файлах каталога, общего для процессов.
+
+    У каждого меню свой подкаталог {menu_id}: запись меню перебирает только
+    его файлы. Файлы версий {version}.json[.gz|.br] неизменяемы и отдаются
+    через mmap. Файл current хранит поколение и текущую версию; он
+    заменяется атомарно (os.replace), поэтому проверка публикации при
+    чтении - один stat: отображенные файлы переоткрываются, только если
+    указатель сменился. put и invalidate ждут flock и пишут файлы, поэтому
+    из greenlet сессии выполняются в пуле потоков, а не в цикле событий.
+    """
+
+    local = False
+
+    def __init__(self, directory: str = SNAPSHOT_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._opened = {}
+        self._lock = Lock()
+
+    def _path(self, key: str, name: str):
+        return os.path.join(self.directory, key, name)
+
+    def _read_pointer(self, key: str):
+        try:
+            with open(self._path(key, "current"), "rb") as file:
+                return json.loads(file.read())
+        except FileNotFoundError:
+            return {"generation": 0, "version": None}
+
+    def _write(self, path: str, data: bytes):
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def _remove_versions(self, key: str, keep: str = None):
+        # Отображенные в память файлы остаются доступны читателям и после удаления
+        for name in os.listdir(os.path.join(self.directory, key)):
+            if name.startswith(".") or name.split(".", 1)[0] in ("current", "lock", keep):
+                continue
+            try:
+                os.unlink(self._path(key, name))
+            except FileNotFoundError:
+                pass
+
+    @contextmanager
+    def _locked(self, key: str):
+        os.makedirs(os.path.join(self.directory, key), exist_ok=True)
+        with open(self._path(key, "lock"), "a") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def get(self, menu_id: str):
+        key = snapshot_key(menu_id)
+        if key is None:
+            return None
+        try:
+            stat = os.stat(self._path(key, "current"))
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            opened = self._opened.get(key)
+        if opened is not None and opened[0] == stamp:
+            return opened[1]
+
+        version = self._read_pointer(key)["version"]
+        if version is None:
+            return None
+        bodies = {}
+        for encoding, suffix in SUFFIXES.items():
+            try:
+                with open(self._path(key, f"{version}{suffix}"), "rb") as file:
+                    bodies[encoding] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                continue
+        if "identity" not in bodies:
+            return None
+        snapshot = Snapshot(version, bodies)
+        with self._lock:
+            self._opened[key] = (stamp, snapshot)
+        return snapshot
+
+    def generation(self, menu_id: str):
+        key = snapshot_key(menu_id)
+        return None if key is None else self._read_pointer(key)["generation"]
+
+    def put(self, menu_id: str, snapshot: Snapshot, generation):
+        key = snapshot_key(menu_id)
+        if key is None:
+            return False
+        return _off_loop(self._put, key, snapshot, generation)
+
+    def _put(self, key: str, snapshot: Snapshot, generation):
+        with self._locked(key):
+            if self._read_pointer(key)["generation"] != generation:
+                return False
+            for encoding, body in snapshot.bodies.items():
+                self._write(self._path(key, f"{snapshot.version}{SUFFIXES[encoding]}"), body)
+            self._write(
+                self._path(key, "current"),
+                json.dumps({"generation": generation, "version": snapshot.version}).encode(),
+            )
+            self._remove_versions(key, keep=snapshot.version)
+        return True
+
+    def invalidate(self, menu_id: str):
+        key = snapshot_key(menu_id)
+        if key is not None:
+            _off_loop(self._invalidate, key)
+
+    def _invalidate(self, key: str):
+        with self._locked(key):
+            generation = self._read_pointer(key)["generation"] + 1
+            self._write(self._path(key, "current"), json.dumps({"generation": generation, "version": None}).encode())
+            self._remove_versions(key)
+        with self._lock:
+            self._opened.pop(key, None)
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if os.path.isdir(os.path.join(self.directory, name)):
+                self.invalidate(name)
+
+
+_store = None
+
+
+def create_store(directory: str = SNAPSHOT_DIR):
+    """Создает хранилище снимков: файловое, если задан каталог, иначе в памяти."""
+    if directory:
+        return FileSnapshotStore(directory)
+    return MemorySnapshotStore()
+
+
+def get_store():
+    """Возвращает текущее хранилище снимков, создавая его при первом обращении."""
+    global _store
+    if _store is None:
+        _store = create_store()
+    return _store
+
+
+def set_store(store):
+    """Подменяет хранилище снимков (например, в тестах)."""
+    global _store
+    _store = store
+
+
+def invalidate(menu_id: str):
+    """Снимает публикацию снимка меню после изменения меню, его подменю или блюд."""
+    get_store().invalidate(menu_id)
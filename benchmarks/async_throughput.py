@@ -0,0 +1,118 @@
+"""
+Сравнение пропускной способности синхронного и асинхронного пути запроса.
+
+Оба варианта обслуживают GET /api/v1/menus/{menu_id} через app.crud.get_menu:
+
+- sync: обработчик ``def`` с синхронной сессией (занимает поток из пула Starlette
+  на все время ожидания БД, потоков по умолчанию 40);
+- async: приложение app.main с ``async def`` обработчиками и AsyncSession.
+
+Параметр --latency добавляет к каждому запросу ``pg_sleep``, имитируя сетевую
+задержку до БД, на которой и проявляется разница.
+
+Запуск (нужен DATABASE_URL с PostgreSQL)::
+
+    python -m benchmarks.async_throughput --requests 2000 --concurrency 80 --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import crud
+from app.database import DATABASE_URL, get_async_database_url
+from app.main import app as async_app, get_db
+
+
+def build_sync_app(latency: float, pool_size: int):
+    """Собирает приложение с синхронным обработчиком чтения меню."""
+    engine = create_engine(DATABASE_URL, pool_size=pool_size)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    sync_app = FastAPI()
+
+    def get_sync_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @sync_app.get("/api/v1/menus/{menu_id}")
+    def read_menu(menu_id: str, db: Session = Depends(get_sync_db)):
+        if latency:
+            db.execute(text("SELECT pg_sleep(:s)"), {"s": latency})
+        return crud.get_menu(db, menu_id)
+
+    return sync_app, engine
+
+
+def configure_async_app(latency: float, pool_size: int):
+    """Подключает к app.main пул нужного размера и имитацию задержки."""
+    engine = create_async_engine(get_async_database_url(), pool_size=pool_size)
+    AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            if latency:
+                await db.execute(text("SELECT pg_sleep(:s)"), {"s": latency})
+            yield db
+
+    async_app.dependency_overrides[get_db] = get_async_db
+    return async_app, engine
+
+
+async def drive(app, menu_id: str, requests: int, concurrency: int):
+    """Выполняет requests запросов с заданным параллелизмом и возвращает запросы в секунду."""
+    transport = httpx.ASGITransport(app=app)
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                response = await client.get(f"/api/v1/menus/{menu_id}")
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - started)
+
+
+async def main(args):
+    setup_engine = create_engine(DATABASE_URL)
+    db = sessionmaker(bind=setup_engine)()
+    menu = crud.create_menu(db, {"title": "Benchmark menu", "description": "async_throughput"})
+
+    try:
+        sync_app, sync_engine = build_sync_app(args.latency, args.concurrency)
+        sync_rps = await drive(sync_app, menu.id, args.requests, args.concurrency)
+        sync_engine.dispose()
+
+        async_app, async_engine = configure_async_app(args.latency, args.concurrency)
+        async_rps = await drive(async_app, menu.id, args.requests, args.concurrency)
+        await async_engine.dispose()
+
+        print(f"requests={args.requests} concurrency={args.concurrency} latency={args.latency}s")
+        print(f"sync:  {sync_rps:8.1f} req/s")
+        print(f"async: {async_rps:8.1f} req/s ({async_rps / sync_rps:.1f}x)")
+    finally:
+        crud.delete_menu(db, menu.id)
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=80)
+    parser.add_argument("--latency", type=float, default=0.02)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""
+Генератор синтетического набора данных: меню x подменю x блюда.
+
+Строки пишутся через app.crud.insert_menu_documents многострочными INSERT,
+транзакция фиксируется каждые --commit-every меню, поэтому наборы на
+миллионы блюд не держат одну огромную транзакцию. Генерация детерминирована
+при одинаковом --seed (кроме идентификаторов).
+
+Меню набора помечаются префиксом названия, --reset удаляет их
+(подменю и блюда удаляются каскадно).
+
+Запуск (нужен DATABASE_URL с PostgreSQL, схема накатывается alembic upgrade head)::
+
+    python -m benchmarks.dataset --menus 100 --submenus 10 --dishes 100 --reset
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+from sqlalchemy import delete, func, select
+
+from app.crud import insert_menu_documents
+from app.database import SessionLocal
+from app.models import Dish, Menu, Submenu
+
+TITLE_PREFIX = "Bench menu"
+
+WORDS = (
+    "soup", "salad", "steak", "pasta", "pizza", "curry", "noodles", "burger", "tacos", "risotto",
+    "dumplings", "pancakes", "stew", "roll", "pie", "sandwich", "omelette", "ramen", "kebab", "tart",
+)
+
+
+def menu_documents(menus: int, submenus: int, dishes: int, seed: int = 0):
+    """
+    Порождает документы меню с вложенными подменю и блюдами.
+
+    :param menus: Количество меню.
+    :param submenus: Подменю в каждом меню.
+    :param dishes: Блюд в каждом подменю.
+    :param seed: Зерно генератора описаний и цен.
+    """
+    rng = random.Random(seed)
+    for menu_index in range(menus):
+        yield {
+            "title": f"{TITLE_PREFIX} {menu_index}",
+            "description": " ".join(rng.choices(WORDS, k=6)),
+            "submenus": [
+                {
+                    "title": f"Submenu {submenu_index}",
+                    "description": " ".join(rng.choices(WORDS, k=6)),
+                    "dishes": [
+                        {
+                            "title": f"Dish {dish_index} {rng.choice(WORDS)}",
+                            "description": " ".join(rng.choices(WORDS, k=10)),
+                            "price": f"{rng.uniform(1, 500):.2f}",
+                        }
+                        for dish_index in range(dishes)
+                    ],
+                }
+                for submenu_index in range(submenus)
+            ],
+        }
+
+
+def reset(db):
+    """Удаляет меню, созданные генератором."""
+    deleted = db.execute(delete(Menu).where(Menu.title.startswith(TITLE_PREFIX))).rowcount
+    db.commit()
+    return deleted
+
+
+def dataset_size(db):
+    """Количество меню, подменю и блюд в БД."""
+    return {
+        "menus": db.scalar(select(func.count()).select_from(Menu)),
+        "submenus": db.scalar(select(func.count()).select_from(Submenu)),
+        "dishes": db.scalar(select(func.count()).select_from(Dish)),
+    }
+
+
+def generate(db, menus: int, submenus: int, dishes: int, seed: int = 0, commit_every: int = 10):
+    """Записывает набор данных, фиксируя транзакцию каждые commit_every меню."""
+    batch = []
+    for document in menu_documents(menus, submenus, dishes, seed):
+        batch.append(document)
+        if len(batch) >= commit_every:
+            insert_menu_documents(db, batch)
+            db.commit()
+            batch = []
+    insert_menu_documents(db, batch)
+    db.commit()
+
+
+def main(args):
+    with SessionLocal() as db:
+        if args.reset:
+            print(f"deleted {reset(db)} bench menus")
+        started = time.perf_counter()
+        generate(db, args.menus, args.submenus, args.dishes, args.seed, args.commit_every)
+        elapsed = time.perf_counter() - started
+        total = args.menus * args.submenus * args.dishes
+        print(
+            f"inserted {args.menus} menus x {args.submenus} submenus x {args.dishes} dishes "
+            f"({total} dishes) in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} dishes/s)"
+        )
+        print(f"dataset: {dataset_size(db)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--menus", type=int, default=100)
+    parser.add_argument("--submenus", type=int, default=10)
+    parser.add_argument("--dishes", type=int, default=100, help="блюд в каждом подменю")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--commit-every", type=int, default=10, help="меню в одной транзакции")
+    parser.add_argument("--reset", action="store_true", help="удалить ранее сгенерированные меню")
+    main(parser.parse_args())
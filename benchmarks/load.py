@@ -0,0 +1,353 @@
+"""
+Нагрузочный драйвер: асинхронный httpx-клиент со смесью чтений и записей
+по всем маршрутам app.main.
+
+Перед прогоном драйвер через API собирает выборку существующих меню,
+подменю и блюд (набор данных готовит benchmarks.dataset). Операция чтения -
+один запрос; операция записи - жизненный цикл объекта (создание, PUT,
+PATCH, удаление), поэтому набор данных после прогона не меняется.
+Задержка каждого запроса учитывается по шаблону маршрута, отчет с
+p50/p95/p99 и пропускной способностью сохраняется в JSON (benchmarks.report).
+
+По умолчанию приложение вызывается в процессе через ASGI-транспорт,
+с --base-url нагружается запущенный сервер.
+
+Запуск (нужен DATABASE_URL с PostgreSQL)::
+
+    python -m benchmarks.dataset --menus 100 --submenus 10 --dishes 100 --reset
+    python -m benchmarks.load --operations 5000 --concurrency 50 --write-ratio 0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+import httpx
+
+from benchmarks.dataset import TITLE_PREFIX
+from benchmarks.report import build_report, print_report, write_report
+
+MENUS = "/api/v1/menus/"
+MENU = "/api/v1/menus/{menu_id}"
+MENU_TREE = "/api/v1/menus/{menu_id}/tree"
+MENU_STATS = "/api/v1/menus/{menu_id}/stats"
+MENU_SNAPSHOT = "/api/v1/menus/{menu_id}/snapshot"
+SUBMENUS = "/api/v1/menus/{menu_id}/submenus/"
+SUBMENU = "/api/v1/menus/{menu_id}/submenus/{submenu_id}"
+DISHES = "/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/"
+DISH = "/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}"
+DISHES_BY_IDS = "/api/v1/dishes"
+SEARCH = "/api/v1/search"
+
+# Запросы поиска по словам из benchmarks.dataset: широкие, узкие и префиксы
+SEARCH_QUERIES = ("pizza", "ramen kebab", "dumpl", "steak pasta soup", "submenu 1")
+IMPORT = "/api/v1/menus/import"
+EXPORT = "/api/v1/export"
+CACHE_STATS = "/api/v1/cache/stats"
+POOL = "/api/v1/diagnostics/pool"
+
+
+class Sample:
+    """Выборка идентификаторов существующих объектов для запросов чтения."""
+
+    def __init__(self):
+        self.menus = []
+        self.submenus = []
+        self.dishes = []
+        self.dataset = {"menus": 0, "submenus": 0, "dishes": 0}
+
+
+class Driver:
+    """Выполняет запросы и копит задержки по шаблонам маршрутов."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, method: str, template: str, expected=(200,), **kwargs):
+        """Выполняет запрос по шаблону маршрута и учитывает его задержку."""
+        params = kwargs.pop("path", {})
+        route = f"{method} {template}"
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, template.format(**params), **kwargs)
+        except httpx.HTTPError:
+            self.samples[route].append(time.perf_counter() - started)
+            self.errors[route] += 1
+            return None
+        self.samples[route].append(time.perf_counter() - started)
+        if response.status_code not in expected:
+            self.errors[route] += 1
+        return response
+
+
+async def discover(client: httpx.AsyncClient, menus: int, submenus: int, dishes: int, title_prefix: str = ""):
+    """
+    Собирает выборку объектов и размер набора данных через API.
+
+    Размер берется из счетчиков меню при обходе всех страниц списка меню.
+    В выборку попадают только меню с названием на title_prefix и только
+    меню и подменю с блюдами: в БД могут быть и чужие или пустые меню,
+    например оставленные тестами.
+    """
+    sample = Sample()
+    cursor = None
+    while True:
+        params = {"limit": 1000, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(MENUS, params=params)
+        response.raise_for_status()
+        for menu in response.json():
+            sample.dataset["menus"] += 1
+            sample.dataset["submenus"] += menu["submenus_count"]
+            sample.dataset["dishes"] += menu["dishes_count"]
+            if len(sample.menus) < menus and menu["dishes_count"] and menu["title"].startswith(title_prefix):
+                sample.menus.append(menu["id"])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    for menu_id in sample.menus:
+        response = await client.get(SUBMENUS.format(menu_id=menu_id), params={"limit": 1000})
+        for submenu in [submenu for submenu in response.json() if submenu["dishes_count"]][:submenus]:
+            sample.submenus.append((menu_id, submenu["id"]))
+            response = await client.get(
+                DISHES.format(menu_id=menu_id, submenu_id=submenu["id"]), params={"limit": dishes}
+            )
+            sample.dishes += [(menu_id, submenu["id"], dish["id"]) for dish in response.json()]
+    return sample
+
+
+def unique(prefix: str):
+    """Уникальное название для объектов, создаваемых записью."""
+    return f"{prefix} {uuid4().hex[:12]}"
+
+
+async def read_menus(driver: Driver, sample: Sample, rng: random.Random):
+    await driver.request("GET", MENUS, params={"limit": 100})
+
+
+async def read_menu(driver: Driver, sample: Sample, rng: random.Random):
+    await driver.request("GET", MENU, path={"menu_id": rng.choice(sample.menus)})
+
+
+async def read_menu_tree(driver: Driver, sample: Sample, rng: random.Random):
+    await driver.request("GET", MENU_TREE, path={"menu_id": rng.choice(sample.menus)})
+
+
+async def read_menu_snapshot(driver: Driver, sample: Sample, rng: random.Random):
+    await driver.request(
+        "GET", MENU_SNAPSHOT, path={"menu_id": rng.choice(sample.menus)}, headers={"Accept-Encoding": "gzip, br"}
+    )
+
+
+async def read_menu_stats(driver: Driver, sample: Sample, rng: random.Random):
+    await driver.request("GET", MENU_STATS, path={"menu_id": rng.choice(sample.menus)})
+
+
+async def read_submenus(driver: Driver, sample: Sample, rng: random.Random):
+    await driver.request("GET", SUBMENUS, path={"menu_id": rng.choice(sample.menus)})
+
+
+async def read_submenu(driver: Driver, sample: Sample, rng: random.Random):
+    menu_id, submenu_id = rng.choice(sample.submenus)
+    await driver.request("GET", SUBMENU, path={"menu_id": menu_id, "submenu_id": submenu_id})
+
+
+async def read_dishes(driver: Driver, sample: Sample, rng: random.Random):
+    menu_id, submenu_id = rng.choice(sample.submenus)
+    await driver.request("GET", DISHES, path={"menu_id": menu_id, "submenu_id": submenu_id})
+
+
+async def read_dishes_by_price(driver: Driver, sample: Sample, rng: random.Random):
+    menu_id, submenu_id = rng.choice(sample.submenus)
+    params = {"order_by": rng.choice(("price", "-price")), "min_price": rng.choice((0, 5, 10)), "limit": 20}
+    await driver.request("GET", DISHES, path={"menu_id": menu_id, "submenu_id": submenu_id}, params=params)
+
+
+async def read_dish(driver: Driver, sample: Sample, rng: random.Random):
+    menu_id, submenu_id, dish_id = rng.choice(sample.dishes)
+    await driver.request("GET", DISH, path={"menu_id": menu_id, "submenu_id": submenu_id, "dish_id": dish_id})
+
+
+async def read_dishes_by_ids(driver: Driver, sample: Sample, rng: random.Random):
+    dishes = rng.sample(sample.dishes, min(20, len(sample.dishes)))
+    await driver.request("GET", DISHES_BY_IDS, params={"ids": ",".join(dish_id for _, _, dish_id in dishes)})
+
+
+async def read_search(driver: Driver, sample: Sample, rng: random.Random):
+    params = {"q": rng.choice(SEARCH_QUERIES)}
+    if rng.random() < 0.5:
+        params["menu_id"] = rng.choice(sample.menus)
+    await driver.request("GET", SEARCH, params=params)
+
+
+async def read_export(driver: Driver, sample: Sample, rng: random.Random):
+    await driver.request(
+        "GET", EXPORT, params={"menu_id": rng.choice(sample.menus), "format": rng.choice(("ndjson", "csv"))}
+    )
+
+
+async def read_diagnostics(driver: Driver, sample: Sample, rng: random.Random):
+    await driver.request("GET", rng.choice((CACHE_STATS, POOL)))
+
+
+async def write_menu(driver: Driver, sample: Sample, rng: random.Random):
+    response = await driver.request(
+        "POST", MENUS, expected=(201,), json={"title": unique("Load menu"), "description": "load"}
+    )
+    if response is None or response.status_code != 201:
+        return
+    path = {"menu_id": response.json()["id"]}
+    await driver.request("PUT", MENU, path=path, json={"title": unique("Load menu"), "description": "put"})
+    await driver.request("PATCH", MENU, path=path, json={"description": "patch"})
+    await driver.request("DELETE", MENU, path=path)
+
+
+async def write_submenu(driver: Driver, sample: Sample, rng: random.Random):
+    menu_id = rng.choice(sample.menus)
+    response = await driver.request(
+        "POST", SUBMENUS, expected=(201,), path={"menu_id": menu_id},
+        json={"title": unique("Load submenu"), "description": "load"},
+    )
+    if response is None or response.status_code != 201:
+        return
+    path = {"menu_id": menu_id, "submenu_id": response.json()["id"]}
+    await driver.request("PUT", SUBMENU, path=path, json={"title": unique("Load submenu"), "description": "put"})
+    await driver.request("PATCH", SUBMENU, path=path, json={"description": "patch"})
+    await driver.request("DELETE", SUBMENU, path=path)
+
+
+async def write_dish(driver: Driver, sample: Sample, rng: random.Random):
+    menu_id, submenu_id = rng.choice(sample.submenus)
+    response = await driver.request(
+        "POST", DISHES, expected=(201,), path={"menu_id": menu_id, "submenu_id": submenu_id},
+        json={"title": unique("Load dish"), "description": "load", "price": f"{rng.uniform(1, 100):.2f}"},
+    )
+    if response is None or response.status_code != 201:
+        return
+    path = {"menu_id": menu_id, "submenu_id": submenu_id, "dish_id": response.json()["id"]}
+    await driver.request(
+        "PUT", DISH, path=path, json={"title": unique("Load dish"), "description": "put", "price": "9.99"}
+    )
+    await driver.request("PATCH", DISH, path=path, json={"price": f"{rng.uniform(1, 100):.2f}"})
+    await driver.request("DELETE", DISH, path=path)
+
+
+async def write_import(driver: Driver, sample: Sample, rng: random.Random):
+    document = {
+        "title": unique("Load import"),
+        "description": "load",
+        "submenus": [
+            {
+                "title": f"Submenu {i}",
+                "description": "load",
+                "dishes": [{"title": f"Dish {j}", "description": "load", "price": "1.00"} for j in range(5)],
+            }
+            for i in range(2)
+        ],
+    }
+    response = await driver.request("POST", IMPORT, expected=(201,), json=[document])
+    if response is None or response.status_code != 201:
+        return
+    await driver.request("DELETE", MENU, path={"menu_id": response.json()[0]["id"]})
+
+
+# Операция -> вес внутри своей группы
+READS = {
+    read_menus: 5,
+    read_menu: 20,
+    read_menu_tree: 3,
+    read_menu_stats: 2,
+    read_menu_snapshot: 10,
+    read_submenus: 10,
+    read_submenu: 15,
+    read_dishes: 20,
+    read_dishes_by_price: 5,
+    read_dish: 25,
+    read_dishes_by_ids: 5,
+    read_search: 5,
+    read_export: 1,
+    read_diagnostics: 1,
+}
+WRITES = {
+    write_menu: 1,
+    write_submenu: 2,
+    write_dish: 6,
+    write_import: 1,
+}
+
+
+async def worker(driver: Driver, sample: Sample, operations: asyncio.Queue, write_ratio: float, seed: int):
+    """Выполняет операции из очереди, выбирая их по весам."""
+    rng = random.Random(seed)
+    while True:
+        try:
+            operations.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        group = WRITES if rng.random() < write_ratio else READS
+        operation = rng.choices(list(group), weights=list(group.values()))[0]
+        await operation(driver, sample, rng)
+
+
+async def run(client: httpx.AsyncClient, args):
+    """Собирает выборку, выполняет прогон и возвращает отчет."""
+    sample = await discover(client, args.sample_menus, args.sample_submenus, args.sample_dishes, args.title_prefix)
+    if not sample.dishes:
+        raise SystemExit("no dishes to read: generate a dataset with python -m benchmarks.dataset")
+
+    driver = Driver(client)
+    operations = asyncio.Queue()
+    for _ in range(args.operations):
+        operations.put_nowait(None)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        worker(driver, sample, operations, args.write_ratio, args.seed + index)
+        for index in range(args.concurrency)
+    ))
+    duration = time.perf_counter() - started
+
+    meta = {
+        "target": args.base_url or "asgi",
+        "operations": args.operations,
+        "concurrency": args.concurrency,
+        "write_ratio": args.write_ratio,
+        "seed": args.seed,
+    }
+    return build_report(driver.samples, driver.errors, duration, meta, sample.dataset)
+
+
+async def main(args):
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=60)
+    else:
+        from app.main import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60)
+    async with client:
+        report = await run(client, args)
+    print_report(report)
+    print(f"report: {write_report(report, args.output)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="адрес запущенного сервера; по умолчанию app.main в процессе")
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="доля операций записи")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample-menus", type=int, default=20)
+    parser.add_argument("--sample-submenus", type=int, default=5, help="подменю на меню в выборке")
+    parser.add_argument("--sample-dishes", type=int, default=10, help="блюд на подменю в выборке")
+    parser.add_argument(
+        "--title-prefix", default=TITLE_PREFIX, help="выборка только из меню с таким началом названия"
+    )
+    parser.add_argument("--output", help="путь к JSON-отчету; по умолчанию benchmarks/results/")
+    asyncio.run(main(parser.parse_args()))
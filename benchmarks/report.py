@@ -0,0 +1,144 @@
+"""
+Отчеты нагрузочных прогонов: перцентили задержек, пропускная способность,
+сохранение в JSON и сравнение двух отчетов (например, двух коммитов).
+
+Сравнение::
+
+    python -m benchmarks.report benchmarks/results/old.json benchmarks/results/new.json
+"""
+import argparse
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+
+PERCENTILES = (50, 95, 99)
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentile(sorted_values: list, percent: float):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: list, errors: int, duration: float):
+    """
+    Сводка по одной группе запросов.
+
+    :param latencies: Задержки запросов в секундах.
+    :param errors: Количество ответов с ошибкой.
+    :param duration: Длительность прогона в секундах.
+    :return: Словарь со счетчиками, пропускной способностью и задержками в мс.
+    """
+    values = sorted(latencies)
+    summary = {
+        "count": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / duration, 2) if duration else None,
+        "mean_ms": round(sum(values) / len(values) * 1000, 3) if values else None,
+        "max_ms": round(values[-1] * 1000, 3) if values else None,
+    }
+    for percent in PERCENTILES:
+        value = percentile(values, percent)
+        summary[f"p{percent}_ms"] = round(value * 1000, 3) if value is not None else None
+    return summary
+
+
+def git_revision():
+    """Текущий коммит и признак незафиксированных изменений."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def build_report(samples: dict, errors: dict, duration: float, meta: dict, dataset: dict):
+    """
+    Собирает отчет прогона.
+
+    :param samples: Задержки по маршрутам ("METHOD /шаблон/пути" -> список секунд).
+    :param errors: Количество ошибок по маршрутам.
+    :param duration: Длительность прогона в секундах.
+    :param meta: Параметры прогона.
+    :param dataset: Размер набора данных.
+    :return: Словарь отчета.
+    """
+    all_latencies = [latency for latencies in samples.values() for latency in latencies]
+    return {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            **meta,
+        },
+        "dataset": dataset,
+        "totals": {"duration_s": round(duration, 3), **summarize(all_latencies, sum(errors.values()), duration)},
+        "routes": {
+            route: summarize(samples[route], errors.get(route, 0), duration) for route in sorted(samples)
+        },
+    }
+
+
+def write_report(report: dict, path: str = None):
+    """Сохраняет отчет в JSON; по умолчанию в results/<коммит>-<время>.json."""
+    if path is None:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = RESULTS_DIR / f"{report['meta']['commit'] or 'unknown'}-{stamp}.json"
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return path
+
+
+def print_report(report: dict):
+    """Печатает таблицу задержек по маршрутам."""
+    print(f"{'route':72s} {'count':>7s} {'err':>5s} {'rps':>9s} {'p50':>8s} {'p95':>8s} {'p99':>8s}")
+    rows = [*report["routes"].items(), ("TOTAL", report["totals"])]
+    for route, summary in rows:
+        print(
+            f"{route:72s} {summary['count']:7d} {summary['errors']:5d} {summary['throughput_rps']:9.1f} "
+            f"{summary['p50_ms']:8.2f} {summary['p95_ms']:8.2f} {summary['p99_ms']:8.2f}"
+        )
+
+
+def change(old, new):
+    """Относительное изменение в процентах."""
+    if old in (None, 0) or new is None:
+        return "     n/a"
+    return f"{(new - old) / old * 100:+7.1f}%"
+
+
+def compare(old: dict, new: dict):
+    """Печатает изменение пропускной способности и перцентилей между двумя отчетами."""
+    print(f"old: {old['meta'].get('commit')} {old['meta'].get('timestamp')}")
+    print(f"new: {new['meta'].get('commit')} {new['meta'].get('timestamp')}")
+    print(f"{'route':72s} {'rps':>9s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    routes = [*sorted(set(old["routes"]) | set(new["routes"])), "TOTAL"]
+    for route in routes:
+        before = old["totals"] if route == "TOTAL" else old["routes"].get(route, {})
+        after = new["totals"] if route == "TOTAL" else new["routes"].get(route, {})
+        print(
+            f"{route:72s} {change(before.get('throughput_rps'), after.get('throughput_rps')):>9s} "
+            + " ".join(
+                f"{change(before.get(f'p{p}_ms'), after.get(f'p{p}_ms')):>9s}" for p in PERCENTILES
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args()
+    compare(json.loads(Path(args.old).read_text()), json.loads(Path(args.new).read_text()))
@@ -0,0 +1,73 @@
+"""
+Стоимость сериализации списка блюд: прежний путь против нового.
+
+- before: обработчик возвращал ORM-объекты, FastAPI прогонял их через
+  jsonable_encoder (разбор атрибутов рефлексией) и JSONResponse (json.dumps);
+- model: те же данные через модель ответа DishOut (проверка и сериализация
+  в pydantic-core) и ORJSONResponse;
+- after: кортежи строк превращаются в словари по полям DishOut и сразу
+  сериализуются ORJSONResponse, как в app.main.page_response.
+
+Строки и объекты собираются в памяти, запросов к БД при замерах нет.
+
+Запуск::
+
+    python -m benchmarks.serialization --dishes 10000 --repeat 20
+"""
+import argparse
+import os
+import timeit
+from uuid import uuid4
+
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.main import DishOut, page_response
+from app.models import Dish
+
+
+def build_rows(count: int):
+    """Строки списка блюд в порядке DISH_COLUMNS."""
+    submenu_id = str(uuid4())
+    menu_id = str(uuid4())
+    rows = [
+        [str(uuid4()), f"Dish {i}", f"Description of dish {i}", f"{i % 1000}.{i % 100:02d}", 1]
+        for i in range(count)
+    ]
+    objects = [
+        Dish(id=row[0], title=row[1], description=row[2], price=row[3], version=row[4],
+             menu_id=menu_id, submenu_id=submenu_id)
+        for row in rows
+    ]
+    return rows, objects
+
+
+def main(args):
+    rows, objects = build_rows(args.dishes)
+    dish_list = TypeAdapter(list[DishOut])
+
+    cases = {
+        "before (ORM + jsonable_encoder + json)": lambda: JSONResponse(jsonable_encoder(objects)),
+        "model (DishOut + orjson)": lambda: ORJSONResponse(
+            dish_list.dump_python(dish_list.validate_python(objects, from_attributes=True), mode="json")
+        ),
+        "after (row tuples + orjson)": lambda: page_response(DishOut, rows),
+    }
+
+    print(f"dishes={args.dishes} repeat={args.repeat}")
+    baseline = None
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=1, repeat=args.repeat))
+        per_10k = seconds * 10000 / args.dishes * 1000
+        baseline = baseline or per_10k
+        print(f"{name:40s} {per_10k:8.2f} ms / 10k dishes ({baseline / per_10k:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dishes", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
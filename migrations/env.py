@@ -0,0 +1,71 @@
+"""
+Окружение Alembic.
+
+Схема сравнивается с app.models.Base.metadata, адрес БД берется из
+DATABASE_URL, если в конфигурации не задан sqlalchemy.url (так проверка
+схемы в тестах направляет миграции в отдельную схему).
+
+Триграммные индексы (*_trgm) создаются миграцией только при наличии
+pg_trgm и в моделях не описаны, поэтому при сравнении пропускаются.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.database import DATABASE_URL
+from app.models import Base
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+url = config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Пропускает триграммные индексы, которых нет в моделях."""
+    return not (type_ == "index" and reflected and name.endswith("_trgm"))
+
+
+def run_migrations_offline():
+    """Выводит SQL миграций без подключения к БД (alembic upgrade --sql)."""
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """
+    Выполняет миграции на подключении к БД.
+
+    Каждая ревизия идет в своей транзакции: ревизии с пакетным переносом
+    данных фиксируют пачки по отдельности.
+    """
+    engine = create_engine(url, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            transaction_per_migration=True,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,63 @@
+"""Исходная схема (как ее создавал Base.metadata.create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "menus",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_menus_id", "menus", ["id"])
+    op.create_index("ix_menus_title", "menus", ["title"])
+
+    op.create_table(
+        "submenus",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("menu_id", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["menu_id"], ["menus.id"], name="submenus_menu_id_fkey"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("title", name="submenus_title_key"),
+    )
+    op.create_index("ix_submenus_id", "submenus", ["id"])
+
+    op.create_table(
+        "dishes",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.String(), nullable=True),
+        sa.Column("price", sa.String(), nullable=True),
+        sa.Column("menu_id", sa.String(), nullable=True),
+        sa.Column("submenu_id", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["menu_id"], ["menus.id"], name="dishes_menu_id_fkey"),
+        sa.ForeignKeyConstraint(["submenu_id"], ["submenus.id"], name="dishes_submenu_id_fkey"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("title", name="dishes_title_key"),
+    )
+    op.create_index("ix_dishes_id", "dishes", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("dishes")
+    op.drop_table("submenus")
+    op.drop_table("menus")
@@ -0,0 +1,94 @@
+"""Счетчики, версии строк, каскадное удаление и индексы внешних ключей
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:05:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FOREIGN_KEYS = [
+    ("submenus_menu_id_fkey", "submenus", "menus", "menu_id"),
+    ("dishes_menu_id_fkey", "dishes", "menus", "menu_id"),
+    ("dishes_submenu_id_fkey", "dishes", "submenus", "submenu_id"),
+]
+
+
+def upgrade() -> None:
+    # Денормализованные счетчики и версии строк
+    for table, columns in (
+        ("menus", ("submenus_count", "dishes_count")),
+        ("submenus", ("dishes_count",)),
+    ):
+        for column in columns:
+            op.add_column(table, sa.Column(column, sa.Integer(), server_default="0", nullable=False))
+    for table in ("menus", "submenus", "dishes"):
+        op.add_column(table, sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+
+    op.execute(
+        "UPDATE submenus SET dishes_count = "
+        "(SELECT count(*) FROM dishes WHERE dishes.submenu_id = submenus.id)"
+    )
+    # Блюда меню считаются через его подменю, как в _adjust_counters и recount_counters
+    op.execute(
+        "UPDATE menus SET "
+        "submenus_count = (SELECT count(*) FROM submenus WHERE submenus.menu_id = menus.id), "
+        "dishes_count = (SELECT coalesce(sum(submenus.dishes_count), 0) FROM submenus "
+        "WHERE submenus.menu_id = menus.id)"
+    )
+
+    # Внешние ключи удаляют дочерние строки на стороне БД
+    for name, table, referred, column in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(name, table, referred, [column], ["id"], ondelete="CASCADE")
+
+    # Названия уникальны в пределах родителя, а не во всей таблице
+    op.drop_constraint("submenus_title_key", "submenus", type_="unique")
+    op.drop_constraint("dishes_title_key", "dishes", type_="unique")
+    op.create_index("uq_submenus_menu_id_title", "submenus", ["menu_id", "title"], unique=True)
+    op.create_index("uq_dishes_submenu_id_title", "dishes", ["submenu_id", "title"], unique=True)
+
+    # Индексы для выборок по родителю и keyset-пагинации внутри него
+    op.create_index("ix_submenus_menu_id_id", "submenus", ["menu_id", "id"])
+    op.create_index("ix_dishes_submenu_id_id", "dishes", ["submenu_id", "id"])
+    op.create_index("ix_dishes_menu_id", "dishes", ["menu_id"])
+
+    # Первичный ключ уже индексирован, отдельный индекс по id лишний
+    op.drop_index("ix_menus_id", table_name="menus")
+    op.drop_index("ix_submenus_id", table_name="submenus")
+    op.drop_index("ix_dishes_id", table_name="dishes")
+
+
+def downgrade() -> None:
+    op.create_index("ix_dishes_id", "dishes", ["id"])
+    op.create_index("ix_submenus_id", "submenus", ["id"])
+    op.create_index("ix_menus_id", "menus", ["id"])
+
+    op.drop_index("ix_dishes_menu_id", table_name="dishes")
+    op.drop_index("ix_dishes_submenu_id_id", table_name="dishes")
+    op.drop_index("ix_submenus_menu_id_id", table_name="submenus")
+
+    op.drop_index("uq_dishes_submenu_id_title", table_name="dishes")
+    op.drop_index("uq_submenus_menu_id_title", table_name="submenus")
+    op.create_unique_constraint("dishes_title_key", "dishes", ["title"])
+    op.create_unique_constraint("submenus_title_key", "submenus", ["title"])
+
+    for name, table, referred, column in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_="foreignkey")
+        op.create_foreign_key(name, table, referred, [column], ["id"])
+
+    for table in ("dishes", "submenus", "menus"):
+        op.drop_column(table, "version")
+    op.drop_column("submenus", "dishes_count")
+    op.drop_column("menus", "dishes_count")
+    op.drop_column("menus", "submenus_count")
@@ -0,0 +1,167 @@
+"""Нативные UUID вместо строковых идентификаторов и NUMERIC(10, 2) для цены
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:00:00
+
+Данные переносятся в теневые колонки пачками по BATCH_SIZE строк, каждая
+пачка в своей транзакции, поэтому большие таблицы не блокируются одним
+долгим UPDATE. Пока идет перенос, триггер BEFORE INSERT OR UPDATE
+заполняет теневые колонки каждой записываемой строки, так что вставки,
+изменения и перенос блюд в другое подменю во время переноса не теряются.
+Затем в одной транзакции таблицы блокируются от записи (SHARE ROW
+EXCLUSIVE, чтение продолжается), триггеры удаляются и теневые колонки
+подменяют исходные вместе с ключами и индексами.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+# Таблица -> колонки и выражения, которыми они переводятся в новый тип
+CONVERSIONS = {
+    "menus": {"id": "id::uuid"},
+    "submenus": {"id": "id::uuid", "menu_id": "menu_id::uuid"},
+    "dishes": {
+        "id": "id::uuid",
+        "menu_id": "menu_id::uuid",
+        "submenu_id": "submenu_id::uuid",
+        "price": "NULLIF(trim(price), '')::numeric(10, 2)",
+    },
+}
+
+NEW_TYPES = {
+    "id": "uuid",
+    "menu_id": "uuid",
+    "submenu_id": "uuid",
+    "price": "numeric(10, 2)",
+}
+
+FOREIGN_KEYS = [
+    ("submenus_menu_id_fkey", "submenus", "menus", "menu_id"),
+    ("dishes_menu_id_fkey", "dishes", "menus", "menu_id"),
+    ("dishes_submenu_id_fkey", "dishes", "submenus", "submenu_id"),
+]
+
+INDEXES = [
+    ("uq_submenus_menu_id_title", "submenus", ["menu_id", "title"], True),
+    ("ix_submenus_menu_id_id", "submenus", ["menu_id", "id"], False),
+    ("uq_dishes_submenu_id_title", "dishes", ["submenu_id", "title"], True),
+    ("ix_dishes_submenu_id_id", "dishes", ["submenu_id", "id"], False),
+    ("ix_dishes_menu_id", "dishes", ["menu_id"], False),
+]
+
+
+def assignments(table):
+    """SET-часть UPDATE, заполняющего теневые колонки таблицы."""
+    return ", ".join(f"{column}_new = {expression}" for column, expression in CONVERSIONS[table].items())
+
+
+def create_sync_trigger(table):
+    """Триггер, заполняющий теневые колонки при каждой вставке и изменении строки."""
+    columns = CONVERSIONS[table]
+    drop_sync_trigger(table)
+    op.execute(
+        f"CREATE FUNCTION {table}_sync_new() RETURNS trigger AS $$ BEGIN "
+        f"SELECT {', '.join(columns.values())} INTO {', '.join(f'NEW.{column}_new' for column in columns)} "
+        f"FROM (SELECT NEW.*) AS new_row; RETURN NEW; END $$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        f"CREATE TRIGGER {table}_sync_new BEFORE INSERT OR UPDATE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_sync_new()"
+    )
+
+
+def drop_sync_trigger(table):
+    """Удаляет триггер create_sync_trigger."""
+    op.execute(f"DROP TRIGGER IF EXISTS {table}_sync_new ON {table}")
+    op.execute(f"DROP FUNCTION IF EXISTS {table}_sync_new()")
+
+
+def backfill(table):
+    """
+    Заполняет теневые колонки таблицы пачками по первичному ключу.
+
+    Каждая пачка - диапазон ``id > :last AND id <= :upper`` по индексу
+    первичного ключа, поэтому стоимость пачки не растет к концу таблицы.
+    """
+    connection = op.get_bind()
+    last_id = ""
+    while True:
+        upper_id = connection.execute(
+            sa.text(
+                f"SELECT max(id) FROM (SELECT id FROM {table} WHERE id > :last ORDER BY id LIMIT :size) AS batch"
+            ),
+            {"last": last_id, "size": BATCH_SIZE},
+        ).scalar()
+        if upper_id is None:
+            return
+        connection.execute(
+            sa.text(f"UPDATE {table} SET {assignments(table)} WHERE id > :last AND id <= :upper"),
+            {"last": last_id, "upper": upper_id},
+        )
+        last_id = upper_id
+
+
+def upgrade() -> None:
+    for table, columns in CONVERSIONS.items():
+        for column in columns:
+            op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column}_new {NEW_TYPES[column]}")
+        create_sync_trigger(table)
+
+    with op.get_context().autocommit_block():
+        for table in CONVERSIONS:
+            backfill(table)
+
+    # До конца транзакции запись ждет, поэтому теневые колонки уже не разойдутся с исходными
+    op.execute(f"LOCK TABLE {', '.join(CONVERSIONS)} IN SHARE ROW EXCLUSIVE MODE")
+    for table in CONVERSIONS:
+        drop_sync_trigger(table)
+        # Строки, которые не застал ни перенос, ни триггер (прерванный прошлый запуск)
+        op.execute(f"UPDATE {table} SET {assignments(table)} WHERE id_new IS NULL")
+
+    for name, table, _, _ in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_="foreignkey")
+
+    # Удаление старых колонок удаляет и построенные на них индексы
+    for table in reversed(list(CONVERSIONS)):
+        for column in CONVERSIONS[table]:
+            op.drop_column(table, column)
+            op.alter_column(table, f"{column}_new", new_column_name=column)
+        op.alter_column(table, "id", nullable=False)
+        op.create_primary_key(f"{table}_pkey", table, ["id"])
+
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique)
+
+    for name, table, referred, column in FOREIGN_KEYS:
+        op.create_foreign_key(name, table, referred, [column], ["id"], ondelete="CASCADE")
+
+
+def downgrade() -> None:
+    for name, table, _, _ in FOREIGN_KEYS:
+        op.drop_constraint(name, table, type_="foreignkey")
+
+    for table, columns in CONVERSIONS.items():
+        for column in columns:
+            op.alter_column(
+                table,
+                column,
+                type_=sa.String(),
+                existing_type=postgresql.UUID() if column != "price" else sa.Numeric(10, 2),
+                postgresql_using=f"{column}::text",
+            )
+
+    for name, table, referred, column in FOREIGN_KEYS:
+        op.create_foreign_key(name, table, referred, [column], ["id"], ondelete="CASCADE")
@@ -0,0 +1,70 @@
+"""Полнотекстовый и нечеткий поиск по подменю и блюдам
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:00:00
+
+Поисковый вектор - хранимая вычисляемая колонка: ее добавление переписывает
+таблицу. GIN-индексы строятся CONCURRENTLY вне транзакции и не блокируют
+запись. Триграммные индексы названий для поиска с опечатками создаются,
+только если на сервере доступно расширение pg_trgm; без него поиск
+работает только по tsvector.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("submenus", "dishes")
+
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(title, ''::character varying)::text), 'A'::\"char\") || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(description, ''::character varying)::text), 'B'::\"char\")"
+)
+
+
+def trigram_available():
+    """Доступно ли расширение pg_trgm (при выводе SQL считается доступным)."""
+    if op.get_context().as_sql:
+        return True
+    query = sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    return op.get_bind().execute(query).scalar() is not None
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(
+            table, sa.Column("search_vector", postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True))
+        )
+
+    trigram = trigram_available()
+    if trigram:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f"ix_{table}_search_vector", table, ["search_vector"],
+                postgresql_using="gin", postgresql_concurrently=True,
+            )
+            if trigram:
+                op.create_index(
+                    f"ix_{table}_title_trgm", table, ["title"],
+                    postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}, postgresql_concurrently=True,
+                )
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_title_trgm")
+        op.drop_index(f"ix_{table}_search_vector", table_name=table)
+        op.drop_column(table, "search_vector")
@@ -0,0 +1,33 @@
+"""Индекс цены блюд для фильтра, сортировки и статистики по цене
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 18:00:00
+
+Индекс (submenu_id, price, id) отдает блюда подменю в диапазоне цен уже
+упорядоченными по цене, а id в конце делает порядок однозначным для
+курсора. Строится CONCURRENTLY вне транзакции и не блокирует запись.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_dishes_submenu_id_price", "dishes", ["submenu_id", "price", "id"], postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_dishes_submenu_id_price", table_name="dishes", postgresql_concurrently=True)
@@ -1,11 +1,29 @@
+import os
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import sessionmaker
 
+# Каждый запрос TestClient без контекста выполняется в новом цикле событий,
+# поэтому асинхронные соединения не должны переиспользоваться между запросами
+os.environ.setdefault("DB_POOL_CLASS", "null")
+# События раздаются в процессе: LISTEN/NOTIFY проверяется отдельным тестом
+os.environ.setdefault("EVENTS_BACKEND", "memory")
+
 from app.main import app
-from app.database import Base
+from app.database import DATABASE_URL, get_async_engine
+from app.models import Base
+
+
+# Приложение не создает схему при старте, поэтому ее создают тесты
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    engine = create_engine(DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
 
 
 # Тестовая база данных
@@ -23,3 +41,45 @@ def test_db():
 @pytest.fixture
 def client():
     return TestClient(app)
+
+
+class QueryCounter:
+    """Счетчик SQL-запросов, выполненных через движок приложения."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def reset(self):
+        self.statements.clear()
+
+
+# Подсчет SQL-запросов на движке, которым пользуется get_db
+@pytest.fixture
+def query_counter():
+    counter = QueryCounter()
+    engine = get_async_engine().sync_engine
+    event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
+
+
+# Проверка, что блок кода укладывается в бюджет SQL-запросов
+@pytest.fixture
+def query_budget(query_counter):
+    @contextmanager
+    def budget(max_queries: int):
+        query_counter.reset()
+        yield query_counter
+        assert query_counter.count <= max_queries, (
+            f"{query_counter.count} SQL statements, budget is {max_queries}:\n"
+            + "\n".join(query_counter.statements)
+        )
+
+    return budget
@@ -0,0 +1,82 @@
+from uuid import uuid4
+
+MENU_DATA = {"title": "Batch Menu", "description": "Batch Menu Description"}
+
+
+def create_tree(client):
+    # Меню с двумя подменю, в первом два блюда
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_ids = [
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/", json={"title": f"Batch Submenu {i}", "description": "Description"}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    dish_ids = [
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[0]}/dishes/",
+            json={"title": f"Batch Dish {i}", "description": "Description", "price": f"{i + 1}.50"},
+        ).json()["id"]
+        for i in range(2)
+    ]
+    return menu_id, submenu_ids, dish_ids
+
+
+def test_read_dish_by_id(client):
+    menu_id, submenu_ids, dish_ids = create_tree(client)
+    dish_url = f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[0]}/dishes/{{}}"
+
+    # Каждое блюдо ищется по своему id, а не первое блюдо подменю
+    for dish_id, price in zip(dish_ids, ("1.50", "2.50")):
+        response = client.get(dish_url.format(dish_id))
+        assert response.status_code == 200
+        assert response.json()["id"] == dish_id
+        assert response.json()["price"] == price
+
+    # Блюдо из другого подменю не находится
+    other = client.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[1]}/dishes/{dish_ids[0]}")
+    assert other.status_code == 404
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_dishes_by_ids(client, query_counter):
+    menu_id, _, dish_ids = create_tree(client)
+    unknown = str(uuid4())
+
+    query_counter.reset()
+    response = client.get("/api/v1/dishes", params={"ids": f"{dish_ids[1]},{unknown},{dish_ids[0]},not-a-uuid"})
+    assert response.status_code == 200
+    assert query_counter.count == 1
+    data = response.json()
+    # Порядок запроса сохраняется, отсутствующие id перечислены отдельно
+    assert [dish["id"] for dish in data["items"]] == [dish_ids[1], dish_ids[0]]
+    assert data["items"][0] == {
+        "id": dish_ids[1], "title": "Batch Dish 1", "description": "Description", "price": "2.50"
+    }
+    assert data["missing"] == [unknown, "not-a-uuid"]
+
+    # Повторяющийся параметр и повторы id
+    response = client.get("/api/v1/dishes", params=[("ids", dish_ids[0]), ("ids", dish_ids[0].upper())])
+    assert [dish["id"] for dish in response.json()["items"]] == [dish_ids[0]]
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_submenus_by_ids(client):
+    menu_id, submenu_ids, _ = create_tree(client)
+
+    response = client.get("/api/v1/submenus", params={"ids": ",".join(reversed(submenu_ids))})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [submenu["id"] for submenu in items] == list(reversed(submenu_ids))
+    assert [submenu["dishes_count"] for submenu in items] == [0, 2]
+    assert response.json()["missing"] == []
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_batch_limits(client):
+    assert client.get("/api/v1/dishes").json() == {"items": [], "missing": []}
+    too_many = ",".join(str(uuid4()) for _ in range(101))
+    assert client.get("/api/v1/dishes", params={"ids": too_many}).status_code == 400
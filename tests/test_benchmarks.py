@@ -0,0 +1,81 @@
+import asyncio
+from argparse import Namespace
+from uuid import uuid4
+
+import httpx
+
+from app.database import SessionLocal
+from app.main import app
+from benchmarks.dataset import TITLE_PREFIX, generate, reset
+from benchmarks.load import READS, WRITES, discover, run
+from benchmarks.report import percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert [percentile(values, p) for p in (50, 95, 99, 100)] == [50, 95, 99, 100]
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) is None
+
+
+def test_discover_skips_menus_without_dishes(client):
+    # Выборка только из своих меню: в БД могут остаться меню других тестов и прошлых прогонов
+    prefix = f"Discover {uuid4().hex[:8]}"
+    menu_ids = []
+    for i in range(3):
+        menu_id = client.post("/api/v1/menus/", json={"title": f"{prefix} {i}", "description": "Menu"}).json()["id"]
+        menu_ids.append(menu_id)
+        for j in range(2):
+            submenu_id = client.post(
+                f"/api/v1/menus/{menu_id}/submenus/", json={"title": f"Submenu {j}", "description": "Submenu"}
+            ).json()["id"]
+            # Блюда только у второго подменю последнего меню
+            if i == 2 and j == 1:
+                for k in range(2):
+                    client.post(
+                        f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+                        json={"title": f"Dish {k}", "description": "Dish", "price": "1.00"},
+                    )
+
+    async def sample():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            return await discover(http, menus=10, submenus=2, dishes=10, title_prefix=prefix)
+
+    try:
+        result = asyncio.run(sample())
+    finally:
+        for menu_id in menu_ids:
+            client.delete(f"/api/v1/menus/{menu_id}")
+
+    # Меню и подменю без блюд не попадают в выборку
+    assert result.menus == [menu_ids[2]]
+    assert len(result.submenus) == 1
+    assert len(result.dishes) == 2
+
+
+def test_load_driver_covers_routes_without_errors():
+    # Небольшой набор данных и прогон, в котором выполняется каждая операция
+    with SessionLocal() as db:
+        generate(db, menus=2, submenus=2, dishes=3)
+
+    async def load():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            args = Namespace(
+                operations=200, concurrency=4, write_ratio=0.5, seed=0, base_url=None,
+                sample_menus=2, sample_submenus=2, sample_dishes=3, title_prefix=TITLE_PREFIX,
+            )
+            return await run(client, args)
+
+    try:
+        report = asyncio.run(load())
+    finally:
+        with SessionLocal() as db:
+            reset(db)
+
+    assert report["totals"]["errors"] == 0
+    assert report["totals"]["count"] >= 200
+    assert len(report["routes"]) >= len(READS) + len(WRITES)
+    for summary in report["routes"].values():
+        assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"]
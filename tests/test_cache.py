@@ -0,0 +1,309 @@
+import asyncio
+import fnmatch
+
+import pytest
+from sqlalchemy.util import greenlet_spawn
+
+from app import cache, events
+from app.cache import MemoryCache, RedisCache
+
+MENU_DATA = {"title": "Cache Menu", "description": "Cache Menu Description"}
+
+
+class FakeRedis:
+    """Локальная замена клиента Redis с тем же интерфейсом."""
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+
+    def get(self, key):
+        self.commands.append("get")
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.commands.append("set")
+        self.data[key] = value.encode()
+
+    def mget(self, *keys):
+        self.commands.append("mget")
+        return [self.data.get(key) for key in keys]
+
+    def incr(self, key):
+        self.commands.append("incr")
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    def delete(self, *keys):
+        self.commands.append("delete")
+        for key in keys:
+            self.data.pop(key, None)
+
+    def sadd(self, key, *members):
+        self.commands.append("sadd")
+        self.data.setdefault(key, set()).update(member.encode() for member in members)
+
+    def srem(self, key, *members):
+        self.commands.append("srem")
+        self.data.get(key, set()).difference_update(member.encode() for member in members)
+
+    def smembers(self, key):
+        self.commands.append("smembers")
+        return set(self.data.get(key, ()))
+
+    def expire(self, key, seconds):
+        self.commands.append("expire")
+
+    def scan_iter(self, match):
+        self.commands.append("scan")
+        return [key.encode() for key in list(self.data) if fnmatch.fnmatchcase(key, match)]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Конвейер FakeRedis: команды копятся и выполняются в execute."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.calls.append((getattr(self.client, name), args, kwargs))
+            return self
+        return command
+
+    def execute(self):
+        return [command(*args, **kwargs) for command, args, kwargs in self.calls]
+
+
+class FakeAsyncRedis:
+    """Асинхронная замена клиента Redis (интерфейс redis.asyncio) поверх FakeRedis."""
+
+    def __init__(self):
+        self.sync = FakeRedis()
+
+    def __getattr__(self, name):
+        async def command(*args, **kwargs):
+            return getattr(self.sync, name)(*args, **kwargs)
+        return command
+
+    async def scan_iter(self, match):
+        for key in self.sync.scan_iter(match):
+            yield key
+
+    def pipeline(self, transaction=True):
+        pipeline = self.sync.pipeline(transaction)
+
+        async def execute():
+            return FakePipeline.execute(pipeline)
+        pipeline.execute = execute
+        return pipeline
+
+
+class BrokenRedis:
+    """Клиент Redis, который недоступен: каждая команда падает."""
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            raise ConnectionError("Redis is down")
+        return command
+
+
+BACKENDS = {
+    "memory": MemoryCache,
+    "redis": lambda: RedisCache(FakeRedis()),
+    "redis-async": lambda: RedisCache(FakeAsyncRedis()),
+}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def backend(request):
+    # Каждый тест прогоняется на всех бэкендах
+    previous = cache.get_backend()
+    backend = BACKENDS[request.param]()
+    cache.set_backend(backend)
+    cache.reset_stats()
+    yield backend
+    cache.set_backend(previous)
+
+
+def test_memory_cache_lru_eviction():
+    backend = MemoryCache(maxsize=2)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    backend.get("a")
+    backend.set("c", 3)
+    # Вытесняется давно не использованный ключ
+    assert backend.get("b") is None
+    assert backend.get("a") == 1
+    assert backend.get("c") == 3
+
+
+def test_memory_cache_ttl():
+    backend = MemoryCache(ttl=-1)
+    backend.set("a", 1)
+    assert backend.get("a") is None
+
+
+def in_greenlet(function):
+    # Как функции app.crud внутри AsyncSession.run_sync: асинхронный клиент ждется через await_only
+    return asyncio.run(greenlet_spawn(function))
+
+
+def test_delete_prefix_keeps_siblings(backend):
+    def check():
+        backend.set(cache.menu_key("1"), {"id": "1"})
+        backend.set(cache.submenu_key("1", "2"), {"id": "2"})
+        backend.set(cache.dishes_key("1", "2"), [])
+        backend.set(cache.menu_key("10"), {"id": "10"})
+
+        backend.delete_prefix(cache.menu_key("1"))
+
+        assert backend.get(cache.menu_key("1")) is None
+        assert backend.get(cache.submenu_key("1", "2")) is None
+        assert backend.get(cache.dishes_key("1", "2")) is None
+        assert backend.get(cache.menu_key("10")) == {"id": "10"}
+
+        backend.clear()
+        assert backend.get(cache.menu_key("10")) is None
+
+    in_greenlet(check)
+
+
+def test_load_racing_invalidation_is_not_cached(backend):
+    def check():
+        key = cache.submenu_key("1", "2")
+
+        def stale_load():
+            # Запись меню фиксируется и сбрасывает кэш, пока чтение грузит старое значение
+            backend.delete_prefix(cache.menu_key("1"))
+            return {"title": "stale"}
+
+        assert cache.cached(key, stale_load) == {"title": "stale"}
+        assert backend.get(key) is None
+
+        # Сброс другого меню не мешает сохранить значение
+        def load():
+            backend.delete_prefix(cache.menu_key("10"))
+            return {"title": "fresh"}
+
+        assert cache.cached(key, load) == {"title": "fresh"}
+        assert backend.get(key) == {"title": "fresh"}
+
+        # clear во время загрузки тоже отменяет сохранение
+        backend.clear()
+        assert cache.cached(key, lambda: backend.clear() or {"title": "stale"}) == {"title": "stale"}
+        assert backend.get(key) is None
+
+    in_greenlet(check)
+
+
+def test_memory_cache_generations_are_bounded():
+    backend = MemoryCache(maxsize=2)
+    generation = backend.generation(cache.menu_key("0"))
+    for i in range(5):
+        backend.delete_prefix(cache.menu_key(str(i)))
+    assert len(backend._generations) == 2
+
+    # Сброс вытесненного меню по-прежнему отменяет сохранение загрузки, начатой до него
+    backend.set(cache.menu_key("0"), {"id": "0"}, generation)
+    assert backend.get(cache.menu_key("0")) is None
+    backend.set(cache.menu_key("0"), {"id": "0"}, backend.generation(cache.menu_key("0")))
+    assert backend.get(cache.menu_key("0")) == {"id": "0"}
+
+
+def test_redis_delete_prefix_reads_menu_index():
+    client = FakeRedis()
+    backend = RedisCache(client)
+    backend.set(cache.submenu_key("1", "2"), {"id": "2"})
+    backend.set(cache.dish_key("1", "3", "4"), {"id": "4"})
+    backend.set(cache.menu_key("10"), {"id": "10"})
+
+    # Сброс поддерева читает множество ключей меню, без SCAN по всем ключам
+    client.commands.clear()
+    backend.delete_prefix(cache.submenu_key("1", "2"))
+    assert "scan" not in client.commands
+    assert backend.get(cache.submenu_key("1", "2")) is None
+    assert backend.get(cache.dish_key("1", "3", "4")) == {"id": "4"}
+    assert client.data["menu:1:keys"] == {cache.dish_key("1", "3", "4").encode()}
+
+    # Сброс меню удаляет и его множество ключей
+    backend.delete_prefix(cache.menu_key("1"))
+    assert backend.get(cache.dish_key("1", "3", "4")) is None
+    assert "menu:1:keys" not in client.data
+
+    backend.clear()
+    assert backend.get(cache.menu_key("10")) is None
+
+
+def test_read_through_and_invalidation(client, backend):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/",
+        json={"title": "Cache Submenu", "description": "Description"},
+    ).json()["id"]
+
+    # Первое чтение - промах, второе - попадание
+    assert client.get(f"/api/v1/menus/{menu_id}").json()["dishes_count"] == 0
+    assert client.get(f"/api/v1/menus/{menu_id}").json()["dishes_count"] == 0
+    assert client.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/").json() == []
+    assert client.get("/api/v1/cache/stats").json() == {"hits": 1, "misses": 2}
+
+    # Создание блюда сбрасывает меню, подменю и список блюд
+    client.post(
+        f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+        json={"title": "Cache Dish", "description": "Description", "price": "3.00"},
+    )
+    assert client.get(f"/api/v1/menus/{menu_id}").json()["dishes_count"] == 1
+    assert client.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_id}").json()["dishes_count"] == 1
+    assert len(client.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/").json()) == 1
+
+    # Изменение меню видно сразу
+    client.patch(f"/api/v1/menus/{menu_id}", json={"title": "Cache Menu Updated"})
+    assert client.get(f"/api/v1/menus/{menu_id}").json()["title"] == "Cache Menu Updated"
+
+    # Удаление меню сбрасывает все поддерево
+    client.delete(f"/api/v1/menus/{menu_id}")
+    assert client.get(f"/api/v1/menus/{menu_id}").status_code == 404
+    assert client.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_id}").status_code == 404
+
+
+def test_redis_outage_falls_back_to_database(client):
+    previous = cache.get_backend()
+    cache.set_backend(RedisCache(BrokenRedis()))
+    try:
+        # Чтения идут в БД, записи, уже зафиксированные в БД, не падают на сбросе кэша
+        response = client.post("/api/v1/menus/", json=MENU_DATA)
+        assert response.status_code == 201
+        menu_id = response.json()["id"]
+        assert client.get(f"/api/v1/menus/{menu_id}").json()["title"] == MENU_DATA["title"]
+        assert client.patch(f"/api/v1/menus/{menu_id}", json={"title": "Outage"}).status_code == 200
+        assert client.get(f"/api/v1/menus/{menu_id}").json()["title"] == "Outage"
+        assert client.delete(f"/api/v1/menus/{menu_id}").status_code == 200
+    finally:
+        cache.set_backend(previous)
+
+
+def test_change_events_invalidate_memory_cache():
+    previous = cache.get_backend()
+    backend = MemoryCache()
+    cache.set_backend(backend)
+    try:
+        backend.set(cache.menu_key("1"), {"id": "1"})
+        backend.set(cache.dish_key("1", "2", "3"), {"id": "3"})
+        backend.set(cache.submenu_key("1", "4"), {"id": "4"})
+
+        # Событие записи из другого воркера сбрасывает меню и поддерево подменю блюда
+        events.dispatch({"type": "updated", "object": "dish", "id": "3", "menu_id": "1", "submenu_id": "2"})
+        assert backend.get(cache.menu_key("1")) is None
+        assert backend.get(cache.dish_key("1", "2", "3")) is None
+        assert backend.get(cache.submenu_key("1", "4")) == {"id": "4"}
+
+        # resync: события могли потеряться, кэш очищается целиком
+        events.dispatch_resync()
+        assert backend.get(cache.submenu_key("1", "4")) is None
+    finally:
+        cache.set_backend(previous)
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import update
+
+from app import cache, events, snapshots
+from app.crud import recount_counters
+from app.database import SessionLocal
+from app.models import Menu, Submenu
+
+MENU_DATA = {"title": "Counter Menu", "description": "Counter Menu Description"}
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def create_submenu_with_dishes(client, menu_id, index, dishes):
+    # Создаем подменю с заданным количеством блюд
+    submenu_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/",
+        json={"title": f"Counter Submenu {index}", "description": "Description"},
+    ).json()["id"]
+    dish_ids = [
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+            json={"title": f"Counter Dish {index}-{i}", "description": "Description", "price": "2.00"},
+        ).json()["id"]
+        for i in range(dishes)
+    ]
+    return submenu_id, dish_ids
+
+
+def test_counters_follow_writes(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    first_id, first_dishes = create_submenu_with_dishes(client, menu_id, 1, 3)
+    second_id, _ = create_submenu_with_dishes(client, menu_id, 2, 2)
+
+    menu = client.get(f"/api/v1/menus/{menu_id}").json()
+    assert menu["submenus_count"] == 2
+    assert menu["dishes_count"] == 5
+
+    # Удаление блюда уменьшает счетчики подменю и меню
+    client.delete(f"/api/v1/menus/{menu_id}/submenus/{first_id}/dishes/{first_dishes[0]}")
+    assert client.get(f"/api/v1/menus/{menu_id}/submenus/{first_id}").json()["dishes_count"] == 2
+    assert client.get(f"/api/v1/menus/{menu_id}").json()["dishes_count"] == 4
+
+    # Каскадное удаление подменю вычитает все его блюда
+    client.delete(f"/api/v1/menus/{menu_id}/submenus/{second_id}")
+    menu = client.get(f"/api/v1/menus/{menu_id}").json()
+    assert menu["submenus_count"] == 1
+    assert menu["dishes_count"] == 2
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_recount_counters_repairs_drift(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_id, _ = create_submenu_with_dishes(client, menu_id, 3, 2)
+
+    # Искусственно портим счетчики
+    db = SessionLocal()
+    try:
+        db.execute(update(Menu).values(submenus_count=10, dishes_count=10))
+        db.execute(update(Submenu).values(dishes_count=10))
+        db.commit()
+        recount_counters(db)
+    finally:
+        db.close()
+
+    menu = client.get(f"/api/v1/menus/{menu_id}").json()
+    assert menu["submenus_count"] == 1
+    assert menu["dishes_count"] == 2
+    assert client.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_id}").json()["dishes_count"] == 2
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_recount_resyncs_other_workers(client):
+    # Этот процесс играет воркер с кэшем и снимками в памяти, пересчет идет отдельным процессом
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    channel = f"menu_events_{uuid4().hex}"
+    previous_cache, previous_store = cache.get_backend(), snapshots.get_store()
+    cache.set_backend(cache.MemoryCache())
+    snapshots.set_store(snapshots.MemorySnapshotStore())
+
+    async def scenario():
+        backend = events.PostgresBackend(channel=channel)
+        await backend.start()
+        subscription = events.subscribe(menu_id)
+        try:
+            await asyncio.wait_for(backend.listening.wait(), 10)
+            cache.get_backend().set(cache.menu_key(menu_id), {"id": menu_id, "dishes_count": 10})
+            store = snapshots.get_store()
+            store.put(menu_id, snapshots.build({"id": menu_id}), store.generation(menu_id))
+
+            env = {**os.environ, "EVENTS_BACKEND": "postgres", "EVENTS_CHANNEL": channel, "CACHE_BACKEND": "none"}
+            process = await asyncio.create_subprocess_exec(sys.executable, "-m", "app.recount", env=env, cwd=ROOT)
+            assert await process.wait() == 0
+
+            assert await asyncio.wait_for(subscription.get(), 10) == events.RESYNC
+        finally:
+            events.unsubscribe(subscription)
+            await backend.stop()
+
+    try:
+        asyncio.run(scenario())
+        assert cache.get_backend().get(cache.menu_key(menu_id)) is None
+        assert snapshots.get_store().get(menu_id) is None
+    finally:
+        cache.set_backend(previous_cache)
+        snapshots.set_store(previous_store)
+        client.delete(f"/api/v1/menus/{menu_id}")
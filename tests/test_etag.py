@@ -0,0 +1,51 @@
+MENU_DATA = {"title": "Etag Menu", "description": "Etag Menu Description"}
+
+
+def test_menu_etag_and_not_modified(client, query_counter):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+
+    response = client.get(f"/api/v1/menus/{menu_id}")
+    etag = response.headers["ETag"]
+
+    # Актуальный ETag: 304 без тела и без загрузки строки
+    query_counter.reset()
+    response = client.get(f"/api/v1/menus/{menu_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert query_counter.count <= 1
+
+    # Создание подменю меняет счетчики и версию меню
+    client.post(f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Etag Submenu", "description": "Description"})
+    response = client.get(f"/api/v1/menus/{menu_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["submenus_count"] == 1
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_dish_etags_follow_updates(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Etag Dish Submenu", "description": "Description"}
+    ).json()["id"]
+    dish_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+        json={"title": "Etag Dish", "description": "Description", "price": "1.00"},
+    ).json()["id"]
+    dish_url = f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}"
+    list_url = f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/"
+
+    dish_etag = client.get(dish_url).headers["ETag"]
+    list_etag = client.get(list_url).headers["ETag"]
+    assert client.get(dish_url, headers={"If-None-Match": dish_etag}).status_code == 304
+    assert client.get(list_url, headers={"If-None-Match": list_etag}).status_code == 304
+
+    # Изменение цены увеличивает версию блюда
+    client.patch(dish_url, json={"price": "2.00"})
+    response = client.get(dish_url, headers={"If-None-Match": dish_etag})
+    assert response.status_code == 200
+    assert response.json()["price"] == "2.00"
+    assert client.get(list_url, headers={"If-None-Match": list_etag}).status_code == 200
+
+    client.delete(f"/api/v1/menus/{menu_id}")
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import threading
+import time
+from uuid import uuid4
+
+import httpx
+import pytest
+import uvicorn
+
+from app import async_crud, database, events
+from app.main import app
+
+MENU_DATA = {"title": "Events Menu", "description": "Events Menu Description"}
+
+
+@pytest.fixture
+def server():
+    # Настоящий сервер в потоке: TestClient не отдает ответ, пока поток не закончится
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(10)
+
+
+def read_event(lines):
+    # Следующее сообщение data, комментарии и пустые строки пропускаются
+    for line in lines:
+        if line.startswith("data: "):
+            return json.loads(line[len("data: "):])
+
+
+def test_menu_events_stream(server):
+    with httpx.Client(base_url=server, timeout=10) as http:
+        menu_id = http.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+        submenu_id = http.post(
+            f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Events Submenu", "description": "Submenu"}
+        ).json()["id"]
+        dishes_url = f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/"
+
+        with http.stream("GET", f"/api/v1/menus/{menu_id}/events") as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            lines = response.iter_lines()
+            # Строка retry уходит после подписки: дальше события не теряются
+            assert next(lines).startswith("retry: ")
+
+            dish_id = http.post(dishes_url, json={"title": "Tea", "description": "Hot", "price": "1.5"}).json()["id"]
+            assert read_event(lines) == {
+                "type": "created", "object": "dish", "id": dish_id, "menu_id": menu_id, "submenu_id": submenu_id,
+                "version": 1, "data": {"title": "Tea", "description": "Hot", "price": "1.50"},
+            }
+
+            http.patch(f"{dishes_url}{dish_id}", json={"price": "2.25"})
+            updated = read_event(lines)
+            assert (updated["type"], updated["version"], updated["data"]["price"]) == ("updated", 2, "2.25")
+
+            # Изменение несуществующего блюда события не дает
+            http.patch(f"{dishes_url}{uuid4()}", json={"price": "3"})
+            http.delete(f"/api/v1/menus/{menu_id}/submenus/{submenu_id}")
+            assert read_event(lines) == {
+                "type": "deleted", "object": "submenu", "id": submenu_id, "menu_id": menu_id,
+            }
+
+        # После отключения клиента подписка снимается
+        deadline = time.monotonic() + 5
+        while events.subscribers_count() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert events.subscribers_count() == 0
+
+        assert http.get(f"/api/v1/menus/{uuid4()}/events").status_code == 404
+        http.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_slow_subscriber_gets_resync():
+    async def scenario():
+        subscription = events.subscribe("slow-menu")
+        try:
+            for version in range(events.EVENTS_QUEUE_SIZE + 5):
+                events.dispatch({"type": "updated", "menu_id": "slow-menu", "version": version})
+            assert await subscription.get() == events.RESYNC
+            assert subscription.queue.qsize() == 4
+        finally:
+            events.unsubscribe(subscription)
+
+    asyncio.run(scenario())
+
+
+def test_postgres_listen_notify(client):
+    # Событие проходит через pg_notify в транзакции записи и LISTEN
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+
+    async def scenario():
+        backend = events.PostgresBackend(channel=f"menu_events_{uuid4().hex}")
+        previous = events.get_backend()
+        events.set_backend(backend)
+        await backend.start()
+        subscription = events.subscribe(menu_id)
+        try:
+            await asyncio.wait_for(backend.listening.wait(), 10)
+            async with database.AsyncSessionLocal() as db:
+                await async_crud.partial_update_menu(db, menu_id, {"title": "Notified"})
+            event = await asyncio.wait_for(subscription.get(), 10)
+            assert (event["type"], event["object"], event["id"], event["data"]["title"]) == (
+                "updated", "menu", menu_id, "Notified"
+            )
+
+            # Слишком большое для NOTIFY событие уходит без полей объекта
+            async with database.AsyncSessionLocal() as db:
+                await async_crud.partial_update_menu(db, menu_id, {"description": "x" * 10000})
+            event = await asyncio.wait_for(subscription.get(), 10)
+            assert event["type"] == "updated"
+            assert "data" not in event
+        finally:
+            events.unsubscribe(subscription)
+            await backend.stop()
+            events.set_backend(previous)
+
+    asyncio.run(scenario())
+    client.delete(f"/api/v1/menus/{menu_id}")
@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+IMPORT_DATA = [
+    {
+        "title": "Export Menu",
+        "description": "Description",
+        "submenus": [
+            {
+                "title": "Export Submenu 1",
+                "description": "Description",
+                "dishes": [
+                    {"title": "Export Dish 1", "description": "Description", "price": "1.00"},
+                    {"title": "Export Dish 2", "description": "Description", "price": "2.00"},
+                ],
+            },
+            {"title": "Export Submenu 2", "description": "Description"},
+        ],
+    },
+]
+
+
+def test_export_ndjson(client):
+    menu_id = client.post("/api/v1/menus/import", json=IMPORT_DATA).json()[0]["id"]
+
+    response = client.get("/api/v1/export", params={"format": "ndjson", "menu_id": menu_id})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    # Строка на каждое блюдо и на подменю без блюд
+    assert len(rows) == 3
+    assert {row["menu_id"] for row in rows} == {menu_id}
+    assert sorted(row["dish_price"] for row in rows if row["dish_id"]) == ["1.00", "2.00"]
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_export_csv(client):
+    menu_id = client.post("/api/v1/menus/import", json=IMPORT_DATA).json()[0]["id"]
+
+    response = client.get("/api/v1/export", params={"format": "csv", "menu_id": menu_id})
+    assert response.status_code == 200
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 3
+    assert {row["submenu_title"] for row in rows} == {"Export Submenu 1", "Export Submenu 2"}
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_export_unknown_format(client):
+    assert client.get("/api/v1/export", params={"format": "xml"}).status_code == 422
@@ -0,0 +1,77 @@
+import json
+
+IMPORT_DATA = [
+    {
+        "title": "Import Menu 1",
+        "description": "Description",
+        "submenus": [
+            {
+                "title": "Import Submenu 1",
+                "description": "Description",
+                "dishes": [
+                    {"title": "Import Dish 1", "description": "Description", "price": "10.5"},
+                    {"title": "Import Dish 2", "description": "Description", "price": 3},
+                ],
+            },
+            {"title": "Import Submenu 2", "description": "Description"},
+        ],
+    },
+    {"title": "Import Menu 2", "description": "Description"},
+]
+
+
+def test_import_nested_json(client):
+    response = client.post("/api/v1/menus/import", json=IMPORT_DATA)
+    assert response.status_code == 201
+
+    # Карта идентификаторов повторяет структуру документа
+    id_map = response.json()
+    assert len(id_map) == 2
+    menu_id = id_map[0]["id"]
+    first_submenu = id_map[0]["submenus"][0]
+    assert len(first_submenu["dishes"]) == 2
+    assert id_map[1]["submenus"] == []
+
+    # Счетчики заполнены при вставке
+    menu = client.get(f"/api/v1/menus/{menu_id}").json()
+    assert menu["submenus_count"] == 2
+    assert menu["dishes_count"] == 2
+
+    dishes = client.get(f"/api/v1/menus/{menu_id}/submenus/{first_submenu['id']}/dishes/").json()
+    assert sorted(dish["price"] for dish in dishes) == ["10.50", "3.00"]
+
+    for menu in id_map:
+        client.delete(f"/api/v1/menus/{menu['id']}")
+
+
+def test_import_ndjson(client):
+    body = "\n".join(json.dumps(document) for document in IMPORT_DATA)
+    response = client.post(
+        "/api/v1/menus/import", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 201
+    id_map = response.json()
+    assert len(id_map) == 2
+    assert client.get(f"/api/v1/menus/{id_map[0]['id']}").json()["dishes_count"] == 2
+
+    for menu in id_map:
+        client.delete(f"/api/v1/menus/{menu['id']}")
+
+
+def test_import_is_atomic(client):
+    # Повтор названия подменю нарушает уникальность: не сохраняется ничего
+    documents = [
+        {"title": "Atomic Menu", "description": "Description", "submenus": [
+            {"title": "Atomic Submenu", "description": "Description"},
+            {"title": "Atomic Submenu", "description": "Description"},
+        ]},
+    ]
+    response = client.post("/api/v1/menus/import", json=documents)
+    assert response.status_code == 409
+    menus = client.get("/api/v1/menus/", params={"limit": 1000}).json()
+    assert all(menu["title"] != "Atomic Menu" for menu in menus)
+
+
+def test_import_validation_error(client):
+    response = client.post("/api/v1/menus/import", json=[{"title": "No description"}])
+    assert response.status_code == 422
@@ -0,0 +1,37 @@
+from prometheus_client import REGISTRY
+
+MENU_DATA = {"title": "Metrics Menu", "description": "Metrics Menu Description"}
+MENU_ROUTE = "/api/v1/menus/{menu_id}"
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_metrics_by_route_template(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    labels = {"method": "GET", "route": MENU_ROUTE}
+    requests_before = sample("http_request_duration_seconds_count", **labels)
+    statements_before = sample("http_request_db_statements_sum", **labels)
+    not_found_before = sample("http_requests_total", status="404", **labels)
+
+    # Разные меню учитываются в одном ряду шаблона маршрута
+    client.get(f"/api/v1/menus/{menu_id}")
+    client.get("/api/v1/menus/00000000-0000-0000-0000-000000000000")
+
+    assert sample("http_request_duration_seconds_count", **labels) == requests_before + 2
+    assert sample("http_requests_total", status="404", **labels) == not_found_before + 1
+    # Оба чтения выполняют SQL: меню еще нет в кэше, а несуществующее меню не кэшируется
+    assert sample("http_request_db_statements_sum", **labels) >= statements_before + 2
+    assert sample("http_requests_in_progress") == 0
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_metrics_endpoint(client):
+    client.get("/api/v1/menus/", params={"limit": 1})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_bucket{le="0.001",method="GET",route="/api/v1/menus/"}' in response.text
+    assert "db_statements_total" in response.text
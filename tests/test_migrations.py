@@ -0,0 +1,161 @@
+from contextlib import contextmanager
+from pathlib import Path
+from uuid import uuid4
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.database import engine
+from app.models import Base
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+
+def alembic_config(url):
+    # Конфигурация Alembic, выполняющая миграции по заданному адресу
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("sqlalchemy.url", url.render_as_string(hide_password=False).replace("%", "%%"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+@contextmanager
+def scratch_schema():
+    # Отдельная схема, чтобы миграции не задели таблицы тестов
+    schema = f"migrations_{uuid4().hex}"
+    with engine.connect() as connection:
+        connection.execute(text(f'CREATE SCHEMA "{schema}"'))
+        connection.commit()
+    url = engine.url.update_query_dict({"options": f"-csearch_path={schema}"})
+    schema_engine = create_engine(url, poolclass=NullPool)
+    try:
+        yield alembic_config(url), schema_engine
+    finally:
+        schema_engine.dispose()
+        with engine.connect() as connection:
+            connection.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+            connection.commit()
+
+
+def test_migrations_match_models():
+    with scratch_schema() as (config, schema_engine):
+        command.upgrade(config, "head")
+
+        # Схема после миграций не отличается от моделей
+        with schema_engine.connect() as connection:
+            context = MigrationContext.configure(connection)
+            assert compare_metadata(context, Base.metadata) == []
+
+        # Откат до исходной схемы и повторный накат проходят без ошибок
+        command.downgrade(config, "0001")
+        command.upgrade(config, "head")
+
+
+def test_uuid_numeric_data_migration():
+    with scratch_schema() as (config, schema_engine), schema_engine.connect() as connection:
+        command.upgrade(config, "0002")
+        menu_id, submenu_id, dish_id = str(uuid4()), str(uuid4()), str(uuid4())
+        connection.execute(
+            text("INSERT INTO menus (id, title, description) VALUES (:id, 'Menu', 'Description')"),
+            {"id": menu_id},
+        )
+        connection.execute(
+            text("INSERT INTO submenus (id, title, description, menu_id) VALUES (:id, 'Submenu', 'Description', :menu_id)"),
+            {"id": submenu_id, "menu_id": menu_id},
+        )
+        connection.execute(
+            text(
+                "INSERT INTO dishes (id, title, description, price, menu_id, submenu_id) "
+                "VALUES (:id, 'Dish', 'Description', '12.50', :menu_id, :submenu_id)"
+            ),
+            {"id": dish_id, "menu_id": menu_id, "submenu_id": submenu_id},
+        )
+        connection.commit()
+
+        # Строковые id и цена переносятся в UUID и NUMERIC без потерь
+        command.upgrade(config, "head")
+        row = connection.execute(
+            text("SELECT id, menu_id, submenu_id, price, pg_typeof(id)::text, pg_typeof(price)::text FROM dishes")
+        ).one()
+        assert [str(value) for value in row[:4]] == [dish_id, menu_id, submenu_id, "12.50"]
+        assert row[4:] == ("uuid", "numeric")
+
+        # Каскадное удаление работает по новым ключам
+        connection.execute(text("DELETE FROM menus"))
+        assert connection.execute(text("SELECT count(*) FROM dishes")).scalar() == 0
+        connection.commit()
+
+
+def test_counters_backfill_matches_recount():
+    with scratch_schema() as (config, schema_engine), schema_engine.connect() as connection:
+        command.upgrade(config, "0001")
+        menu_id, other_menu_id, submenu_id = str(uuid4()), str(uuid4()), str(uuid4())
+        for id_ in (menu_id, other_menu_id):
+            connection.execute(
+                text("INSERT INTO menus (id, title, description) VALUES (:id, :id, 'Description')"), {"id": id_}
+            )
+        connection.execute(
+            text("INSERT INTO submenus (id, title, description, menu_id) VALUES (:id, 'Submenu', 'Description', :menu_id)"),
+            {"id": submenu_id, "menu_id": menu_id},
+        )
+        # Блюдо подменю первого меню, у которого menu_id указывает на другое меню
+        connection.execute(
+            text(
+                "INSERT INTO dishes (id, title, description, price, menu_id, submenu_id) "
+                "VALUES (:id, 'Dish', 'Description', '1.00', :menu_id, :submenu_id)"
+            ),
+            {"id": str(uuid4()), "menu_id": other_menu_id, "submenu_id": submenu_id},
+        )
+        connection.commit()
+
+        # Счетчики меню считаются через подменю, как при работе приложения
+        command.upgrade(config, "0002")
+        counts = dict(connection.execute(text("SELECT id, dishes_count FROM menus")).all())
+        assert counts == {menu_id: 1, other_menu_id: 0}
+
+
+def test_uuid_migration_keeps_writes_during_backfill():
+    with scratch_schema() as (config, schema_engine), schema_engine.connect() as connection:
+        command.upgrade(config, "0002")
+        menu_id, submenu_id, other_submenu_id, dish_id = (str(uuid4()) for _ in range(4))
+        connection.execute(
+            text("INSERT INTO menus (id, title, description) VALUES (:id, 'Menu', 'Description')"), {"id": menu_id}
+        )
+        for id_ in (submenu_id, other_submenu_id):
+            connection.execute(
+                text("INSERT INTO submenus (id, title, description, menu_id) VALUES (:id, :id, 'Description', :menu_id)"),
+                {"id": id_, "menu_id": menu_id},
+            )
+        connection.execute(
+            text(
+                "INSERT INTO dishes (id, title, description, price, menu_id, submenu_id) "
+                "VALUES (:id, 'Dish', 'Description', '1.00', :menu_id, :submenu_id)"
+            ),
+            {"id": dish_id, "menu_id": menu_id, "submenu_id": submenu_id},
+        )
+        connection.commit()
+
+        def concurrent_write(conn, cursor, statement, parameters, context, executemany):
+            # Сразу после переноса пачки блюд другой клиент меняет цену и подменю уже перенесенного блюда
+            if statement.startswith("UPDATE dishes SET") and "id > " in statement and not written:
+                written.append(True)
+                connection.execute(
+                    text("UPDATE dishes SET price = '7.25', submenu_id = :submenu_id"), {"submenu_id": other_submenu_id}
+                )
+                connection.commit()
+
+        written = []
+        event.listen(Engine, "after_cursor_execute", concurrent_write)
+        try:
+            command.upgrade(config, "head")
+        finally:
+            event.remove(Engine, "after_cursor_execute", concurrent_write)
+
+        assert written
+        row = connection.execute(text("SELECT price, submenu_id FROM dishes")).one()
+        assert [str(value) for value in row] == ["7.25", other_submenu_id]
@@ -0,0 +1,63 @@
+MENU_DATA = {"title": "Page Menu", "description": "Page Menu Description"}
+SUBMENUS_COUNT = 5
+
+
+def read_all_pages(client, url, limit):
+    # Проходим по всем страницам, следуя курсору из заголовка
+    items, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(url, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page) <= limit
+        items.extend(page)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return items
+
+
+def test_submenus_keyset_pages(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    created_ids = [
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/",
+            json={"title": f"Page Submenu {i}", "description": "Description"},
+        ).json()["id"]
+        for i in range(SUBMENUS_COUNT)
+    ]
+
+    items = read_all_pages(client, f"/api/v1/menus/{menu_id}/submenus/", limit=2)
+
+    # Страницы не пересекаются и покрывают все подменю в порядке id
+    ids = [item["id"] for item in items]
+    assert ids == sorted(created_ids)
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_dishes_keyset_pages(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/",
+        json={"title": "Page Dishes Submenu", "description": "Description"},
+    ).json()["id"]
+    created_ids = [
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+            json={"title": f"Page Dish {i}", "description": "Description", "price": "1.00"},
+        ).json()["id"]
+        for i in range(3)
+    ]
+
+    items = read_all_pages(client, f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/", limit=2)
+    assert [item["id"] for item in items] == sorted(created_ids)
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_invalid_cursor(client):
+    response = client.get("/api/v1/menus/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.database import TimedQueuePool, pool_budget, pool_status
+
+
+def test_pool_budget():
+    # Без общего лимита настройки не меняются
+    assert pool_budget(5, 10, 0, 4) == (5, 10)
+    # Бюджет 100 // 8 = 12: overflow урезается первым
+    assert pool_budget(5, 10, 100, 8) == (5, 7)
+    assert pool_budget(20, 10, 100, 8) == (12, 0)
+
+
+def test_timed_pool_records_checkouts_and_timeouts():
+    engine = create_engine(
+        "sqlite://", poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.01
+    )
+    connection = engine.connect()
+    status = pool_status(engine)
+    assert status["checked_out"] == 1
+    assert status["checkouts"] == 1
+
+    # Пул исчерпан: следующее соединение ждет и падает по таймауту
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert pool_status(engine)["timeouts"] == 1
+
+    connection.close()
+    assert pool_status(engine)["checked_out"] == 0
+    engine.dispose()
+
+
+def test_pool_diagnostics_endpoint(client):
+    response = client.get("/api/v1/diagnostics/pool")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"async", "sync"}
+    assert "pool" in data["async"]
@@ -0,0 +1,95 @@
+from uuid import uuid4
+
+PRICES = ("7.50", "2.00", "12.25", "2.00", "4.10")
+
+
+def create_tree(client):
+    # Меню с подменю из блюд PRICES и пустым подменю
+    menu_id = client.post("/api/v1/menus/", json={"title": "Price Menu", "description": "Menu"}).json()["id"]
+    submenu_ids = [
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/", json={"title": f"Price Submenu {i}", "description": "Submenu"}
+        ).json()["id"]
+        for i in range(2)
+    ]
+    for i, price in enumerate(PRICES):
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[0]}/dishes/",
+            json={"title": f"Price Dish {i}", "description": "Dish", "price": price},
+        )
+    return menu_id, submenu_ids
+
+
+def read_pages(client, url: str, params: dict):
+    # Проходит все страницы по X-Next-Cursor и возвращает цены по порядку
+    prices, cursor = [], None
+    while True:
+        response = client.get(url, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        prices += [dish["price"] for dish in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return prices
+
+
+def test_dishes_price_filter_and_order(client):
+    menu_id, submenu_ids = create_tree(client)
+    url = f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[0]}/dishes/"
+
+    filtered = client.get(url, params={"min_price": "2.00", "max_price": "7.5"}).json()
+    assert sorted(dish["price"] for dish in filtered) == ["2.00", "2.00", "4.10", "7.50"]
+
+    # Сортировка по цене с постраничным обходом, одинаковые цены не теряются
+    assert read_pages(client, url, {"order_by": "price", "limit": 2}) == sorted(PRICES, key=float)
+    assert read_pages(client, url, {"order_by": "-price", "limit": 2}) == sorted(PRICES, key=float, reverse=True)
+    assert read_pages(client, url, {"order_by": "price", "min_price": 3, "limit": 1}) == ["4.10", "7.50", "12.25"]
+
+    assert client.get(url, params={"order_by": "title"}).status_code == 422
+    assert client.get(url, params={"min_price": "-1"}).status_code == 422
+    assert client.get(url, params={"order_by": "price", "cursor": "broken"}).status_code == 400
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_menu_price_stats(client, query_counter):
+    menu_id, submenu_ids = create_tree(client)
+
+    query_counter.reset()
+    response = client.get(f"/api/v1/menus/{menu_id}/stats")
+    assert response.status_code == 200
+    assert query_counter.count == 1
+    stats = response.json()
+    assert stats["menu_id"] == menu_id
+    assert (stats["dishes_count"], stats["min_price"], stats["max_price"], stats["avg_price"]) == (
+        5, "2.00", "12.25", "5.57"
+    )
+    by_submenu = {submenu["submenu_id"]: submenu for submenu in stats["submenus"]}
+    assert by_submenu.keys() == set(submenu_ids)
+    assert by_submenu[submenu_ids[0]]["avg_price"] == "5.57"
+    # Подменю без блюд тоже в ответе
+    assert by_submenu[submenu_ids[1]] == {
+        "submenu_id": submenu_ids[1], "dishes_count": 0, "min_price": None, "max_price": None, "avg_price": None
+    }
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+    # Меню без подменю и несуществующее меню
+    empty_id = client.post("/api/v1/menus/", json={"title": "Empty Menu", "description": "Menu"}).json()["id"]
+    empty = client.get(f"/api/v1/menus/{empty_id}/stats").json()
+    assert (empty["dishes_count"], empty["avg_price"], empty["submenus"]) == (0, None, [])
+    client.delete(f"/api/v1/menus/{empty_id}")
+    assert client.get(f"/api/v1/menus/{uuid4()}/stats").status_code == 404
+
+
+def test_dish_price_bounds(client):
+    menu_id, submenu_ids = create_tree(client)
+    url = f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[1]}/dishes/"
+
+    # Цена вне NUMERIC(10, 2) отклоняется, а не падает в БД
+    for price in (1e9, "100000000", "-0.01", "1.255", "NaN"):
+        assert client.post(url, json={"title": "Bound Dish", "description": "Dish", "price": price}).status_code == 422
+    response = client.post(url, json={"title": "Bound Dish", "description": "Dish", "price": "99999999.99"})
+    assert response.status_code == 201
+    assert response.json()["price"] == "99999999.99"
+
+    client.delete(f"/api/v1/menus/{menu_id}")
@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+from app import database
+from app.main import stream_menu_tree
+
+# Регрессионные тесты на количество SQL-запросов
+
+MENU_DATA = {"title": "Query Menu", "description": "Query Menu Description"}
+SUBMENUS_COUNT = 3
+DISHES_PER_SUBMENU = 4
+
+
+def create_menu_tree(client):
+    # Создаем меню с несколькими подменю и блюдами через API
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_ids = []
+    for i in range(SUBMENUS_COUNT):
+        submenu_id = client.post(
+            f"/api/v1/menus/{menu_id}/submenus/",
+            json={"title": f"Query Submenu {i}", "description": "Description"},
+        ).json()["id"]
+        submenu_ids.append(submenu_id)
+        for j in range(DISHES_PER_SUBMENU):
+            client.post(
+                f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+                json={"title": f"Query Dish {i}-{j}", "description": "Description", "price": "1.50"},
+            )
+    return menu_id, submenu_ids
+
+
+def test_read_menu_single_query(client, query_counter):
+    menu_id, _ = create_menu_tree(client)
+
+    query_counter.reset()
+    response = client.get(f"/api/v1/menus/{menu_id}")
+    assert response.status_code == 200
+
+    # Счетчики считаются одним агрегирующим запросом, без N+1
+    assert query_counter.count == 1
+    data = response.json()
+    assert data["submenus_count"] == SUBMENUS_COUNT
+    assert data["dishes_count"] == SUBMENUS_COUNT * DISHES_PER_SUBMENU
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_read_submenu_single_query(client, query_counter):
+    menu_id, submenu_ids = create_menu_tree(client)
+
+    query_counter.reset()
+    response = client.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[0]}")
+    assert response.status_code == 200
+
+    assert query_counter.count == 1
+    assert response.json()["dishes_count"] == DISHES_PER_SUBMENU
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_read_menu_tree_constant_queries(client, query_counter):
+    menu_id, submenu_ids = create_menu_tree(client)
+
+    query_counter.reset()
+    response = client.get(f"/api/v1/menus/{menu_id}/tree")
+    assert response.status_code == 200
+
+    # Меню и подменю с блюдами - по одному запросу независимо от размера меню
+    assert query_counter.count == 2
+    data = response.json()
+    assert data["id"] == menu_id
+    assert sorted(submenu["id"] for submenu in data["submenus"]) == sorted(submenu_ids)
+    assert all(len(submenu["dishes"]) == DISHES_PER_SUBMENU for submenu in data["submenus"])
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_menu_tree_streams_row_batches(client):
+    menu_id, submenu_ids = create_menu_tree(client)
+    empty_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Query Empty", "description": "Description"}
+    ).json()["id"]
+    menu = client.get(f"/api/v1/menus/{menu_id}").json()
+
+    async def collect(menu):
+        return [chunk async for chunk in stream_menu_tree(menu, database.AsyncSessionLocal)]
+
+    # Одна пачка строк - один кусок ответа, а не кусок на каждое блюдо
+    chunks = asyncio.run(collect(menu))
+    assert len(chunks) == 2
+    data = json.loads("".join(chunks))
+    submenus = {submenu["id"]: submenu for submenu in data["submenus"]}
+    assert sorted(submenus) == sorted([*submenu_ids, empty_id])
+    assert submenus[empty_id]["dishes"] == []
+    assert all(len(submenus[submenu_id]["dishes"]) == DISHES_PER_SUBMENU for submenu_id in submenu_ids)
+    assert data == client.get(f"/api/v1/menus/{menu_id}/tree").json()
+
+    # Меню без подменю - один кусок с пустым списком подменю
+    client.delete(f"/api/v1/menus/{menu_id}")
+    empty_menu = client.post("/api/v1/menus/", json=MENU_DATA).json()
+    assert json.loads("".join(asyncio.run(collect(empty_menu))))["submenus"] == []
+    assert client.get(f"/api/v1/menus/{empty_menu['id']}/tree").json()["submenus"] == []
+    assert client.get(f"/api/v1/menus/{submenu_ids[0]}/tree").status_code == 404
+
+    client.delete(f"/api/v1/menus/{empty_menu['id']}")
+
+
+def test_update_single_statement(client, query_counter):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+
+    query_counter.reset()
+    response = client.patch(f"/api/v1/menus/{menu_id}", json={"title": "Query Menu Updated"})
+    assert response.status_code == 200
+    assert response.json()["title"] == "Query Menu Updated"
+
+    # Один UPDATE ... RETURNING вместо SELECT + UPDATE + SELECT
+    assert query_counter.count == 1
+    assert query_counter.statements[0].startswith("UPDATE")
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_update_ignores_non_whitelisted_columns(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+
+    response = client.put(
+        f"/api/v1/menus/{menu_id}",
+        json={"description": "New Description", "id": "forged", "dishes_count": 100},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["id"] == menu_id
+    assert data["description"] == "New Description"
+    assert data["dishes_count"] == 0
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_update_rejects_invalid_values(client, query_counter):
+    menu_id, submenu_ids = create_menu_tree(client)
+    submenu_url = f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[0]}"
+    dish = client.get(f"{submenu_url}/dishes/").json()[0]
+    dish_id = dish["id"]
+
+    # null, неверный тип и неверная цена отклоняются до UPDATE, версия не меняется
+    query_counter.reset()
+    for method in ("put", "patch"):
+        for url, payload in (
+            (f"/api/v1/menus/{menu_id}", {"title": None}),
+            (f"/api/v1/menus/{menu_id}", {"title": 5}),
+            (submenu_url, {"description": ["x"]}),
+            (f"{submenu_url}/dishes/{dish_id}", {"price": "abc"}),
+            (f"{submenu_url}/dishes/{dish_id}", {"price": None}),
+            (f"{submenu_url}/dishes/{dish_id}", {"price": "-1"}),
+            (f"{submenu_url}/dishes/{dish_id}", {"price": 1e9}),
+        ):
+            assert getattr(client, method)(url, json=payload).status_code == 422
+    assert query_counter.count == 0
+    assert client.get(f"/api/v1/menus/{menu_id}").json()["title"] == MENU_DATA["title"]
+
+    # Непереданные поля не меняются
+    response = client.patch(f"{submenu_url}/dishes/{dish_id}", json={"price": "99999999.99"})
+    assert response.status_code == 200
+    assert (response.json()["price"], response.json()["title"]) == ("99999999.99", dish["title"])
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_delete_menu_single_statement(client, query_counter):
+    menu_id, submenu_ids = create_menu_tree(client)
+
+    query_counter.reset()
+    response = client.delete(f"/api/v1/menus/{menu_id}")
+    assert response.json() == {"status": "true", "message": "The menus has been deleted"}
+
+    # Подменю и блюда удаляются каскадом в БД, без загрузки в память
+    assert query_counter.count == 1
+    assert query_counter.statements[0].startswith("DELETE")
+    assert client.get(f"/api/v1/menus/{menu_id}/submenus/{submenu_ids[0]}").status_code == 404
@@ -0,0 +1,174 @@
+# Бюджеты SQL-запросов для каждого маршрута app.main
+from uuid import uuid4
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from app import cache, main
+from app.cache import NullCache
+from app.main import app
+
+SUBMENUS_COUNT = 20
+DISHES_PER_SUBMENU = 50
+
+MENUS = "/api/v1/menus/"
+MENU = "/api/v1/menus/{menu_id}"
+SUBMENUS = "/api/v1/menus/{menu_id}/submenus/"
+SUBMENU = "/api/v1/menus/{menu_id}/submenus/{submenu_id}"
+DISHES = "/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/"
+DISH = "/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/{dish_id}"
+
+# Маршрут -> наибольшее допустимое число SQL-запросов, не зависящее от размера данных
+QUERY_BUDGETS = {
+    ("POST", MENUS): 2,
+    ("POST", SUBMENUS): 3,
+    ("POST", DISHES): 4,
+    ("POST", "/api/v1/menus/import"): 3,
+    ("GET", MENUS): 1,
+    ("GET", MENU): 1,
+    ("GET", "/api/v1/menus/{menu_id}/tree"): 2,
+    ("GET", "/api/v1/menus/{menu_id}/stats"): 1,
+    ("GET", "/api/v1/menus/{menu_id}/snapshot"): 0,
+    ("GET", "/api/v1/menus/{menu_id}/events"): 1,
+    ("GET", SUBMENUS): 1,
+    ("GET", SUBMENU): 1,
+    ("GET", DISHES): 1,
+    ("GET", DISH): 1,
+    ("GET", "/api/v1/submenus"): 1,
+    ("GET", "/api/v1/dishes"): 1,
+    ("GET", "/api/v1/search"): 1,
+    ("PUT", MENU): 1,
+    ("PUT", SUBMENU): 1,
+    ("PUT", DISH): 1,
+    ("PATCH", MENU): 1,
+    ("PATCH", SUBMENU): 1,
+    ("PATCH", DISH): 1,
+    ("DELETE", MENU): 1,
+    ("DELETE", SUBMENU): 2,
+    ("DELETE", DISH): 3,
+    ("GET", "/api/v1/export"): 1,
+    ("GET", "/api/v1/cache/stats"): 0,
+    ("GET", "/api/v1/diagnostics/pool"): 0,
+    ("GET", "/metrics"): 0,
+    ("GET", "/healthz"): 0,
+    ("GET", "/readyz"): 1,
+}
+
+
+def menu_document(submenus: int, dishes: int):
+    # Документ меню с подменю и блюдами для импорта
+    return {
+        "title": f"Budget Menu {uuid4().hex}",
+        "description": "Description",
+        "submenus": [
+            {
+                "title": f"Budget Submenu {i}",
+                "description": "Description",
+                "dishes": [
+                    {"title": f"Budget Dish {j}", "description": "Description", "price": "1.00"}
+                    for j in range(dishes)
+                ],
+            }
+            for i in range(submenus)
+        ],
+    }
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    # Кэш скрыл бы запросы к БД, поэтому считаем без него
+    previous = cache.get_backend()
+    cache.set_backend(NullCache())
+    yield
+    cache.set_backend(previous)
+
+
+@pytest.fixture(autouse=True)
+def short_event_streams(monkeypatch):
+    # Поток событий иначе не заканчивается, и ответ не был бы получен
+    monkeypatch.setattr(main, "EVENTS_STREAM_SECONDS", 0)
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    # Меню с SUBMENUS_COUNT подменю по DISHES_PER_SUBMENU блюд: запросы на строку сразу видны
+    client = TestClient(app)
+    id_map = client.post(
+        "/api/v1/menus/import", json=[menu_document(SUBMENUS_COUNT, DISHES_PER_SUBMENU)]
+    ).json()[0]
+    submenu = id_map["submenus"][0]
+    yield {"menu_id": id_map["id"], "submenu_id": submenu["id"], "dish_id": submenu["dishes"][0]}
+    client.delete(MENU.format(menu_id=id_map["id"]))
+
+
+def prepare(client, method: str, path: str, ids: dict):
+    # Готовит запрос к маршруту; объекты для удаления создаются заранее, вне бюджета
+    title = f"Budget {uuid4().hex}"
+    if method == "DELETE":
+        menu_id = ids["menu_id"]
+        if path == MENU:
+            menu_id = client.post(MENUS, json={"title": title, "description": "Description"}).json()["id"]
+            return MENU.format(menu_id=menu_id), {}
+        if path == SUBMENU:
+            submenu_id = client.post(
+                SUBMENUS.format(**ids), json={"title": title, "description": "Description"}
+            ).json()["id"]
+            return SUBMENU.format(menu_id=menu_id, submenu_id=submenu_id), {}
+        dish_id = client.post(
+            DISHES.format(**ids), json={"title": title, "description": "Description", "price": "1.00"}
+        ).json()["id"]
+        return DISH.format(**{**ids, "dish_id": dish_id}), {}
+    if path == "/api/v1/menus/import":
+        return path, {"json": [menu_document(SUBMENUS_COUNT, DISHES_PER_SUBMENU)]}
+    if path == "/api/v1/submenus":
+        return path, {"params": {"ids": ids["submenu_id"]}}
+    if path == "/api/v1/dishes":
+        return path, {"params": {"ids": ids["dish_id"]}}
+    if path == "/api/v1/search":
+        # Первый поиск один раз на процесс проверяет pg_trgm, в бюджет это не входит
+        client.get(path, params={"q": "Budget"})
+        return path, {"params": {"q": "Budget Dish", "menu_id": ids["menu_id"]}}
+    if path == "/api/v1/menus/{menu_id}/snapshot":
+        # Снимок публикуется первым запросом, опубликованный отдается без БД
+        client.get(path.format(**ids))
+        return path.format(**ids), {}
+    if path == "/api/v1/export":
+        return path, {"params": {"menu_id": ids["menu_id"]}}
+    if method in ("POST", "PUT"):
+        body = {"title": title, "description": "Description"}
+        if path in (DISHES, DISH):
+            body["price"] = "2.50"
+        return path.format(**ids), {"json": body}
+    if method == "PATCH":
+        return path.format(**ids), {"json": {"description": f"Patched {title}"}}
+    return path.format(**ids), {}
+
+
+def cleanup(client, method: str, path: str, response):
+    # Удаляет объекты, созданные запросом
+    if method != "POST" or response.status_code != 201:
+        return
+    data = response.json()
+    if path == "/api/v1/menus/import":
+        client.delete(MENU.format(menu_id=data[0]["id"]))
+    elif path == MENUS:
+        client.delete(MENU.format(menu_id=data["id"]))
+
+
+def test_every_route_has_budget():
+    routes = {
+        (method, route.path) for route in app.routes if isinstance(route, APIRoute) for method in route.methods
+    }
+    assert routes == set(QUERY_BUDGETS)
+
+
+@pytest.mark.parametrize("method, path", sorted(QUERY_BUDGETS))
+def test_route_within_query_budget(client, query_budget, dataset, method, path):
+    url, kwargs = prepare(client, method, path, dataset)
+
+    with query_budget(QUERY_BUDGETS[method, path]):
+        response = client.request(method, url, **kwargs)
+        assert response.status_code < 400, response.text
+
+    cleanup(client, method, path, response)
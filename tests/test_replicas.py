@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import cache, database, read_routing
+from app.cache import NullCache
+from app.main import app
+from tests.conftest import QueryCounter
+
+MENU_DATA = {"title": "Replica Menu", "description": "Replica Menu Description"}
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    # Реплика-заглушка: отдельный движок на той же тестовой БД, запросы считаются отдельно
+    cache_backend = cache.get_backend()
+    cache.set_backend(NullCache())
+    monkeypatch.setattr(database, "DATABASE_REPLICA_URLS", [database.DATABASE_URL])
+    asyncio.run(database.dispose_engines())
+    counters = {"primary": QueryCounter(), "replica": QueryCounter()}
+    engines = {
+        "primary": database.get_async_engine().sync_engine,
+        "replica": database.get_replica_engines()[0].sync_engine,
+    }
+    for name, engine in engines.items():
+        event.listen(engine, "before_cursor_execute", counters[name])
+    yield counters
+    for name, engine in engines.items():
+        event.remove(engine, "before_cursor_execute", counters[name])
+    asyncio.run(database.dispose_engines())
+    cache.set_backend(cache_backend)
+
+
+def test_reads_go_to_replica_and_writes_to_primary(replica):
+    writer = TestClient(app)
+    response = writer.post("/api/v1/menus/", json=MENU_DATA)
+    menu_id = response.json()["id"]
+    assert replica["primary"].count > 0
+    assert replica["replica"].count == 0
+
+    # Другой клиент не писал: его чтения идут на реплику
+    replica["primary"].reset()
+    reader = TestClient(app)
+    assert reader.get(f"/api/v1/menus/{menu_id}").status_code == 200
+    assert reader.get("/api/v1/menus/", params={"limit": 1}).status_code == 200
+    assert replica["primary"].count == 0
+    assert replica["replica"].count == 2
+
+    writer.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_read_your_writes_window(replica):
+    client = TestClient(app)
+    response = client.post("/api/v1/menus/", json=MENU_DATA)
+    menu_id = response.json()["id"]
+    assert read_routing.LAST_WRITE_COOKIE in response.cookies
+
+    # Сразу после записи клиент читает с основной БД
+    replica["primary"].reset()
+    client.get(f"/api/v1/menus/{menu_id}")
+    assert replica["primary"].count == 1
+    assert replica["replica"].count == 0
+
+    # Окно прошло: снова реплика
+    client.cookies.set(read_routing.LAST_WRITE_COOKIE, "0")
+    client.get(f"/api/v1/menus/{menu_id}")
+    assert replica["replica"].count == 1
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_read_your_writes_bypasses_cache(replica):
+    # Кэш включен: его могла заполнить отставшая реплика
+    cache.set_backend(cache.MemoryCache())
+    client = TestClient(app)
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    # Устаревшее значение, как после промаха другого клиента на реплике до записи
+    stale = {"id": menu_id, "title": "Stale", "description": "", "submenus_count": 0, "dishes_count": 0, "version": 0}
+    cache.get_backend().set(cache.menu_key(menu_id), stale)
+
+    # В окне read-your-writes клиент читает основную БД, а не кэш, и обновляет кэш
+    replica["primary"].reset()
+    assert client.get(f"/api/v1/menus/{menu_id}").json()["title"] == MENU_DATA["title"]
+    assert replica["primary"].count == 1
+    assert cache.get_backend().get(cache.menu_key(menu_id))["title"] == MENU_DATA["title"]
+
+    # Вне окна чтение снова берет значение из кэша
+    client.cookies.set(read_routing.LAST_WRITE_COOKIE, "0")
+    replica["replica"].reset()
+    client.get(f"/api/v1/menus/{menu_id}")
+    assert replica["replica"].count == 0
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_wrote_recently():
+    now = 1000.0
+    cookie = read_routing.LAST_WRITE_COOKIE
+    assert read_routing.wrote_recently({cookie: str(now - 1)}, now)
+    assert not read_routing.wrote_recently({cookie: str(now - read_routing.READ_YOUR_WRITES_SECONDS)}, now)
+    assert not read_routing.wrote_recently({cookie: "garbage"}, now)
+    assert not read_routing.wrote_recently({}, now)
+
+
+def test_without_replicas_reads_use_primary(client):
+    # Без реплик cookie не ставится, и чтения идут на основную БД
+    assert read_routing.session_factory("GET", {}) is database.ReplicaSessionLocal
+    response = client.post("/api/v1/menus/", json=MENU_DATA)
+    assert read_routing.LAST_WRITE_COOKIE not in response.cookies
+    assert database.get_replica_engines() == []
+    client.delete(f"/api/v1/menus/{response.json()['id']}")
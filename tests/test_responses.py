@@ -0,0 +1,52 @@
+import warnings
+
+from pydantic import PydanticDeprecatedSince20
+
+MENU_DATA = {"title": "Response Menu", "description": "Response Menu Description"}
+
+MENU_FIELDS = {"id", "title", "description", "submenus_count", "dishes_count"}
+SUBMENU_FIELDS = {"id", "title", "description", "dishes_count"}
+DISH_FIELDS = {"id", "title", "description", "price"}
+
+
+def test_responses_follow_models(client):
+    menu = client.post("/api/v1/menus/", json=MENU_DATA).json()
+    menu_url = f"/api/v1/menus/{menu['id']}"
+    submenu = client.post(f"{menu_url}/submenus/", json={"title": "Response Submenu", "description": "Description"}).json()
+    submenu_url = f"{menu_url}/submenus/{submenu['id']}"
+    dish = client.post(
+        f"{submenu_url}/dishes/", json={"title": "Response Dish", "description": "Description", "price": "4.20"}
+    ).json()
+    dish_url = f"{submenu_url}/dishes/{dish['id']}"
+
+    # Созданные объекты отдаются по моделям ответа
+    assert set(menu) == MENU_FIELDS
+    assert set(submenu) == SUBMENU_FIELDS
+    assert set(dish) == DISH_FIELDS
+
+    # Чтение объекта и списков: без служебных колонок (version, внешние ключи)
+    for url, fields in ((menu_url, MENU_FIELDS), (submenu_url, SUBMENU_FIELDS), (dish_url, DISH_FIELDS)):
+        assert set(client.get(url).json()) == fields
+    assert [set(item) for item in client.get("/api/v1/menus/", params={"limit": 1}).json()] == [MENU_FIELDS]
+    assert [set(item) for item in client.get(f"{menu_url}/submenus/").json()] == [SUBMENU_FIELDS]
+    assert client.get(f"{submenu_url}/dishes/").json() == [dish]
+
+    # Обновление отдается по той же модели
+    assert set(client.patch(dish_url, json={"price": "5"}).json()) == DISH_FIELDS
+
+    client.delete(menu_url)
+
+
+def test_create_uses_pydantic_v2_api(client):
+    # Тела запросов создания сериализуются model_dump, без устаревшего .dict()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        menu_url = f"/api/v1/menus/{client.post('/api/v1/menus/', json=MENU_DATA).json()['id']}"
+        submenu = client.post(f"{menu_url}/submenus/", json={"title": "Response Submenu", "description": "Description"})
+        client.post(
+            f"{menu_url}/submenus/{submenu.json()['id']}/dishes/",
+            json={"title": "Response Dish", "description": "Description", "price": "4.20"},
+        )
+    assert not [warning for warning in caught if issubclass(warning.category, PydanticDeprecatedSince20)]
+
+    client.delete(menu_url)
@@ -0,0 +1,125 @@
+from uuid import uuid4
+
+from app.crud import search_tsquery
+
+
+def create_tree(client, word: str):
+    # Меню с двумя подменю; слово word встречается в названиях и описаниях
+    menu_id = client.post("/api/v1/menus/", json={"title": f"Search Menu {word}", "description": "Menu"}).json()["id"]
+    pizza_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/", json={"title": f"Pizza {word}", "description": "Submenu"}
+    ).json()["id"]
+    drinks_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Drinks", "description": f"Cold {word}"}
+    ).json()["id"]
+    dishes = {}
+    for submenu_id, title, description in (
+        (pizza_id, f"Margherita {word}", "Tomato and mozzarella"),
+        (pizza_id, "Pepperoni", f"Spicy {word} sausage"),
+        (drinks_id, f"Lemonade {word}", f"Fresh {word}"),
+    ):
+        dishes[title.split()[0]] = client.post(
+            f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+            json={"title": title, "description": description, "price": "5.00"},
+        ).json()["id"]
+    return menu_id, pizza_id, drinks_id, dishes
+
+
+def test_search_tsquery():
+    assert search_tsquery("Pizza marg") == "pizza & marg:*"
+    # Операторы tsquery из запроса не проходят
+    assert search_tsquery("a | !b & (c:*)") == "a & b & c:*"
+    assert search_tsquery("!!!") == ""
+
+
+def test_search_ranked_and_scoped(client):
+    word = f"zq{uuid4().hex[:10]}"
+    menu_id, pizza_id, _, dishes = create_tree(client, word)
+
+    response = client.get("/api/v1/search", params={"q": word})
+    assert response.status_code == 200
+    results = response.json()
+    assert {(item["type"], item["title"]) for item in results} == {
+        ("submenu", f"Pizza {word}"), ("submenu", "Drinks"),
+        ("dish", f"Margherita {word}"), ("dish", "Pepperoni"), ("dish", f"Lemonade {word}"),
+    }
+    ranks = [item["rank"] for item in results]
+    assert ranks == sorted(ranks, reverse=True)
+    # Совпадение в названии и описании выше, чем только в описании
+    titles = [item["title"] for item in results]
+    assert titles.index(f"Lemonade {word}") < titles.index("Pepperoni")
+    lemonade = results[titles.index(f"Lemonade {word}")]
+    assert lemonade["price"] == "5.00"
+    assert lemonade["menu_id"] == menu_id
+
+    # Префикс последнего слова и несколько слов
+    prefix = client.get("/api/v1/search", params={"q": f"margherita {word[:-3]}"}).json()
+    assert [item["id"] for item in prefix] == [dishes["Margherita"]]
+
+    # Только блюда одного подменю
+    scoped = client.get("/api/v1/search", params={"q": word, "submenu_id": pizza_id}).json()
+    assert {item["id"] for item in scoped} == {dishes["Margherita"], dishes["Pepperoni"]}
+    assert all(item["type"] == "dish" for item in scoped)
+
+    # Другое меню ничего не находит
+    other = client.get("/api/v1/search", params={"q": word, "menu_id": str(uuid4())}).json()
+    assert other == []
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_search_pagination(client):
+    word = f"zq{uuid4().hex[:10]}"
+    menu_id, _, _, _ = create_tree(client, word)
+    expected = [item["id"] for item in client.get("/api/v1/search", params={"q": word}).json()]
+
+    ids, cursor = [], None
+    while True:
+        params = {"q": word, "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/search", params=params)
+        ids += [item["id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert ids == expected
+
+    assert client.get("/api/v1/search", params={"q": word, "cursor": "broken"}).status_code == 400
+    assert client.get("/api/v1/search", params={"q": "?!"}).json() == []
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_search_pages_best_ranked_without_truncation(client):
+    word = f"zq{uuid4().hex[:10]}"
+    menu_id = client.post("/api/v1/menus/", json={"title": "Candidates Menu", "description": "Menu"}).json()["id"]
+    submenu_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Candidates", "description": "Submenu"}
+    ).json()["id"]
+    # Слабые совпадения (только в описании) вставлены раньше сильного (в названии)
+    plain_ids = [
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+            json={"title": f"Plain {i}", "description": f"With {word}", "price": "1.00"},
+        ).json()["id"]
+        for i in range(5)
+    ]
+    best_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+        json={"title": f"Best {word}", "description": word, "price": "1.00"},
+    ).json()["id"]
+
+    # Первая страница - лучшее по рангу совпадение, а не первое вставленное
+    first = client.get("/api/v1/search", params={"q": word, "limit": 1})
+    assert [item["id"] for item in first.json()] == [best_id]
+
+    # Страницы по одной строке доходят до последнего совпадения без повторов
+    ids, cursor = [best_id], first.headers["X-Next-Cursor"]
+    while cursor:
+        response = client.get("/api/v1/search", params={"q": word, "limit": 1, "cursor": cursor})
+        ids += [item["id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+    assert ids == [best_id, *sorted(plain_ids)]
+
+    client.delete(f"/api/v1/menus/{menu_id}")
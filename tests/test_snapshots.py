@@ -0,0 +1,173 @@
+import asyncio
+import gzip
+import threading
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.util import greenlet_spawn
+
+from app import events, snapshots
+from app.snapshots import FileSnapshotStore, MemorySnapshotStore, choose_encoding
+
+MENU_DATA = {"title": "Snapshot Menu", "description": "Snapshot Menu Description"}
+
+
+@pytest.fixture(params=["memory", "file"])
+def store(request, tmp_path):
+    # Каждый тест проходит с хранилищем в памяти и с файловым (mmap)
+    previous = snapshots.get_store()
+    store = MemorySnapshotStore() if request.param == "memory" else FileSnapshotStore(str(tmp_path))
+    snapshots.set_store(store)
+    yield store
+    snapshots.set_store(previous)
+
+
+def create_tree(client):
+    # Меню с подменю и двумя блюдами
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Snapshot Submenu", "description": "Submenu"}
+    ).json()["id"]
+    for i in range(2):
+        client.post(
+            f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+            json={"title": f"Snapshot Dish {i}", "description": "Dish", "price": f"{i + 1}.25"},
+        )
+    return menu_id, submenu_id
+
+
+def test_snapshot_served_without_database(client, query_counter, store):
+    menu_id, submenu_id = create_tree(client)
+    url = f"/api/v1/menus/{menu_id}/snapshot"
+
+    # Первый запрос публикует снимок
+    first = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert first.status_code == 200
+    document = first.json()
+    assert document["menu"]["dishes_count"] == 2
+    assert sorted(dish["price"] for dish in document["menu"]["submenus"][0]["dishes"]) == ["1.25", "2.25"]
+    assert first.headers["ETag"] == f'"{document["version"]}"'
+    assert "content-encoding" not in first.headers
+
+    # Опубликованный снимок отдается без запросов к БД, сжатый вариант - те же байты
+    query_counter.reset()
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert query_counter.count == 0
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.content == first.content
+    assert gzip.decompress(store.get(menu_id).body("gzip")) == first.content
+    not_modified = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert query_counter.count == 0
+
+    # Запись снимает публикацию, следующий запрос видит изменения и новую версию
+    client.post(
+        f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/",
+        json={"title": "Snapshot Dish 2", "description": "Dish", "price": "9.00"},
+    )
+    assert store.get(menu_id) is None
+    updated = client.get(url).json()
+    assert updated["menu"]["dishes_count"] == 3
+    assert updated["version"] != document["version"]
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+    assert client.get(url).status_code == 404
+
+
+def test_snapshot_not_found(client, store):
+    assert client.get(f"/api/v1/menus/{uuid4()}/snapshot").status_code == 404
+    assert client.get("/api/v1/menus/../snapshot").status_code == 404
+    assert client.get("/api/v1/menus/not-a-uuid/snapshot").status_code == 404
+
+
+def test_stale_publish_is_not_stored(store):
+    # Сборка, начатая до записи, не сохраняет устаревший снимок
+    menu_id = str(uuid4())
+    generation = store.generation(menu_id)
+    store.invalidate(menu_id)
+    snapshot = snapshots.build({"id": menu_id, "submenus": []})
+    assert not store.put(menu_id, snapshot, generation)
+    assert store.get(menu_id) is None
+    assert store.put(menu_id, snapshot, store.generation(menu_id))
+    assert store.get(menu_id).version == snapshot.version
+
+
+def test_change_events_invalidate_memory_snapshots(store):
+    # Событие записи из другого воркера снимает публикацию снимка в памяти;
+    # файловое хранилище общее, его уже сбросила сама запись
+    menu_id = str(uuid4())
+    store.put(menu_id, snapshots.build({"id": menu_id, "submenus": []}), store.generation(menu_id))
+    events.dispatch({"type": "updated", "object": "menu", "id": menu_id, "menu_id": menu_id})
+    assert (store.get(menu_id) is None) == store.local
+    events.dispatch_resync()
+    assert (store.get(menu_id) is None) == store.local
+
+
+def test_memory_snapshot_ttl():
+    store = MemorySnapshotStore(ttl=-1)
+    menu_id = str(uuid4())
+    assert store.put(menu_id, snapshots.build({"id": menu_id, "submenus": []}), store.generation(menu_id))
+    assert store.get(menu_id) is None
+
+
+def test_memory_snapshot_generations_are_bounded():
+    store = MemorySnapshotStore(maxsize=2)
+    menu_id = str(uuid4())
+    generation = store.generation(menu_id)
+    store.invalidate(menu_id)
+    for _ in range(5):
+        store.invalidate(str(uuid4()))
+    assert len(store._generations) == 2
+
+    # Снятие публикации вытесненного меню по-прежнему отменяет сборку, начатую до него
+    snapshot = snapshots.build({"id": menu_id, "submenus": []})
+    assert not store.put(menu_id, snapshot, generation)
+    assert store.put(menu_id, snapshot, store.generation(menu_id))
+
+
+def test_file_store_writes_off_event_loop(tmp_path, monkeypatch):
+    store = FileSnapshotStore(str(tmp_path))
+    menu_id = str(uuid4())
+    threads = []
+    locked = store._locked
+    monkeypatch.setattr(store, "_locked", lambda key: threads.append(threading.get_ident()) or locked(key))
+
+    def publish():
+        # Как publish_snapshot и запись в app.crud внутри AsyncSession.run_sync
+        store.put(menu_id, snapshots.build({"id": menu_id, "submenus": []}), store.generation(menu_id))
+        store.invalidate(menu_id)
+
+    asyncio.run(greenlet_spawn(publish))
+    # flock и запись файлов выполнялись в пуле потоков, а не в потоке цикла событий
+    assert len(threads) == 2
+    assert threading.get_ident() not in threads
+    assert store.get(menu_id) is None
+
+
+def test_file_store_keeps_menus_in_subdirectories(tmp_path):
+    store = FileSnapshotStore(str(tmp_path))
+    menu_id, other_id = str(uuid4()), str(uuid4())
+    for id_ in (menu_id, other_id):
+        store.put(id_, snapshots.build({"id": id_, "submenus": []}), store.generation(id_))
+
+    # Новая версия меню удаляет только старые файлы этого меню
+    old_version = store.get(menu_id).version
+    snapshot = snapshots.build({"id": menu_id, "title": "New", "submenus": []})
+    assert store.put(menu_id, snapshot, store.generation(menu_id))
+    names = {path.name for path in (tmp_path / menu_id).iterdir()}
+    assert f"{snapshot.version}.json" in names
+    assert not any(name.startswith(old_version) for name in names)
+    assert store.get(other_id) is not None
+
+    store.clear()
+    assert store.get(menu_id) is None and store.get(other_id) is None
+
+
+def test_choose_encoding():
+    available = {"identity", "gzip", "br"}
+    assert choose_encoding("gzip, deflate, br", available) == "br"
+    assert choose_encoding("gzip, deflate, br", {"identity", "gzip"}) == "gzip"
+    assert choose_encoding("br;q=0, gzip", available) == "gzip"
+    assert choose_encoding("*", {"identity", "gzip"}) == "gzip"
+    assert choose_encoding("", available) == "identity"
+    assert choose_encoding(None, available) == "identity"
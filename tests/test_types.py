@@ -0,0 +1,57 @@
+from sqlalchemy import select
+
+from app.database import SessionLocal
+from app.models import Dish
+
+MENU_DATA = {"title": "Types Menu", "description": "Types Menu Description"}
+
+
+def test_price_is_numeric_and_returned_as_string(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Types Submenu", "description": "Description"}
+    ).json()["id"]
+    dishes_url = f"/api/v1/menus/{menu_id}/submenus/{submenu_id}/dishes/"
+
+    # Цена отдается строкой с двумя знаками независимо от формата на входе
+    created = client.post(dishes_url, json={"title": "Types Dish 1", "description": "Description", "price": 10.5})
+    assert created.json()["price"] == "10.50"
+    client.post(dishes_url, json={"title": "Types Dish 2", "description": "Description", "price": "3"})
+    assert sorted(dish["price"] for dish in client.get(dishes_url).json()) == ["10.50", "3.00"]
+
+    # Цена хранится числом: по ней можно сортировать и агрегировать в SQL
+    with SessionLocal() as db:
+        prices = db.scalars(select(Dish.price).where(Dish.submenu_id == submenu_id).order_by(Dish.price)).all()
+        assert prices == ["3.00", "10.50"]
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+
+
+def test_malformed_id_is_not_found(client):
+    # Строка, не являющаяся UUID, ищется как несуществующий объект
+    assert client.get("/api/v1/menus/not-a-uuid").status_code == 404
+    assert client.get("/api/v1/menus/not-a-uuid/submenus/not-a-uuid").status_code == 404
+    assert client.delete("/api/v1/menus/not-a-uuid").json() is None
+
+
+def test_non_canonical_id_reads_follow_invalidation(client):
+    menu_id = client.post("/api/v1/menus/", json=MENU_DATA).json()["id"]
+    submenu_id = client.post(
+        f"/api/v1/menus/{menu_id}/submenus/", json={"title": "Types Submenu", "description": "Description"}
+    ).json()["id"]
+    menu_url = f"/api/v1/menus/{menu_id.upper()}"
+    submenu_url = f"{menu_url}/submenus/{submenu_id.replace('-', '')}"
+
+    # Чтение по id в другой записи кэшируется под тем же ключом, что сбрасывает запись
+    assert client.get(menu_url).json()["title"] == MENU_DATA["title"]
+    assert client.get(submenu_url).json()["title"] == "Types Submenu"
+    etag = client.get(menu_url).headers["ETag"]
+    client.patch(f"/api/v1/menus/{menu_id}", json={"title": "Types Menu Updated"})
+    client.patch(f"/api/v1/menus/{menu_id}/submenus/{submenu_id}", json={"title": "Types Submenu Updated"})
+    assert client.get(menu_url).json()["title"] == "Types Menu Updated"
+    assert client.get(submenu_url).json()["title"] == "Types Submenu Updated"
+    assert client.get(menu_url, headers={"If-None-Match": etag}).status_code == 200
+
+    client.delete(f"/api/v1/menus/{menu_id}")
+    assert client.get(menu_url).status_code == 404
+    assert client.get(submenu_url).status_code == 404